@@ -0,0 +1,401 @@
+"""End-to-end API benchmark against a local fake OpenAI server.
+
+Loads N orders (for each size in --orders), then drives the Flask app
+in-process with --concurrency threads through these scenarios:
+- login
+- order listing: user, admin, deep cursor page, filtered
+- order creation
+- generate: enqueue plus the worker running the job
+- preview: uncached and cached
+- payment to generation
+
+Reports p50/p95/p99 latency, throughput and DB queries per iteration as
+JSON, and can compare against a previous run.
+
+    python benchmarks/bench_api.py --orders 10000,100000 --output bench.json
+    python benchmarks/bench_api.py --database-url postgresql://localhost/cg_bench --drop-existing --orders 1000000
+    python benchmarks/bench_api.py --compare bench.json --tolerance 0.2
+    python benchmarks/bench_api.py --llm-backends 2 --llm-slow-rate 0.05 --llm-hedge-delay-ms 500
+
+The target database is wiped, so never point it at real data.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import FakeOpenAIServer
+
+BENCH_USER = 'bench'
+BENCH_PASSWORD = 'bench-password'
+ADMIN_USER = 'admin'
+ADMIN_PASSWORD = 'admin123'
+CONTENT_TYPES = ['blog_post', 'article', 'social_media', 'marketing_copy', 'video_script']
+STATUSES = ['pending', 'in_progress', 'completed', 'completed', 'completed']
+
+
+def configure_environment(args, fakes):
+    """Must run before src.main is imported: the app reads its config at import"""
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_api.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['OPENAI_API_KEY'] = 'bench'
+    os.environ['OPENAI_API_BASE'] = fakes[0].url
+    if len(fakes) > 1:
+        os.environ['LLM_PROVIDERS'] = json.dumps([{'name': fake.name, 'base_url': fake.url} for fake in fakes])
+    os.environ['LLM_HEDGE_DELAY_MS'] = str(args.llm_hedge_delay_ms)
+    os.environ['QUERY_STATS_HEADERS'] = '1'
+    # The fake server has no quota; keep the governor from throttling the benchmark itself
+    os.environ['LLM_RATE_LIMITS'] = json.dumps({
+        model: {'rpm': 1000000, 'tpm': 1000000000} for model in ('gpt-4', 'gpt-3.5-turbo')
+    })
+    return database_url
+
+
+def reset_database(app):
+    from src.bootstrap import bootstrap
+    from src.migrations import migration_metadata
+    from src.models.user import db
+
+    with app.app_context():
+        migration_metadata.drop_all(db.engine)
+        db.drop_all()
+    bootstrap(app, log=lambda message: None)
+
+
+def populate(app, orders, users, batch_size=20000):
+    """Bulk-load users and orders; the bench user owns an even share of them"""
+    from sqlalchemy import insert
+    from src.models.order import Order
+    from src.models.user import User, db
+
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    with app.app_context():
+        bench = User(username=BENCH_USER, email='bench@example.com', is_active=True, is_admin=False)
+        bench.set_password(BENCH_PASSWORD)
+        db.session.add(bench)
+        db.session.commit()
+        first_other = bench.id + 1
+
+        db.session.execute(insert(User.__table__), [
+            {'id': first_other + i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+             'created_at': now, 'updated_at': now, 'is_active': True, 'is_admin': False}
+            for i in range(users - 1)
+        ])
+        db.session.commit()
+        user_ids = [bench.id] + list(range(first_other, first_other + users - 1))
+
+        for start in range(0, orders, batch_size):
+            rows = []
+            for index in range(start, min(start + batch_size, orders)):
+                created_at = now - timedelta(seconds=orders - index)
+                rows.append({
+                    'user_id': user_ids[index % len(user_ids)], 'content_type': rng.choice(CONTENT_TYPES),
+                    'title': f'Order {index}', 'description': 'Benchmark order', 'requirements': '{}',
+                    'status': rng.choice(STATUSES), 'priority': 'medium', 'word_count': 500, 'price': 25.0,
+                    'created_at': created_at, 'updated_at': created_at
+                })
+            db.session.execute(insert(Order.__table__), rows)
+            db.session.commit()
+
+
+class Scenario:
+    """A named iteration function: takes a test client, returns (ok, queries issued)"""
+
+    def __init__(self, name, run, iterations):
+        self.name = name
+        self.run = run
+        self.iterations = iterations
+
+
+def queries(response):
+    return int(response.headers.get('X-DB-Query-Count', 0))
+
+
+def build_scenarios(app, args, tokens):
+    from src.services.job_queue import claim_next_job, run_job
+
+    user_headers = {'Authorization': f"Bearer {tokens['user']}"}
+    admin_headers = {'Authorization': f"Bearer {tokens['admin']}"}
+    counter = iter(range(10 ** 9))
+    counter_lock = threading.Lock()
+
+    def next_number():
+        with counter_lock:
+            return next(counter)
+
+    def login(client):
+        response = client.post('/api/auth/login', json={'username': BENCH_USER, 'password': BENCH_PASSWORD})
+        return response.status_code == 200, queries(response)
+
+    def get(path, headers):
+        def run(client):
+            response = client.get(path, headers=headers)
+            return response.status_code == 200, queries(response)
+        return run
+
+    # Cursor ten pages into the admin listing, resolved once up front
+    client = app.test_client()
+    cursor = None
+    for _ in range(10):
+        page = client.get('/api/orders?limit=50' + (f'&cursor={cursor}' if cursor else ''), headers=admin_headers).get_json()
+        cursor = page.get('next_cursor') or cursor
+
+    def create_order(client):
+        return client.post('/api/orders', json={
+            'content_type': 'blog_post', 'title': f'Bench order {next_number()}', 'word_count': 500
+        }, headers=user_headers)
+
+    def create(client):
+        response = create_order(client)
+        return response.status_code == 201, queries(response)
+
+    def generate(client):
+        created = create_order(client)
+        order_id = created.get_json()['order']['id']
+        response = client.post(f'/api/generate/{order_id}', headers=user_headers)
+        if response.status_code != 202:
+            return False, queries(created) + queries(response)
+        # Play the job worker inline so the measurement covers the generation itself
+        with app.app_context():
+            job = claim_next_job(f'bench-{threading.get_ident()}')
+            if job is not None:
+                run_job(job)
+        job_state = client.get(response.headers['Location'], headers=user_headers)
+        return job_state.status_code == 200, queries(created) + queries(response) + queries(job_state)
+
+    def preview(client):
+        response = client.post('/api/preview', json={
+            'content_type': 'blog_post', 'title': f'Preview topic {next_number()}'
+        }, headers=user_headers)
+        return response.status_code == 200, queries(response)
+
+    def preview_cached(client):
+        response = client.post('/api/preview', json={
+            'content_type': 'blog_post', 'title': 'A topic everyone previews'
+        }, headers=user_headers)
+        return response.status_code == 200, queries(response)
+
+    def payment_flow(client):
+        created = create_order(client)
+        order_id = created.get_json()['order']['id']
+        intent = client.post('/api/payment/create-payment-intent', json={'order_id': order_id}, headers=user_headers)
+        confirm = client.post('/api/payment/confirm-payment', json={
+            'payment_intent_id': intent.get_json()['payment_intent_id']
+        }, headers=user_headers)
+        if confirm.status_code != 202:
+            return False, queries(created) + queries(intent) + queries(confirm)
+        with app.app_context():
+            job = claim_next_job(f'bench-{threading.get_ident()}')
+            if job is not None:
+                run_job(job)
+        job_state = client.get(confirm.headers['Location'], headers=user_headers)
+        return job_state.status_code == 200, queries(created) + queries(intent) + queries(confirm) + queries(job_state)
+
+    n = args.requests
+    llm_n = args.llm_requests
+    return [
+        Scenario('login', login, min(n, 50)),
+        Scenario('list_orders_user', get('/api/orders?limit=50', user_headers), n),
+        Scenario('list_orders_admin', get('/api/orders?limit=50', admin_headers), n),
+        Scenario('list_orders_admin_deep', get(f'/api/orders?limit=50&cursor={cursor}', admin_headers), n),
+        Scenario('list_orders_filtered', get('/api/orders?limit=50&status=pending&fields=id,title,status', admin_headers), n),
+        Scenario('create_order', create, n),
+        Scenario('generate', generate, llm_n),
+        Scenario('preview', preview, llm_n),
+        Scenario('preview_cached', preview_cached, n),
+        Scenario('payment_to_generation', payment_flow, llm_n)
+    ]
+
+
+def run_scenario(app, scenario, concurrency, warmup):
+    latencies = []
+    query_counts = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = [scenario.iterations]
+
+    def worker():
+        nonlocal errors
+        client = app.test_client()
+        for _ in range(warmup):
+            scenario.run(client)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                ok, issued = scenario.run(client)
+            except Exception:
+                ok, issued = False, 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed * 1000)
+                query_counts.append(issued)
+                if not ok:
+                    errors += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 3) if latencies else None
+
+    return {
+        'iterations': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(statistics.fmean(latencies), 3) if latencies else None,
+        'throughput_per_s': round(len(latencies) / wall, 2) if wall else None,
+        'queries_per_iteration': round(statistics.fmean(query_counts), 2) if query_counts else None
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print scenarios whose p95 or queries per iteration grew beyond the tolerance; returns the count"""
+    regressions = 0
+    print(f"\n{'size':>9} {'scenario':<26}{'base p95':>10}{'p95':>10}{'change':>9}{'base q':>8}{'q':>8}")
+    for size, scenarios in results['sizes'].items():
+        for name, result in scenarios.items():
+            previous = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not previous or not previous.get('p95_ms') or not result.get('p95_ms'):
+                continue
+            change = result['p95_ms'] / previous['p95_ms'] - 1
+            more_queries = (result['queries_per_iteration'] or 0) > (previous['queries_per_iteration'] or 0) * (1 + tolerance)
+            flag = ' REGRESSION' if change > tolerance or more_queries else ''
+            regressions += bool(flag)
+            print(f"{size:>9} {name:<26}{previous['p95_ms']:>10.1f}{result['p95_ms']:>10.1f}{change:>+9.0%}"
+                  f"{previous['queries_per_iteration']:>8}{result['queries_per_iteration']:>8}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=None, help='Defaults to a temporary SQLite file')
+    parser.add_argument('--drop-existing', action='store_true', help='Required for non-SQLite URLs; drops all tables')
+    parser.add_argument('--orders', default='10000', help='Comma-separated table sizes, e.g. 10000,100000,1000000')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200, help='Iterations per non-LLM scenario')
+    parser.add_argument('--llm-requests', type=int, default=40, help='Iterations per scenario that calls the model')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured iterations per thread')
+    parser.add_argument('--scenarios', default=None, help='Comma-separated subset to run')
+    parser.add_argument('--llm-latency-ms', type=float, default=150)
+    parser.add_argument('--llm-tokens-per-second', type=float, default=2000)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-slow-rate', type=float, default=0.0, help='Share of model calls stalled by --llm-slow-ms')
+    parser.add_argument('--llm-slow-ms', type=float, default=5000)
+    parser.add_argument('--llm-backends', type=int, default=1, help='Fake providers to fail over and hedge between')
+    parser.add_argument('--llm-hedge-delay-ms', type=float, default=0, help='0 disables hedged requests')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    parser.add_argument('--compare', default=None, help='Baseline JSON from a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 growth before flagging')
+    args = parser.parse_args()
+
+    if args.database_url and not args.database_url.startswith('sqlite') and not args.drop_existing:
+        parser.error('--drop-existing is required for non-SQLite databases')
+
+    fakes = [
+        FakeOpenAIServer(
+            latency_ms=args.llm_latency_ms, tokens_per_second=args.llm_tokens_per_second,
+            error_rate=args.llm_error_rate, slow_rate=args.llm_slow_rate, slow_ms=args.llm_slow_ms,
+            name=f'fake{index}', seed=7 + index
+        ).start()
+        for index in range(max(args.llm_backends, 1))
+    ]
+    database_url = configure_environment(args, fakes)
+
+    from src.main import app
+    from src.models.user import db
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    wanted = set(args.scenarios.split(',')) if args.scenarios else None
+    results = {
+        'revision': git_revision(),
+        'recorded_at': datetime.utcnow().isoformat(),
+        'dialect': dialect,
+        'python': platform.python_version(),
+        'concurrency': args.concurrency,
+        'llm': {'latency_ms': args.llm_latency_ms, 'tokens_per_second': args.llm_tokens_per_second,
+                'error_rate': args.llm_error_rate, 'slow_rate': args.llm_slow_rate, 'slow_ms': args.llm_slow_ms,
+                'backends': len(fakes), 'hedge_delay_ms': args.llm_hedge_delay_ms},
+        'sizes': {}
+    }
+
+    for size in [int(value) for value in args.orders.split(',')]:
+        print(f'\n== {size} orders on {dialect} ==')
+        reset_database(app)
+        started = time.perf_counter()
+        populate(app, size, args.users)
+        print(f'Loaded in {time.perf_counter() - started:.1f}s')
+
+        client = app.test_client()
+        tokens = {
+            'user': client.post('/api/auth/login', json={'username': BENCH_USER, 'password': BENCH_PASSWORD}).get_json()['token'],
+            'admin': client.post('/api/auth/login', json={'username': ADMIN_USER, 'password': ADMIN_PASSWORD}).get_json()['token']
+        }
+
+        size_results = {}
+        print(f"{'scenario':<26}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'queries':>9}")
+        for scenario in build_scenarios(app, args, tokens):
+            if wanted and scenario.name not in wanted:
+                continue
+            result = run_scenario(app, scenario, args.concurrency, args.warmup)
+            size_results[scenario.name] = result
+            print(f"{scenario.name:<26}{result['iterations']:>6}{result['errors']:>5}{result['p50_ms']:>10.2f}"
+                  f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['throughput_per_s']:>9.1f}"
+                  f"{result['queries_per_iteration']:>9}")
+        results['sizes'][str(size)] = size_results
+
+    results['fake_openai'] = {fake.name: fake.snapshot() for fake in fakes}
+    for fake in fakes:
+        fake.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+    if database_url.startswith('sqlite') and not args.database_url:
+        os.remove(database_url[len('sqlite:///'):])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Compression ratio and read latency of the content blob store (migration 0002).
+
+Generates synthetic markdown articles (with a share of identical outputs),
+compares every available codec and level, then loads the same rows inline
+and through the blob store and times reads through the Content model.
+
+    python benchmarks/bench_blob_store.py --contents 5000
+    python benchmarks/bench_blob_store.py --database-url postgresql://localhost/cg_bench --drop-existing
+
+The target database is wiped, so never point it at real data.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert, select, text
+from src.models.user import db, User
+from src.models.order import Order
+from src.models.content import Content
+from src.models.content_blob import ContentBlob
+from src.migrations import migration_metadata
+from src.services import blob_store
+import src.models.content_draft  # noqa: F401  (register remaining tables)
+import src.models.content_template  # noqa: F401
+import src.models.job  # noqa: F401
+import src.models.payment  # noqa: F401
+import src.models.preview_cache_entry  # noqa: F401
+import src.models.generation_usage  # noqa: F401
+
+WORDS = (
+    'content marketing strategy audience brand growth customers value product team results data '
+    'search engine traffic conversion email social media campaign budget quality insight trend '
+    'business plan goal metric experience design story message channel platform launch feedback'
+).split()
+
+LEVELS = {'zlib': [1, 6, 9], 'zstd': [3, 9, 19]}
+
+
+def article(rng, words):
+    """Markdown shaped like the generator's output: headings, paragraphs, the odd list"""
+    parts = [f"# {' '.join(rng.choice(WORDS) for _ in range(5)).title()}\n"]
+    written = 0
+    while written < words:
+        if rng.random() < 0.15:
+            parts.append(f"\n## {' '.join(rng.choice(WORDS) for _ in range(4)).title()}\n")
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            length = rng.randint(8, 24)
+            sentences.append(' '.join(rng.choice(WORDS) for _ in range(length)).capitalize() + '.')
+            written += length
+        parts.append('\n' + ' '.join(sentences) + '\n')
+        if rng.random() < 0.1:
+            parts.append('\n' + '\n'.join(f'- {rng.choice(WORDS)} {rng.choice(WORDS)}' for _ in range(4)) + '\n')
+    return ''.join(parts)
+
+
+def corpus(count, duplicate_share, seed=42):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        if texts and rng.random() < duplicate_share:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(article(rng, rng.choice([300, 500, 1000, 2000])))
+    return texts
+
+
+def compare_codecs(texts):
+    raw_sizes = [len(text_.encode('utf-8')) for text_ in texts]
+    total = sum(raw_sizes)
+    results = {}
+    for codec, levels in LEVELS.items():
+        if codec not in blob_store._codecs:
+            continue
+        for level in levels:
+            started = time.perf_counter()
+            compressed = [blob_store.compress_text(text_, codec, level) for text_ in texts]
+            compress_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for used_codec, data, _ in compressed:
+                blob_store.decompress_text(used_codec, data)
+            decompress_seconds = time.perf_counter() - started
+
+            stored = sum(len(data) for _, data, _ in compressed)
+            results[f'{codec}-{level}'] = {
+                'ratio': round(total / stored, 2),
+                'compress_mb_s': round(total / compress_seconds / 1e6, 1),
+                'decompress_mb_s': round(total / decompress_seconds / 1e6, 1),
+                'decompress_us_per_text': round(decompress_seconds / len(texts) * 1e6, 2)
+            }
+    return total, results
+
+
+def load(app, texts, inline):
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.execute(insert(User.__table__), [{
+            'id': 1, 'username': 'bench', 'email': 'bench@example.com', 'password_hash': 'x',
+            'created_at': now, 'updated_at': now, 'is_active': True, 'is_admin': False
+        }])
+        db.session.execute(insert(Order.__table__), [
+            {'id': i, 'user_id': 1, 'content_type': 'blog_post', 'title': f'Order {i}', 'status': 'completed',
+             'priority': 'medium', 'word_count': 500, 'price': 20.0, 'created_at': now, 'updated_at': now}
+            for i in range(1, len(texts) + 1)
+        ])
+        if inline:
+            db.session.execute(insert(Content.__table__), [
+                {'order_id': i, 'generated_content': text_, 'content_format': 'markdown', 'quality_score': 0.8,
+                 'revision_count': 0, 'is_approved': True, 'created_at': now, 'updated_at': now}
+                for i, text_ in enumerate(texts, start=1)
+            ])
+        else:
+            for i, text_ in enumerate(texts, start=1):
+                db.session.add(Content(order_id=i, generated_content=text_, content_format='markdown'))
+        db.session.commit()
+
+
+def storage(app):
+    with app.app_context():
+        inline = db.session.scalar(select(func.coalesce(func.sum(func.length(Content.inline_content)), 0)))
+        blobs = db.session.execute(select(
+            func.count(), func.coalesce(func.sum(ContentBlob.size), 0), func.coalesce(func.sum(ContentBlob.stored_size), 0)
+        )).first()
+        return {'inline_bytes': int(inline), 'blobs': blobs[0], 'blob_raw_bytes': int(blobs[1]), 'blob_stored_bytes': int(blobs[2])}
+
+
+def read_latency(app, count, repeat, warm):
+    rng = random.Random(7)
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            order_id = rng.randint(1, count)
+            if not warm:
+                blob_store._text_cache._entries.clear()
+            db.session.expunge_all()
+            started = time.perf_counter()
+            content = Content.query.filter_by(order_id=order_id).first()
+            content.generated_content
+            timings.append((time.perf_counter() - started) * 1000)
+        db.session.remove()
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 4),
+        'mean_ms': round(statistics.fmean(timings), 4)
+    }
+
+
+def reset(engine):
+    migration_metadata.drop_all(engine)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    blob_store._text_cache._entries.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=None, help='Defaults to a temporary SQLite file')
+    parser.add_argument('--drop-existing', action='store_true', help='Required for non-SQLite URLs; drops all tables')
+    parser.add_argument('--contents', type=int, default=2000)
+    parser.add_argument('--duplicates', type=float, default=0.1, help='Share of outputs identical to an earlier one')
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_blob_store.db')}"
+    elif not database_url.startswith('sqlite') and not args.drop_existing:
+        parser.error('--drop-existing is required for non-SQLite databases')
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    db.init_app(app)
+
+    texts = corpus(args.contents, args.duplicates)
+    total, codecs = compare_codecs(texts)
+    print(f'{len(texts)} texts, {total / 1e6:.1f} MB uncompressed\n')
+    print(f"{'codec':<10}{'ratio':>8}{'compress MB/s':>15}{'decompress MB/s':>17}{'us/text':>10}")
+    for name, result in codecs.items():
+        print(f"{name:<10}{result['ratio']:>8}{result['compress_mb_s']:>15}{result['decompress_mb_s']:>17}{result['decompress_us_per_text']:>10}")
+
+    results = {'texts': len(texts), 'uncompressed_bytes': total, 'codecs': codecs, 'modes': {}}
+    with app.app_context():
+        engine = db.engine
+    for mode in ('inline', 'blob'):
+        reset(engine)
+        load(app, texts, inline=mode == 'inline')
+        if engine.dialect.name == 'postgresql':
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text('ANALYZE'))
+        results['modes'][mode] = {
+            'storage': storage(app),
+            'read_cold': read_latency(app, len(texts), args.repeat, warm=False),
+            'read_warm': read_latency(app, len(texts), args.repeat, warm=True)
+        }
+
+    print(f"\n{'mode':<8}{'stored bytes':>14}{'blobs':>8}{'cold p50 ms':>13}{'cold p95 ms':>13}{'warm p50 ms':>13}")
+    for mode, result in results['modes'].items():
+        stored = result['storage']['inline_bytes'] + result['storage']['blob_stored_bytes']
+        print(f"{mode:<8}{stored:>14}{result['storage']['blobs']:>8}"
+              f"{result['read_cold']['p50_ms']:>13.3f}{result['read_cold']['p95_ms']:>13.3f}{result['read_warm']['p50_ms']:>13.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
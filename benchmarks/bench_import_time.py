@@ -0,0 +1,100 @@
+"""Cold-start cost of a web worker: importing src.main in a fresh interpreter.
+
+Each run starts a new Python process (as a gunicorn worker recycle does),
+imports the app and reports wall time, the slowest modules from
+``-X importtime`` and which heavy SDKs got loaded eagerly.
+
+    python benchmarks/bench_import_time.py --runs 10
+    python benchmarks/bench_import_time.py --module src.worker --output import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SDKs that should only be imported once a request actually needs them
+HEAVY_MODULES = ['openai', 'stripe', 'numpy', 'httpx', 'pydantic']
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def run_once(module, env):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace('import time:', '|', 1).split('|')]
+        cumulative[name.strip()] = int(cumulative_us)
+    return probe, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='src.main', help='Module a worker imports on boot')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_import_time.db')}")
+    env.setdefault('OPENAI_API_KEY', 'bench')
+
+    # First run warms the bytecode cache, like a worker started after the build step
+    run_once(args.module, env)
+
+    timings = []
+    loaded = set()
+    cumulative_runs = []
+    for _ in range(args.runs):
+        probe, cumulative = run_once(args.module, env)
+        timings.append(probe['seconds'] * 1000)
+        loaded.update(probe['loaded'])
+        cumulative_runs.append(cumulative)
+
+    slowest = sorted(
+        ((name, statistics.median(run.get(name, 0) for run in cumulative_runs) / 1000) for name in cumulative_runs[0]
+         if '.' not in name),
+        key=lambda item: item[1],
+        reverse=True
+    )[:args.top]
+
+    print(f'import {args.module}: p50 {statistics.median(timings):.1f} ms, '
+          f'min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.runs} runs')
+    print(f"heavy modules loaded at import: {', '.join(sorted(loaded)) or 'none'}\n")
+    print(f"{'top-level package':<32}{'cumulative ms':>14}")
+    for name, ms in slowest:
+        print(f'{name:<32}{ms:>14.1f}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'module': args.module,
+                'runs': args.runs,
+                'import_ms': [round(timing, 2) for timing in timings],
+                'p50_ms': round(statistics.median(timings), 2),
+                'heavy_modules_loaded': sorted(loaded),
+                'slowest': [{'module': name, 'cumulative_ms': round(ms, 2)} for name, ms in slowest]
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
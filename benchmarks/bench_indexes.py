@@ -0,0 +1,212 @@
+"""Query plans and latency of the hot-path lookups before and after migration 0001.
+
+Builds the schema without the new indexes, loads synthetic rows, measures,
+applies the migrations and measures again.
+
+    python benchmarks/bench_indexes.py --orders 200000
+    python benchmarks/bench_indexes.py --database-url postgresql://localhost/cg_bench --drop-existing
+
+The target database is wiped, so never point it at real data.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, text
+from src.models.user import db, User
+from src.models.order import Order
+from src.models.content import Content
+from src.models.payment import Payment
+from src.models.content_template import ContentTemplate
+from src.migrations import migration_metadata, upgrade
+import src.models.content_draft  # noqa: F401  (register remaining tables)
+import src.models.job  # noqa: F401
+import src.models.preview_cache_entry  # noqa: F401
+import src.models.generation_usage  # noqa: F401
+
+NEW_INDEXES = [
+    'ix_order_user_id_created_at',
+    'ix_payment_user_id_created_at',
+    'ix_payment_stripe_payment_id',
+    'ix_content_order_id',
+    'ix_content_template_content_type_is_active',
+    'ix_job_status_run_after',
+    'ix_job_order_id'
+]
+
+QUERIES = {
+    'orders_for_user': 'SELECT id, created_at FROM "order" WHERE user_id = :user_id ORDER BY created_at DESC, id DESC LIMIT 50',
+    'payments_for_user': 'SELECT id, created_at FROM payment WHERE user_id = :user_id ORDER BY created_at DESC, id DESC LIMIT 50',
+    'payment_by_stripe_id': 'SELECT id FROM payment WHERE stripe_payment_id = :stripe_payment_id',
+    'content_for_order': 'SELECT id FROM content WHERE order_id = :order_id',
+    'active_template': 'SELECT id FROM content_template WHERE content_type = :content_type AND is_active = :is_active'
+}
+
+CONTENT_TYPES = ['blog_post', 'article', 'social_media', 'marketing_copy', 'video_script']
+
+
+def populate(engine, users, orders, batch_size=10000):
+    now = datetime.utcnow()
+    stripe_ids = []
+
+    with engine.begin() as conn:
+        conn.execute(insert(ContentTemplate.__table__), [
+            {'name': content_type, 'content_type': content_type, 'template_prompt': 'Write about {topic}',
+             'default_word_count': 500, 'base_price': 20.0, 'is_active': True, 'created_at': now, 'updated_at': now}
+            for content_type in CONTENT_TYPES
+        ])
+        conn.execute(insert(User.__table__), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+             'created_at': now, 'updated_at': now, 'is_active': True, 'is_admin': False}
+            for i in range(1, users + 1)
+        ])
+
+    for start in range(1, orders + 1, batch_size):
+        ids = range(start, min(start + batch_size, orders + 1))
+        order_rows, payment_rows, content_rows = [], [], []
+        for order_id in ids:
+            created_at = now - timedelta(minutes=orders - order_id)
+            user_id = random.randint(1, users)
+            stripe_id = f'pi_bench_{uuid.uuid4().hex[:16]}'
+            stripe_ids.append(stripe_id)
+            order_rows.append({
+                'id': order_id, 'user_id': user_id, 'content_type': random.choice(CONTENT_TYPES),
+                'title': f'Order {order_id}', 'status': 'completed', 'priority': 'medium',
+                'word_count': 500, 'price': 20.0, 'created_at': created_at, 'updated_at': created_at
+            })
+            payment_rows.append({
+                'user_id': user_id, 'order_id': order_id, 'amount': 20.0, 'currency': 'USD',
+                'stripe_payment_id': stripe_id, 'status': 'completed',
+                'created_at': created_at, 'updated_at': created_at
+            })
+            content_rows.append({
+                'order_id': order_id, 'generated_content': 'Lorem ipsum', 'content_format': 'markdown',
+                'quality_score': 0.8, 'revision_count': 0, 'is_approved': True,
+                'created_at': created_at, 'updated_at': created_at
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(Order.__table__), order_rows)
+            conn.execute(insert(Payment.__table__), payment_rows)
+            conn.execute(insert(Content.__table__), content_rows)
+
+    return stripe_ids
+
+
+def query_params(users, orders, stripe_ids):
+    return {
+        'orders_for_user': lambda: {'user_id': random.randint(1, users)},
+        'payments_for_user': lambda: {'user_id': random.randint(1, users)},
+        'payment_by_stripe_id': lambda: {'stripe_payment_id': random.choice(stripe_ids)},
+        'content_for_order': lambda: {'order_id': random.randint(1, orders)},
+        'active_template': lambda: {'content_type': random.choice(CONTENT_TYPES), 'is_active': True}
+    }
+
+
+def explain(conn, sql, params):
+    if conn.dialect.name == 'postgresql':
+        rows = conn.execute(text(f'EXPLAIN (ANALYZE, BUFFERS) {sql}'), params).fetchall()
+        return [row[0] for row in rows]
+    rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def measure(engine, params, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = explain(conn, sql, params[name]())
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params[name]()).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = {
+                'plan': plan,
+                'p50_ms': round(statistics.median(timings), 4),
+                'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 4),
+                'mean_ms': round(statistics.fmean(timings), 4)
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=None, help='Defaults to a temporary SQLite file')
+    parser.add_argument('--drop-existing', action='store_true', help='Required for non-SQLite URLs; drops all tables')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')}"
+    elif not database_url.startswith('sqlite') and not args.drop_existing:
+        parser.error('--drop-existing is required for non-SQLite databases')
+
+    random.seed(42)
+    engine = create_engine(database_url)
+    migration_metadata.drop_all(engine)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+
+    # Recreate the schema as it looked before migration 0001
+    with engine.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+    print(f'Loading {args.orders} orders for {args.users} users into {engine.dialect.name}...')
+    started = time.perf_counter()
+    stripe_ids = populate(engine, args.users, args.orders)
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('ANALYZE'))
+    print(f'Loaded in {time.perf_counter() - started:.1f}s')
+
+    params = query_params(args.users, args.orders, stripe_ids)
+    before = measure(engine, params, args.repeat)
+
+    started = time.perf_counter()
+    upgrade(engine, target=1)
+    migration_seconds = time.perf_counter() - started
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('ANALYZE'))
+    after = measure(engine, params, args.repeat)
+
+    print(f'\nMigration applied in {migration_seconds:.2f}s\n')
+    print(f"{'query':<24}{'before p50 ms':>15}{'after p50 ms':>15}{'speedup':>10}")
+    for name in QUERIES:
+        speedup = before[name]['p50_ms'] / after[name]['p50_ms'] if after[name]['p50_ms'] else float('inf')
+        print(f"{name:<24}{before[name]['p50_ms']:>15.3f}{after[name]['p50_ms']:>15.3f}{speedup:>9.1f}x")
+    for name in QUERIES:
+        print(f'\n{name}')
+        print('  before: ' + '\n          '.join(before[name]['plan']))
+        print('  after:  ' + '\n          '.join(after[name]['plan']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'dialect': engine.dialect.name,
+                'users': args.users,
+                'orders': args.orders,
+                'repeat': args.repeat,
+                'migration_seconds': round(migration_seconds, 3),
+                'before': before,
+                'after': after
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
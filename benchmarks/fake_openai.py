@@ -0,0 +1,266 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions (streamed or not) with generated markdown
+after a configurable latency and token rate, and can inject 429s, 500s and
+slow outliers.
+The reply is sized from the "approximately N words" line in the prompt, less
+any assistant text sent back for a continuation, so max_tokens truncation
+(finish_reason 'length') behaves like the real API.
+
+    python benchmarks/fake_openai.py --port 8089 --latency-ms 300 --tokens-per-second 80 --error-rate 0.02
+    OPENAI_API_BASE=http://127.0.0.1:8089/v1 python src/main.py
+
+Importable too: FakeOpenAIServer(...).start() serves from a background thread.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TARGET_WORDS = re.compile(r'approximately (\d+) words|\((\d+)-(\d+) words\)')
+_VOCABULARY = (
+    'content strategy audience brand growth customers value product team results data search '
+    'traffic conversion email campaign budget quality insight trend business plan goal metric '
+    'experience design story message channel platform launch feedback'
+).split()
+
+TOKENS_PER_WORD = 4 / 3
+
+
+class FakeOpenAIServer:
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=200, jitter_ms=50, tokens_per_second=100,
+                 error_rate=0.0, rate_limit_rate=0.0, slow_rate=0.0, slow_ms=5000, default_words=300,
+                 name='fake', seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.default_words = default_words
+        self.name = name
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'streamed': 0, 'errors': 0, 'rate_limited': 0, 'truncated': 0, 'disconnected': 0, 'slow': 0}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f'fake-openai-{self.name}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def latency(self):
+        latency = max(self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms), 0)
+        # A share of requests stall before answering, the tail that hedged requests are meant to cut
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            self.count('slow')
+            latency += self.slow_ms
+        return latency / 1000
+
+    def reply_words(self, messages):
+        prompt = ' '.join(message.get('content') or '' for message in messages if message.get('role') != 'assistant')
+        match = _TARGET_WORDS.search(prompt)
+        if not match:
+            words = self.default_words
+        elif match.group(1):
+            words = int(match.group(1))
+        else:
+            words = (int(match.group(2)) + int(match.group(3))) // 2
+        # A continuation request carries the reply so far; only the rest is still to come
+        written = sum(len((message.get('content') or '').split()) for message in messages if message.get('role') == 'assistant')
+        return max(words - written, 1)
+
+    def article(self, words):
+        """Markdown with a heading every ~200 words, split into ~token-sized pieces"""
+        pieces = ['# ' + ' '.join(self.random.choice(_VOCABULARY) for _ in range(4)).title() + '\n\n']
+        sentence = 0
+        for index in range(words):
+            if index and index % 200 == 0:
+                pieces.append('\n\n## ' + ' '.join(self.random.choice(_VOCABULARY) for _ in range(3)).title() + '\n\n')
+            word = self.random.choice(_VOCABULARY)
+            sentence += 1
+            if sentence == 1:
+                word = word.capitalize()
+            if sentence >= self.random.randint(10, 20):
+                word += '.'
+                sentence = 0
+            pieces.append(word + ' ')
+        return pieces
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('x-ratelimit-limit-requests', '1000000')
+                self.send_header('x-ratelimit-remaining-requests', '999999')
+                self.send_header('x-ratelimit-limit-tokens', '1000000000')
+                self.send_header('x-ratelimit-remaining-tokens', '999999999')
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    self._json(200, {'object': 'list', 'data': [
+                        {'id': 'gpt-4', 'object': 'model'}, {'id': 'gpt-3.5-turbo', 'object': 'model'}
+                    ]})
+                else:
+                    self._json(404, {'error': {'message': 'Not found'}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._json(404, {'error': {'message': 'Not found'}})
+                    return
+
+                server.count('requests')
+                time.sleep(server.latency())
+
+                roll = server.random.random()
+                if roll < server.rate_limit_rate:
+                    server.count('rate_limited')
+                    self._json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                               {'retry-after-ms': '50'})
+                    return
+                if roll < server.rate_limit_rate + server.error_rate:
+                    server.count('errors')
+                    self._json(500, {'error': {'message': 'Injected upstream error', 'type': 'server_error'}})
+                    return
+
+                model = request.get('model', 'gpt-4')
+                prompt_tokens = sum(len((message.get('content') or '')) for message in request.get('messages', [])) // 4
+                pieces = server.article(server.reply_words(request.get('messages', [])))
+                finish_reason = 'stop'
+                max_tokens = request.get('max_tokens')
+                if max_tokens and len(pieces) * TOKENS_PER_WORD > max_tokens:
+                    pieces = pieces[:int(max_tokens / TOKENS_PER_WORD)]
+                    finish_reason = 'length'
+                    server.count('truncated')
+                completion_tokens = round(len(pieces) * TOKENS_PER_WORD)
+                usage = {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens
+                }
+                completion_id = f'chatcmpl-{uuid.uuid4().hex[:24]}'
+
+                if request.get('stream'):
+                    server.count('streamed')
+                    self._stream(request, model, completion_id, pieces, finish_reason, usage)
+                    return
+
+                if server.tokens_per_second:
+                    time.sleep(completion_tokens / server.tokens_per_second)
+                self._json(200, {
+                    'id': completion_id,
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': ''.join(pieces).strip()},
+                        'finish_reason': finish_reason
+                    }],
+                    'usage': usage
+                })
+
+            def _stream(self, request, model, completion_id, pieces, finish_reason, usage):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                def send(choices, extra=None):
+                    chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                             'model': model, 'choices': choices}
+                    chunk.update(extra or {})
+                    self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                    self.wfile.flush()
+
+                delay = TOKENS_PER_WORD / server.tokens_per_second if server.tokens_per_second else 0
+                try:
+                    send([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+                    for piece in pieces:
+                        if delay:
+                            time.sleep(delay)
+                        send([{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])
+                    send([{'index': 0, 'delta': {}, 'finish_reason': finish_reason}])
+                    if (request.get('stream_options') or {}).get('include_usage'):
+                        send([], {'usage': usage})
+                    self.wfile.write(b'data: [DONE]\n\n')
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    server.count('disconnected')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=200, help='Time to first byte')
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--tokens-per-second', type=float, default=100, help='0 answers instantly')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with a 429')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='Share of requests delayed by --slow-ms')
+    parser.add_argument('--slow-ms', type=float, default=5000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, slow_rate=args.slow_rate, slow_ms=args.slow_ms, seed=args.seed
+    )
+    print(f'Fake OpenAI API listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = 'gthread'
+# Password hashing (src/services/password_hashing.py) lets logins hold at most GUNICORN_THREADS minus
+# PASSWORD_HASH_RESERVED_THREADS (2) of these, and answers 503 beyond that, so a login burst can't
+# occupy every thread; it reads the same variable, so set GUNICORN_THREADS rather than editing this line
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Workers write metric samples here so /metrics can aggregate across all of them.
+# Set before any worker imports prometheus_client.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+
+def on_starting(server):
+    from src.utils.metrics import reset_multiprocess_dir
+    reset_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
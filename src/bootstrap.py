@@ -0,0 +1,38 @@
+"""One-shot database setup: create tables, apply migrations and seed defaults.
+
+Run once per deploy (``python -m src.bootstrap``) rather than in every web
+or job worker process on import.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+
+def bootstrap(app, seed=True, log=print):
+    """Create missing tables, apply pending migrations and seed templates and the admin user"""
+    from src.models.user import db
+    from src.migrations import upgrade
+    from src.utils.init_data import initialize_content_templates, create_admin_user
+
+    with app.app_context():
+        db.create_all()
+        applied = upgrade(db.engine, log=log)
+        log(f'Applied {len(applied)} migration(s)')
+        if seed:
+            initialize_content_templates()
+            create_admin_user()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create the schema and seed default data')
+    parser.add_argument('--no-seed', action='store_true', help='Skip default templates and the admin user')
+    args = parser.parse_args()
+
+    from src.main import app
+    bootstrap(app, seed=not args.no_seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,18 +3,30 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.user import db
 from src.models.order import Order
 from src.models.content import Content
+from src.models.content_blob import ContentBlob
+from src.models.content_draft import ContentDraft
 from src.models.payment import Payment
 from src.models.content_template import ContentTemplate
+from src.models.job import Job
+from src.models.preview_cache_entry import PreviewCacheEntry
+from src.models.generation_usage import GenerationUsage
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.order import order_bp
 from src.routes.content import content_bp
 from src.routes.payment import payment_bp
+from src.routes.job import job_bp
+from src.routes.admin import admin_bp
+from src.utils.compression import init_compression
+from src.utils.metrics import init_metrics
+from src.utils.profiler import init_profiler
+from src.utils.query_stats import init_query_stats
+from src.utils.static_manifest import asset_response, static_manifest
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -33,6 +45,8 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(order_bp, url_prefix='/api')
 app.register_blueprint(content_bp, url_prefix='/api')
 app.register_blueprint(payment_bp, url_prefix='/api/payment')
+app.register_blueprint(job_bp, url_prefix='/api')
+app.register_blueprint(admin_bp, url_prefix='/api')
 
 # Database configuration
 database_url = os.environ.get('DATABASE_URL')
@@ -45,31 +59,31 @@ else:
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
-
-with app.app_context():
-    db.create_all()
-    # Initialize default content templates
-    from src.utils.init_data import initialize_content_templates, create_admin_user
-    initialize_content_templates()
-    create_admin_user()
+# Registered first so it runs after every other after_request hook
+init_compression(app)
+init_query_stats(app)
+init_metrics(app)
+init_profiler(app)
+static_manifest.init_app(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    if app.static_folder is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    asset = static_manifest.get(path) if path != "" else None
+    if asset is None:
+        # Client-side routes (and unknown paths) get the SPA entry point
+        asset = static_manifest.index()
+    if asset is None:
+        return "index.html not found", 404
+    return asset_response(asset)
 
 
 if __name__ == '__main__':
+    # Deploys run `python -m src.bootstrap` once; the dev server sets itself up
+    from src.bootstrap import bootstrap
+    bootstrap(app)
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_ENV') != 'production')
@@ -0,0 +1,153 @@
+"""Versioned schema migrations.
+
+db.create_all() only creates missing tables, so any change to an existing
+table (indexes, new columns) ships as a module in src/migrations/versions
+named vNNNN_<description>.py with an upgrade(conn) function. Applied
+versions are recorded in the schema_migrations table.
+
+Run with ``python -m src.migrations upgrade`` (or ``status``).
+"""
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+# Arbitrary key so concurrent deploys don't run the same migration twice on Postgres
+MIGRATION_LOCK_KEY = 7314401
+
+_VERSION_MODULE = re.compile(r'^v(\d{4})_(\w+)$')
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+class MigrationError(Exception):
+    """Raised when a migration cannot be applied safely"""
+
+
+class Migration:
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        # Postgres can't CREATE INDEX CONCURRENTLY inside a transaction
+        self.transactional = getattr(module, 'TRANSACTIONAL', True)
+
+    def __repr__(self):
+        return f'<Migration {self.version:04d} {self.name}>'
+
+
+def discover_migrations():
+    """All migration modules, ordered by version"""
+    from src.migrations import versions
+
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        match = _VERSION_MODULE.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f'{versions.__name__}.{module_info.name}')
+        migrations.append(Migration(int(match.group(1)), match.group(2), module))
+
+    migrations.sort(key=lambda migration: migration.version)
+    return migrations
+
+
+def applied_versions(engine):
+    migration_metadata.create_all(engine)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def status(engine):
+    applied = applied_versions(engine)
+    return [(migration, migration.version in applied) for migration in discover_migrations()]
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply every pending migration up to `target` (inclusive); returns the versions applied"""
+    migration_metadata.create_all(engine)
+    is_postgres = engine.dialect.name == 'postgresql'
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as lock_conn:
+        if is_postgres:
+            lock_conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        try:
+            applied = set(lock_conn.execute(select(schema_migrations.c.version)).scalars())
+            done = []
+
+            for migration in discover_migrations():
+                if migration.version in applied:
+                    continue
+                if target is not None and migration.version > target:
+                    break
+
+                log(f'Applying migration {migration.version:04d} {migration.name}')
+                if migration.transactional:
+                    with engine.begin() as conn:
+                        migration.module.upgrade(conn)
+                        _record(conn, migration)
+                else:
+                    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                        migration.module.upgrade(conn)
+                        _record(conn, migration)
+                done.append(migration.version)
+
+            return done
+        finally:
+            if is_postgres:
+                lock_conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+
+
+def _record(conn, migration):
+    conn.execute(schema_migrations.insert().values(
+        version=migration.version,
+        name=migration.name,
+        applied_at=datetime.utcnow()
+    ))
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """Create an index if missing, without blocking writes on Postgres"""
+    unique_sql = 'UNIQUE ' if unique else ''
+    column_sql = ', '.join(columns)
+
+    if conn.dialect.name == 'postgresql':
+        # A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would skip
+        invalid = conn.execute(text(
+            'SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid '
+            'WHERE c.relname = :name AND NOT i.indisvalid'
+        ), {'name': name}).first()
+        if invalid:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+        conn.execute(text(f'CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" ({column_sql})'))
+    else:
+        conn.execute(text(f'CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON "{table}" ({column_sql})'))
+
+
+def delete_duplicates(conn, table, column, log=print):
+    """Keep only the newest row (highest id) per value of a column; returns the number of rows deleted"""
+    deleted = conn.execute(text(
+        f'DELETE FROM "{table}" WHERE {column} IS NOT NULL AND id NOT IN '
+        f'(SELECT MAX(id) FROM "{table}" WHERE {column} IS NOT NULL GROUP BY {column})'
+    )).rowcount
+    if deleted:
+        log(f'Deleted {deleted} older {table} row(s) with a duplicate {column}')
+    return deleted
+
+
+def ensure_unique(conn, table, column):
+    """Fail with a readable error if existing rows would violate a new unique index"""
+    duplicates = conn.execute(text(
+        f'SELECT {column}, COUNT(*) FROM "{table}" WHERE {column} IS NOT NULL '
+        f'GROUP BY {column} HAVING COUNT(*) > 1 LIMIT 10'
+    )).fetchall()
+    if duplicates:
+        values = ', '.join(str(row[0]) for row in duplicates)
+        raise MigrationError(f'Duplicate {table}.{column} values must be resolved first: {values}')
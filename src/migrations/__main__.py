@@ -0,0 +1,23 @@
+import argparse
+from src.main import app
+from src.models.user import db
+from src.migrations import status, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage database schema migrations')
+    parser.add_argument('command', choices=['upgrade', 'status'])
+    parser.add_argument('--target', type=int, default=None, help='Stop after this version')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'upgrade':
+            applied = upgrade(db.engine, target=args.target)
+            print(f'Applied {len(applied)} migration(s)')
+        else:
+            for migration, is_applied in status(db.engine):
+                print(f"{migration.version:04d} {migration.name}: {'applied' if is_applied else 'pending'}")
+
+
+if __name__ == '__main__':
+    main()
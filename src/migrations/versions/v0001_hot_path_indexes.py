@@ -0,0 +1,24 @@
+"""Indexes for the per-user listings, payment confirmation and content lookups
+
+Before this release a revision followed by another generation could insert a
+second content row for an order. The newest row holds the latest generation,
+so the older ones are deleted. Duplicate payment ids are not resolved
+automatically.
+"""
+from src.migrations import create_index, delete_duplicates, ensure_unique
+
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    ensure_unique(conn, 'payment', 'stripe_payment_id')
+    delete_duplicates(conn, 'content', 'order_id')
+    ensure_unique(conn, 'content', 'order_id')
+
+    create_index(conn, 'ix_order_user_id_created_at', 'order', ['user_id', 'created_at'])
+    create_index(conn, 'ix_payment_user_id_created_at', 'payment', ['user_id', 'created_at'])
+    create_index(conn, 'ix_payment_stripe_payment_id', 'payment', ['stripe_payment_id'], unique=True)
+    create_index(conn, 'ix_content_order_id', 'content', ['order_id'], unique=True)
+    create_index(conn, 'ix_content_template_content_type_is_active', 'content_template', ['content_type', 'is_active'])
+    create_index(conn, 'ix_job_status_run_after', 'job', ['status', 'run_after'])
+    create_index(conn, 'ix_job_order_id', 'job', ['order_id'])
@@ -0,0 +1,17 @@
+"""Move generated content out of the content row into the compressed content_blob table"""
+from sqlalchemy import inspect, text
+from src.models.content_blob import ContentBlob
+from src.services.blob_store import move_inline_content
+
+# Each chunk of moved rows commits on its own so a large table doesn't hold one long transaction
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    ContentBlob.__table__.create(conn, checkfirst=True)
+
+    columns = {column['name'] for column in inspect(conn).get_columns('content')}
+    if 'blob_hash' not in columns:
+        conn.execute(text('ALTER TABLE content ADD COLUMN blob_hash VARCHAR(64) REFERENCES content_blob (hash)'))
+
+    move_inline_content(conn, log=print)
@@ -0,0 +1,8 @@
+"""Flag content saved while the model was still cut off at max_tokens"""
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('content')}
+    if 'is_truncated' not in columns:
+        conn.execute(text('ALTER TABLE content ADD COLUMN is_truncated BOOLEAN NOT NULL DEFAULT FALSE'))
@@ -1,20 +1,48 @@
 from src.models.user import db
+from src.models.content_blob import ContentBlob
+from src.services.blob_store import blob_text, load_text, store_text
 from datetime import datetime
 
 class Content(db.Model):
+    __table_args__ = (
+        db.Index('ix_content_order_id', 'order_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
-    generated_content = db.Column(db.Text, nullable=False)
+    # Rows written before the blob store keep their text inline; new text lives in content_blob
+    inline_content = db.Column('generated_content', db.Text, nullable=False, default='')
+    blob_hash = db.Column(db.String(64), db.ForeignKey('content_blob.hash'), nullable=True)
     content_format = db.Column(db.String(20), default='markdown')  # markdown, html, plain_text
     quality_score = db.Column(db.Float, nullable=True)
     revision_count = db.Column(db.Integer, default=0)
     is_approved = db.Column(db.Boolean, default=False)
+    # The model was still cut off at max_tokens after the last allowed continuation
+    is_truncated = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Loaded only where the text is read (joinedload(Content.blob)); elsewhere the getter falls back to load_text()
+    blob = db.relationship(ContentBlob, lazy='select', viewonly=True)
+
     def __repr__(self):
         return f'<Content {self.id} for Order {self.order_id}>'
 
+    @property
+    def generated_content(self):
+        """Generated text, decompressed from the blob store when stored there"""
+        if self.blob_hash is None:
+            return self.inline_content
+        blob = self.__dict__.get('blob')
+        if blob is not None and blob.hash == self.blob_hash:
+            return blob_text(blob.hash, blob.codec, blob.data)
+        return load_text(self.blob_hash)
+
+    @generated_content.setter
+    def generated_content(self, text):
+        self.blob_hash = store_text(text)
+        self.inline_content = ''
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -24,6 +52,7 @@ class Content(db.Model):
             'quality_score': self.quality_score,
             'revision_count': self.revision_count,
             'is_approved': self.is_approved,
+            'is_truncated': self.is_truncated,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -0,0 +1,14 @@
+from src.models.user import db
+from datetime import datetime
+
+class ContentBlob(db.Model):
+    """Compressed generated text, stored once per distinct sha256 of its contents"""
+    hash = db.Column(db.String(64), primary_key=True)  # sha256 hex of the uncompressed UTF-8 text
+    codec = db.Column(db.String(10), nullable=False)  # zlib, zstd, raw
+    data = db.Column(db.LargeBinary, nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # uncompressed bytes
+    stored_size = db.Column(db.Integer, nullable=False)  # compressed bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ContentBlob {self.hash[:12]} {self.codec} {self.stored_size}/{self.size}>'
@@ -0,0 +1,23 @@
+from src.models.user import db
+from datetime import datetime
+
+class ContentDraft(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    partial_content = db.Column(db.Text, nullable=False, default='')
+    status = db.Column(db.String(20), default='streaming')  # streaming, interrupted, failed, completed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ContentDraft {self.id} for Order {self.order_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'partial_content': self.partial_content,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -2,6 +2,10 @@ from src.models.user import db
 from datetime import datetime
 
 class ContentTemplate(db.Model):
+    __table_args__ = (
+        db.Index('ix_content_template_content_type_is_active', 'content_type', 'is_active'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     content_type = db.Column(db.String(50), nullable=False)
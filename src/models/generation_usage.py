@@ -0,0 +1,40 @@
+from src.models.user import db
+from datetime import datetime
+
+# Tokens and words of each finished generation, the history max_tokens budgets are estimated from
+class GenerationUsage(db.Model):
+    __table_args__ = (
+        db.Index('ix_generation_usage_content_type_id', 'content_type', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
+    content_type = db.Column(db.String(50), nullable=False)
+    model = db.Column(db.String(100), nullable=True)
+    target_word_count = db.Column(db.Integer, nullable=False)
+    word_count = db.Column(db.Integer, nullable=False)
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    completion_tokens = db.Column(db.Integer, nullable=True)  # Summed over continuations; null when not reported
+    max_tokens = db.Column(db.Integer, nullable=False)  # Budget of the first request
+    continuations = db.Column(db.Integer, default=0)
+    finish_reason = db.Column(db.String(20), nullable=True)  # Of the last request: stop, length, content_filter
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GenerationUsage {self.id} for Order {self.order_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'content_type': self.content_type,
+            'model': self.model,
+            'target_word_count': self.target_word_count,
+            'word_count': self.word_count,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'max_tokens': self.max_tokens,
+            'continuations': self.continuations,
+            'finish_reason': self.finish_reason,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -3,6 +3,10 @@ from datetime import datetime
 import json
 
 class Order(db.Model):
+    __table_args__ = (
+        db.Index('ix_order_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content_type = db.Column(db.String(50), nullable=False)  # blog_post, article, social_media, marketing_copy, video_script
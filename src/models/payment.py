@@ -2,6 +2,11 @@ from src.models.user import db
 from datetime import datetime
 
 class Payment(db.Model):
+    __table_args__ = (
+        db.Index('ix_payment_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_payment_stripe_payment_id', 'stripe_payment_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
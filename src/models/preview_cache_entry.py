@@ -0,0 +1,11 @@
+from src.models.user import db
+from datetime import datetime
+
+class PreviewCacheEntry(db.Model):
+    fingerprint = db.Column(db.String(64), primary_key=True)  # sha256 of the normalized prompt
+    preview = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<PreviewCacheEntry {self.fingerprint[:12]}>'
@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.services.password_hashing import hash_password, verify_password, needs_rehash
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -25,10 +25,14 @@ class User(db.Model):
         return f'<User {self.username}>'
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """True when the stored hash predates the current hashing scheme or cost"""
+        return needs_rehash(self.password_hash)
 
     def to_dict(self):
         return {
@@ -0,0 +1,93 @@
+from flask import Blueprint, Response, jsonify, request, send_file
+from src.routes.auth import token_required, admin_required
+from src.services.llm_governor import llm_governor
+from src.services.llm_providers import llm_router
+from src.services.preview_cache import preview_cache
+from src.services.token_budget import token_budget
+from src.utils.compression import compression_stats
+from src.utils.profiler import list_profiles, profile_path, profile_summary
+from src.utils.static_manifest import static_manifest
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/admin/llm-governor', methods=['GET'])
+@token_required
+@admin_required
+def get_llm_governor_state(current_user):
+    """Admin endpoint to inspect rate-limit buckets, queue depth and backoff per model"""
+    return jsonify({'governor': llm_governor.snapshot()}), 200
+
+@admin_bp.route('/admin/llm-providers', methods=['GET'])
+@token_required
+@admin_required
+def get_llm_providers_state(current_user):
+    """Admin endpoint to inspect provider health scores, circuit state and hedging counts"""
+    return jsonify({'router': llm_router.snapshot()}), 200
+
+@admin_bp.route('/admin/token-budget', methods=['GET'])
+@token_required
+@admin_required
+def get_token_budget(current_user):
+    """Admin endpoint to inspect the tokens-per-word estimates behind max_tokens by content type"""
+    return jsonify({'token_budget': token_budget.snapshot()}), 200
+
+@admin_bp.route('/admin/preview-cache', methods=['GET'])
+@token_required
+@admin_required
+def get_preview_cache_stats(current_user):
+    """Admin endpoint to report preview cache hit and miss counts"""
+    return jsonify({'preview_cache': preview_cache.snapshot()}), 200
+
+@admin_bp.route('/admin/preview-cache', methods=['DELETE'])
+@token_required
+@admin_required
+def clear_preview_cache(current_user):
+    """Admin endpoint to drop this worker's in-memory preview cache"""
+    preview_cache.clear()
+    return jsonify({'message': 'Preview cache cleared'}), 200
+
+@admin_bp.route('/admin/compression', methods=['GET'])
+@token_required
+@admin_required
+def get_compression_stats(current_user):
+    """Admin endpoint to report this worker's response compression ratio and CPU time"""
+    return jsonify({'compression': compression_stats.snapshot()}), 200
+
+@admin_bp.route('/admin/static-manifest', methods=['GET'])
+@token_required
+@admin_required
+def get_static_manifest(current_user):
+    """Admin endpoint to list the static files this worker serves"""
+    return jsonify({'static_manifest': static_manifest.snapshot()}), 200
+
+@admin_bp.route('/admin/static-manifest/reload', methods=['POST'])
+@token_required
+@admin_required
+def reload_static_manifest(current_user):
+    """Admin endpoint to rescan the static folder after a frontend deploy (this worker only)"""
+    files = static_manifest.reload()
+    return jsonify({'message': f'Static manifest reloaded with {files} files'}), 200
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@token_required
+@admin_required
+def get_profiles(current_user):
+    """Admin endpoint to list profiles captured on this instance with X-Profile"""
+    return jsonify({'profiles': list_profiles()}), 200
+
+@admin_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@token_required
+@admin_required
+def download_profile(current_user, profile_id):
+    """Admin endpoint to download a .pstats file, or ?format=text for a summary"""
+    path = profile_path(profile_id)
+    if not path:
+        return jsonify({'message': 'Profile not found'}), 404
+    
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            return jsonify({'message': 'sort must be cumulative, tottime or calls'}), 400
+        return Response(profile_summary(path, sort), mimetype='text/plain')
+    
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=profile_id)
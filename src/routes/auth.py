@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.services.password_hashing import HashingPoolBusy
+from src.services.principal_cache import remember_user, resolve_principal
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
@@ -7,6 +9,17 @@ import os
 
 auth_bp = Blueprint('auth', __name__)
 
+def issue_token(user):
+    """Signed JWT carrying the claims token_required needs to skip the user lookup"""
+    now = datetime.utcnow()
+    return jwt.encode({
+        'user_id': user.id,
+        'is_admin': bool(user.is_admin),
+        'is_active': bool(user.is_active),
+        'iat': now,
+        'exp': now + timedelta(hours=24)
+    }, os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT'), algorithm='HS256')
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -24,18 +37,34 @@ def token_required(f):
         
         try:
             data = jwt.decode(token, os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT'), algorithms=['HS256'])
-            current_user = User.query.filter_by(id=data['user_id']).first()
+            current_user = resolve_principal(data)
             if not current_user:
                 return jsonify({'message': 'User not found'}), 401
+            if not current_user.is_active:
+                return jsonify({'message': 'Account is deactivated'}), 401
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
+        except (jwt.InvalidTokenError, KeyError):
             return jsonify({'message': 'Token is invalid'}), 401
         
         return f(current_user, *args, **kwargs)
     
     return decorated
 
+def principal_from_request():
+    """Principal for a valid bearer token on the current request, or None (never an error response)"""
+    parts = request.headers.get('Authorization', '').split(' ')
+    if len(parts) != 2:
+        return None
+    try:
+        data = jwt.decode(parts[1], os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT'), algorithms=['HS256'])
+        principal = resolve_principal(data)
+    except (jwt.InvalidTokenError, KeyError):
+        return None
+    if not principal or not principal.is_active:
+        return None
+    return principal
+
 def admin_required(f):
     @wraps(f)
     def decorated(current_user, *args, **kwargs):
@@ -79,6 +108,8 @@ def register():
             'user': user.to_dict_safe()
         }), 201
         
+    except HashingPoolBusy:
+        return jsonify({'message': 'Too many registrations in progress, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'message': 'Registration failed', 'error': str(e)}), 500
 
@@ -96,11 +127,14 @@ def login():
             if not user.is_active:
                 return jsonify({'message': 'Account is deactivated'}), 401
             
+            # Upgrade hashes made with an older scheme or cost while we have the password
+            if user.password_needs_rehash():
+                user.set_password(data['password'])
+                db.session.commit()
+            
             # Generate JWT token
-            token = jwt.encode({
-                'user_id': user.id,
-                'exp': datetime.utcnow() + timedelta(hours=24)
-            }, os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT'), algorithm='HS256')
+            token = issue_token(user)
+            remember_user(user)
             
             return jsonify({
                 'message': 'Login successful',
@@ -110,6 +144,8 @@ def login():
         
         return jsonify({'message': 'Invalid credentials'}), 401
         
+    except HashingPoolBusy:
+        return jsonify({'message': 'Too many login attempts in progress, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'message': 'Login failed', 'error': str(e)}), 500
 
@@ -124,11 +160,11 @@ def get_current_user(current_user):
 @token_required
 def refresh_token(current_user):
     try:
-        # Generate new JWT token
-        token = jwt.encode({
-            'user_id': current_user.id,
-            'exp': datetime.utcnow() + timedelta(hours=24)
-        }, os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT'), algorithm='HS256')
+        # Generate new JWT token from the current user row so claims are up to date
+        user = current_user.user
+        if not user:
+            return jsonify({'message': 'User not found'}), 401
+        token = issue_token(user)
         
         return jsonify({
             'message': 'Token refreshed successfully',
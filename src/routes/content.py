@@ -1,21 +1,31 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from src.models.user import db
 from src.models.order import Order
 from src.models.content import Content
+from src.models.content_draft import ContentDraft
+from src.models.job import Job
 from src.routes.auth import token_required, admin_required
-from src.services.content_generator import ContentGenerator
-import threading
+from src.services.job_queue import (
+    enqueue_job, find_active_job, find_active_stream, get_content_generator, queue_generation
+)
+from src.services.content_rescoring import RESCORE_CHUNK_SIZE
+from src.services.bulk_generation import (
+    BULK_GENERATE_DEFAULT_CONCURRENCY, BULK_GENERATE_MAX_ORDERS, bulk_concurrency
+)
+from src.utils.conditional import conditional, content_etag_for, is_not_modified, not_modified, order_version
+from src.utils.pagination import PaginationError, parse_datetime, parse_positive_int
+from sqlalchemy.orm import joinedload
+import json
 
 content_bp = Blueprint('content', __name__)
-content_generator = ContentGenerator()
 
 @content_bp.route('/generate/<int:order_id>', methods=['POST'])
 @token_required
 def generate_content(current_user, order_id):
-    """Generate content for a specific order"""
+    """Queue content generation for a specific order"""
     try:
-        # Get the order
-        order = Order.query.get_or_404(order_id)
+        # Lock the order so this and the streaming endpoint can't both start a generation
+        order = Order.query.filter_by(id=order_id).with_for_update().first_or_404()
         
         # Check if user owns the order or is admin
         if order.user_id != current_user.id and not current_user.is_admin:
@@ -25,31 +35,97 @@ def generate_content(current_user, order_id):
         if order.status not in ['pending', 'in_progress']:
             return jsonify({'message': 'Order cannot be processed in current status'}), 400
         
-        # Update order status to in_progress
-        order.status = 'in_progress'
+        # Reuse the job already queued for this order instead of generating twice
+        job = queue_generation(order, current_user.id)
+        if not job:
+            db.session.rollback()
+            return jsonify({'message': 'Content is already being streamed for this order'}), 409
         db.session.commit()
         
-        # Generate content in background (for demo, we'll do it synchronously)
-        result = content_generator.generate_content(order_id)
+        response = jsonify({
+            'message': 'Content generation queued',
+            'job': job.to_dict(),
+            'order': order.to_dict()
+        })
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response, 202
+            
+    except Exception as e:
+        return jsonify({'message': 'Content generation failed', 'error': str(e)}), 500
+
+@content_bp.route('/generate/<int:order_id>/stream', methods=['POST'])
+@token_required
+def stream_content(current_user, order_id):
+    """Generate content for a specific order, relaying tokens over Server-Sent Events"""
+    try:
+        # Lock the order so this and the queued endpoint can't both start a generation
+        order = Order.query.filter_by(id=order_id).with_for_update().first_or_404()
         
-        if result['success']:
-            return jsonify({
-                'message': 'Content generated successfully',
-                'content': result['content'],
-                'order': result['order']
-            }), 200
-        else:
-            # Revert order status on failure
-            order.status = 'pending'
-            db.session.commit()
+        # Check if user owns the order or is admin
+        if order.user_id != current_user.id and not current_user.is_admin:
+            return jsonify({'message': 'Access denied'}), 403
+        
+        # Check if order is in correct status
+        if order.status not in ['pending', 'in_progress']:
+            return jsonify({'message': 'Order cannot be processed in current status'}), 400
+        
+        # Don't race a queued background generation for the same order
+        job = find_active_job('generate_content', order.id)
+        if job:
+            db.session.rollback()
             return jsonify({
-                'message': 'Content generation failed',
-                'error': result['error']
-            }), 500
-            
+                'message': 'Content generation already queued for this order',
+                'job': job.to_dict()
+            }), 409
+        
+        if find_active_stream(order.id):
+            db.session.rollback()
+            return jsonify({'message': 'Content is already being streamed for this order'}), 409
+        
+        # Mark the draft as streaming in the same transaction, so the claim is visible once the lock is released
+        draft = ContentDraft.query.filter_by(order_id=order.id).first()
+        if not draft:
+            draft = ContentDraft(order_id=order.id)
+            db.session.add(draft)
+        draft.partial_content = ''
+        draft.status = 'streaming'
+        order.status = 'in_progress'
+        db.session.commit()
+        
+        def events():
+            for event, data in get_content_generator().stream_content(order_id):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        
+        response = Response(stream_with_context(events()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+        return response
+        
     except Exception as e:
         return jsonify({'message': 'Content generation failed', 'error': str(e)}), 500
 
+@content_bp.route('/content/<int:order_id>/draft', methods=['GET'])
+@token_required
+def get_content_draft(current_user, order_id):
+    """Get the partial text saved while streaming content for an order"""
+    try:
+        order = Order.query.get_or_404(order_id)
+        
+        # Check if user owns the order or is admin
+        if order.user_id != current_user.id and not current_user.is_admin:
+            return jsonify({'message': 'Access denied'}), 403
+        
+        draft = ContentDraft.query.filter_by(order_id=order.id).first()
+        if not draft:
+            return jsonify({'message': 'No draft found for this order'}), 404
+        
+        return jsonify({
+            'draft': draft.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch draft', 'error': str(e)}), 500
+
 @content_bp.route('/preview', methods=['POST'])
 @token_required
 def preview_content(current_user):
@@ -63,7 +139,7 @@ def preview_content(current_user):
             if field not in data:
                 return jsonify({'message': f'{field} is required'}), 400
         
-        result = content_generator.preview_content(
+        result = get_content_generator().preview_content(
             content_type=data['content_type'],
             title=data['title'],
             description=data.get('description', ''),
@@ -73,7 +149,8 @@ def preview_content(current_user):
         if result['success']:
             return jsonify({
                 'message': 'Preview generated successfully',
-                'preview': result['preview']
+                'preview': result['preview'],
+                'cached': result['cached']
             }), 200
         else:
             return jsonify({
@@ -89,18 +166,26 @@ def preview_content(current_user):
 def get_content(current_user, order_id):
     """Get generated content for an order"""
     try:
-        order = Order.query.get_or_404(order_id)
+        version = order_version(order_id)
+        if version is None:
+            return jsonify({'message': 'Order not found'}), 404
         
         # Check if user owns the order or is admin
-        if order.user_id != current_user.id and not current_user.is_admin:
+        user_id, _, etag = version
+        if user_id != current_user.id and not current_user.is_admin:
             return jsonify({'message': 'Access denied'}), 403
         
-        if not order.content:
+        if etag is None:
             return jsonify({'message': 'No content found for this order'}), 404
         
-        return jsonify({
-            'content': order.content.to_dict()
-        }), 200
+        # The article itself is never loaded or decompressed for an unchanged poll
+        if is_not_modified(etag):
+            return not_modified(etag)
+        
+        content = Content.query.options(joinedload(Content.blob)).filter_by(order_id=order_id).first_or_404()
+        return conditional(jsonify({
+            'content': content.to_dict()
+        }), content_etag_for(content)), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch content', 'error': str(e)}), 500
@@ -110,7 +195,7 @@ def get_content(current_user, order_id):
 def approve_content(current_user, content_id):
     """Approve generated content"""
     try:
-        content = Content.query.get_or_404(content_id)
+        content = Content.query.options(joinedload(Content.order)).get_or_404(content_id)
         order = content.order
         
         # Check if user owns the order or is admin
@@ -133,7 +218,7 @@ def approve_content(current_user, content_id):
 def request_revision(current_user, content_id):
     """Request revision for generated content"""
     try:
-        content = Content.query.get_or_404(content_id)
+        content = Content.query.options(joinedload(Content.order)).get_or_404(content_id)
         order = content.order
         
         # Check if user owns the order or is admin
@@ -169,9 +254,15 @@ def request_revision(current_user, content_id):
 @token_required
 @admin_required
 def admin_regenerate_content(current_user, order_id):
-    """Admin endpoint to regenerate content for any order"""
+    """Admin endpoint to queue regeneration of content for any order"""
     try:
-        order = Order.query.get_or_404(order_id)
+        # Lock the order so this can't race /generate or a stream starting for it
+        order = Order.query.filter_by(id=order_id).with_for_update().first_or_404()
+        
+        job = queue_generation(order, current_user.id)
+        if not job:
+            db.session.rollback()
+            return jsonify({'message': 'Content is already being streamed for this order'}), 409
         
         # Delete existing content if any
         if order.content:
@@ -181,21 +272,109 @@ def admin_regenerate_content(current_user, order_id):
         order.status = 'in_progress'
         db.session.commit()
         
-        # Generate new content
-        result = content_generator.generate_content(order_id)
-        
-        if result['success']:
-            return jsonify({
-                'message': 'Content regenerated successfully',
-                'content': result['content'],
-                'order': result['order']
-            }), 200
-        else:
-            return jsonify({
-                'message': 'Content regeneration failed',
-                'error': result['error']
-            }), 500
+        response = jsonify({
+            'message': 'Content regeneration queued',
+            'job': job.to_dict(),
+            'order': order.to_dict()
+        })
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response, 202
             
     except Exception as e:
         return jsonify({'message': 'Content regeneration failed', 'error': str(e)}), 500
 
+
+@content_bp.route('/admin/bulk-generate', methods=['POST'])
+@token_required
+@admin_required
+def admin_bulk_generate(current_user):
+    """Admin endpoint to queue generation for every order matching a filter"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        query = Order.query.filter(Order.status.in_(data.get('status') or ['pending', 'in_progress']))
+        if data.get('order_ids'):
+            query = query.filter(Order.id.in_(data['order_ids']))
+        if data.get('content_type'):
+            query = query.filter(Order.content_type == data['content_type'])
+        if data.get('user_id'):
+            query = query.filter(Order.user_id == data['user_id'])
+        if data.get('created_after'):
+            query = query.filter(Order.created_at >= parse_datetime(data['created_after'], 'created_after'))
+        if data.get('created_before'):
+            query = query.filter(Order.created_at < parse_datetime(data['created_before'], 'created_before'))
+        
+        limit = parse_positive_int(data.get('limit', BULK_GENERATE_MAX_ORDERS), 'limit', BULK_GENERATE_MAX_ORDERS)
+        order_ids = [row.id for row in query.with_entities(Order.id).order_by(Order.created_at, Order.id).limit(limit)]
+        
+        if not order_ids:
+            return jsonify({'message': 'No orders match the filter'}), 400
+        
+        concurrency = bulk_concurrency(
+            parse_positive_int(data.get('concurrency', BULK_GENERATE_DEFAULT_CONCURRENCY), 'concurrency')
+        )
+        job = enqueue_job(
+            'bulk_generate',
+            {'order_ids': order_ids, 'concurrency': concurrency},
+            user_id=current_user.id,
+            max_attempts=1
+        )
+        
+        response = jsonify({
+            'message': f'Bulk generation queued for {len(order_ids)} orders',
+            'job': job.to_dict()
+        })
+        response.headers['Location'] = f'/api/admin/bulk-generate/{job.id}'
+        return response, 202
+        
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': 'Failed to queue bulk generation', 'error': str(e)}), 500
+
+@content_bp.route('/admin/bulk-generate/<int:job_id>', methods=['GET'])
+@token_required
+@admin_required
+def admin_bulk_generate_status(current_user, job_id):
+    """Admin endpoint to report progress of a bulk generation"""
+    try:
+        job = Job.query.filter_by(id=job_id, kind='bulk_generate').first()
+        if not job:
+            return jsonify({'message': 'Bulk generation not found'}), 404
+        
+        progress = job.get_result()
+        if not progress:
+            # Not started yet
+            progress = {'total': len(job.get_payload().get('order_ids', [])), 'done': 0, 'failed': 0, 'skipped': 0, 'in_flight': 0}
+        
+        return jsonify({
+            'job': job.to_dict(),
+            'progress': progress
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch bulk generation', 'error': str(e)}), 500
+
+@content_bp.route('/admin/content/rescore', methods=['POST'])
+@token_required
+@admin_required
+def admin_rescore_content(current_user):
+    """Admin endpoint to queue re-scoring of all stored content with the current formula"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        job = enqueue_job(
+            'rescore_content',
+            {'chunk_size': int(data.get('chunk_size', RESCORE_CHUNK_SIZE))},
+            user_id=current_user.id
+        )
+        
+        response = jsonify({
+            'message': 'Content re-scoring queued',
+            'job': job.to_dict()
+        })
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response, 202
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to queue re-scoring', 'error': str(e)}), 500
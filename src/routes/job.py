@@ -0,0 +1,34 @@
+from flask import Blueprint, jsonify
+from src.models.order import Order
+from src.models.content import Content
+from src.models.job import Job
+from src.routes.auth import token_required
+from sqlalchemy.orm import joinedload
+
+job_bp = Blueprint('job', __name__)
+
+@job_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    """Get the status of a background job"""
+    try:
+        job = Job.query.get_or_404(job_id)
+
+        # Check if user requested the job or is admin
+        if job.user_id != current_user.id and not current_user.is_admin:
+            return jsonify({'message': 'Access denied'}), 403
+
+        job_data = job.to_dict()
+
+        # Include the order and its content once generation has finished
+        if job.order_id and job.status in ['completed', 'failed']:
+            order = Order.query.options(joinedload(Order.content).joinedload(Content.blob)).get(job.order_id)
+            if order:
+                job_data['order'] = order.to_dict()
+                if order.content:
+                    job_data['content'] = order.content.to_dict()
+
+        return jsonify({'job': job_data}), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch job', 'error': str(e)}), 500
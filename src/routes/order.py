@@ -2,9 +2,20 @@ from flask import Blueprint, jsonify, request
 from src.models.user import db
 from src.models.order import Order
 from src.models.content import Content
-from src.models.content_template import ContentTemplate
 from src.routes.auth import token_required, admin_required
+from src.services.template_registry import template_registry
+from src.utils.conditional import (
+    CONTENT_TEMPLATES_MAX_AGE, conditional, is_not_modified, make_etag, not_modified, order_etag, order_version
+)
+from src.utils.pagination import PaginationError, filter_created_range, keyset_paginate, parse_list
+from src.utils.serialization import (
+    CONTENT_FIELDS, ORDER_FIELDS, FieldSelectionError, json_response, parse_fields, select_columns, serialize_rows
+)
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
 from datetime import datetime
+import json
+import os
 
 order_bp = Blueprint('order', __name__)
 
@@ -13,55 +24,108 @@ order_bp = Blueprint('order', __name__)
 def get_orders(current_user):
     try:
         if current_user.is_admin:
-            orders = Order.query.all()
+            query = Order.query
+            if request.args.get('user_id'):
+                query = query.filter_by(user_id=request.args.get('user_id', type=int))
         else:
-            orders = Order.query.filter_by(user_id=current_user.id).all()
+            query = Order.query.filter_by(user_id=current_user.id)
         
-        return jsonify({
-            'orders': [order.to_dict() for order in orders]
-        }), 200
+        # Optional filters
+        if request.args.get('status'):
+            query = query.filter(Order.status.in_(parse_list(request.args['status'])))
+        if request.args.get('content_type'):
+            query = query.filter(Order.content_type.in_(parse_list(request.args['content_type'])))
+        if request.args.get('priority'):
+            query = query.filter(Order.priority.in_(parse_list(request.args['priority'])))
+        query = filter_created_range(query, Order, request.args)
+        
+        # Only the requested columns are read, as plain rows instead of ORM objects
+        fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        query = select_columns(query, ORDER_FIELDS, fields)
+        
+        orders, next_cursor = keyset_paginate(query, Order, request.args)
+        orders_data = serialize_rows(orders, ORDER_FIELDS, fields)
+        
+        # ?include=content loads every page's content in one extra query
+        if 'content' in parse_list(request.args.get('include', '')):
+            content_fields = parse_fields(request.args.get('content_fields'), CONTENT_FIELDS)
+            contents = {}
+            if orders:
+                content_rows = select_columns(
+                    Content.query.filter(Content.order_id.in_([order.id for order in orders])),
+                    CONTENT_FIELDS,
+                    content_fields,
+                    always=('order_id',)
+                ).all()
+                for row, content_data in zip(content_rows, serialize_rows(content_rows, CONTENT_FIELDS, content_fields)):
+                    contents[row.order_id] = content_data
+            for order, order_data in zip(orders, orders_data):
+                order_data['content'] = contents.get(order.id)
         
+        return json_response({
+            'orders': orders_data,
+            'next_cursor': next_cursor
+        })
+        
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch orders', 'error': str(e)}), 500
 
+ORDER_BATCH_LIMIT = int(os.environ.get('ORDER_BATCH_LIMIT', 200))
+ORDER_PRIORITIES = ('low', 'medium', 'high')
+
+def build_order_values(data, user_id):
+    """Validate an order spec and price it; returns (column values, error message)"""
+    if not isinstance(data, dict):
+        return None, 'Order must be an object'
+    
+    # Validate required fields
+    required_fields = ['content_type', 'title']
+    for field in required_fields:
+        if field not in data:
+            return None, f'{field} is required'
+    
+    # Get content template for pricing
+    template = template_registry.get(data['content_type'])
+    
+    if not template:
+        return None, 'Invalid content type'
+    
+    word_count = data.get('word_count', template.default_word_count)
+    if isinstance(word_count, bool) or not isinstance(word_count, int) or word_count <= 0:
+        return None, 'word_count must be a positive integer'
+    
+    priority = data.get('priority', 'medium')
+    if priority not in ORDER_PRIORITIES:
+        return None, f"priority must be one of {', '.join(ORDER_PRIORITIES)}"
+    
+    # Calculate price based on word count
+    price = template.base_price * (word_count / template.default_word_count)
+    
+    return {
+        'user_id': user_id,
+        'content_type': data['content_type'],
+        'title': data['title'],
+        'description': data.get('description', ''),
+        'requirements': json.dumps(data['requirements']) if data.get('requirements') else None,
+        'word_count': word_count,
+        'price': round(price, 2),
+        'priority': priority
+    }, None
+
 @order_bp.route('/orders', methods=['POST'])
 @token_required
 def create_order(current_user):
     try:
         data = request.get_json()
         
-        # Validate required fields
-        required_fields = ['content_type', 'title']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'message': f'{field} is required'}), 400
-        
-        # Get content template for pricing
-        template = ContentTemplate.query.filter_by(
-            content_type=data['content_type'],
-            is_active=True
-        ).first()
-        
-        if not template:
-            return jsonify({'message': 'Invalid content type'}), 400
-        
-        # Calculate price based on word count
-        word_count = data.get('word_count', template.default_word_count)
-        price = template.base_price * (word_count / template.default_word_count)
+        values, error = build_order_values(data, current_user.id)
+        if error:
+            return jsonify({'message': error}), 400
         
         # Create new order
-        order = Order(
-            user_id=current_user.id,
-            content_type=data['content_type'],
-            title=data['title'],
-            description=data.get('description', ''),
-            word_count=word_count,
-            price=round(price, 2),
-            priority=data.get('priority', 'medium')
-        )
-        
-        if data.get('requirements'):
-            order.set_requirements(data['requirements'])
+        order = Order(**values)
         
         db.session.add(order)
         db.session.commit()
@@ -74,23 +138,92 @@ def create_order(current_user):
     except Exception as e:
         return jsonify({'message': 'Failed to create order', 'error': str(e)}), 500
 
+@order_bp.route('/orders/batch', methods=['POST'])
+@token_required
+def create_orders_batch(current_user):
+    """Create many orders in one request with a single bulk insert and commit"""
+    try:
+        data = request.get_json() or {}
+        specs = data.get('orders')
+        
+        if not isinstance(specs, list) or not specs:
+            return jsonify({'message': 'orders must be a non-empty list'}), 400
+        
+        if len(specs) > ORDER_BATCH_LIMIT:
+            return jsonify({'message': f'At most {ORDER_BATCH_LIMIT} orders can be created per batch'}), 400
+        
+        # Validate everything first; templates come from the in-memory registry
+        results = []
+        rows = []
+        for index, spec in enumerate(specs):
+            values, error = build_order_values(spec, current_user.id)
+            if error:
+                results.append({'index': index, 'success': False, 'error': error})
+            else:
+                results.append({'index': index, 'success': True})
+                rows.append(values)
+        
+        failed = len(specs) - len(rows)
+        
+        # atomic=true rejects the whole batch if any item is invalid
+        if failed and (data.get('atomic') or not rows):
+            return jsonify({
+                'message': 'No orders were created',
+                'created': 0,
+                'failed': failed,
+                'results': results
+            }), 400
+        
+        # One multi-row INSERT ... RETURNING; rows come back in the order they were sent
+        orders = db.session.scalars(
+            insert(Order).returning(Order, sort_by_parameter_order=True),
+            rows
+        ).all()
+        
+        # Serialize before commit so the returned rows aren't expired and re-selected
+        created = iter(orders)
+        for result in results:
+            if result['success']:
+                result['order'] = next(created).to_dict()
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Orders created successfully' if not failed else 'Some orders were created',
+            'created': len(orders),
+            'failed': failed,
+            'results': results
+        }), 201 if not failed else 207
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Failed to create orders', 'error': str(e)}), 500
+
 @order_bp.route('/orders/<int:order_id>', methods=['GET'])
 @token_required
 def get_order(current_user, order_id):
     try:
-        order = Order.query.get_or_404(order_id)
+        # Answer polls from the version columns alone when nothing has changed
+        version = order_version(order_id)
+        if version is None:
+            return jsonify({'message': 'Order not found'}), 404
         
         # Check if user owns the order or is admin
-        if order.user_id != current_user.id and not current_user.is_admin:
+        user_id, etag, _ = version
+        if user_id != current_user.id and not current_user.is_admin:
             return jsonify({'message': 'Access denied'}), 403
         
+        if is_not_modified(etag):
+            return not_modified(etag)
+        
+        order = Order.query.options(joinedload(Order.content).joinedload(Content.blob)).get_or_404(order_id)
         order_data = order.to_dict()
         
         # Include content if available
         if order.content:
             order_data['content'] = order.content.to_dict()
         
-        return jsonify({'order': order_data}), 200
+        return conditional(jsonify({'order': order_data}), order_etag(order)), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch order', 'error': str(e)}), 500
@@ -157,10 +290,16 @@ def delete_order(current_user, order_id):
 @order_bp.route('/content-templates', methods=['GET'])
 def get_content_templates():
     try:
-        templates = ContentTemplate.query.filter_by(is_active=True).all()
-        return jsonify({
+        etag = make_etag('templates', template_registry.version())
+        cache_control = f'public, max-age={CONTENT_TEMPLATES_MAX_AGE}'
+        if is_not_modified(etag):
+            return not_modified(etag, cache_control)
+        
+        templates = template_registry.active_templates()
+        response = jsonify({
             'templates': [template.to_dict() for template in templates]
-        }), 200
+        })
+        return conditional(response, etag, cache_control), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch templates', 'error': str(e)}), 500
@@ -3,6 +3,9 @@ from src.models.user import db
 from src.models.order import Order
 from src.models.payment import Payment
 from src.routes.auth import token_required
+from src.services.job_queue import queue_generation
+from src.utils.pagination import PaginationError, filter_created_range, keyset_paginate, parse_list
+from src.utils.serialization import PAYMENT_FIELDS, FieldSelectionError, json_response, parse_fields, select_columns, serialize_rows
 from datetime import datetime
 import uuid
 
@@ -79,32 +82,31 @@ def confirm_payment(current_user):
         if payment.user_id != current_user.id:
             return jsonify({'message': 'Access denied'}), 403
         
+        # Lock the order so the generation queued below can't race /generate or a stream
+        order = Order.query.filter_by(id=payment.order_id).with_for_update().first()
+        
         # For demo purposes, we'll always simulate successful payment
         # In a real application, you would verify the payment with Stripe
         payment.status = 'completed'
         payment.updated_at = datetime.utcnow()
         
-        # Update the order status to trigger content generation
-        order = payment.order
-        if order.status == 'pending':
-            order.status = 'in_progress'
-            order.updated_at = datetime.utcnow()
+        # Queue content generation after payment; the worker runs it, so confirming never waits on the LLM
+        job = None
+        if order.status in ['pending', 'in_progress']:
+            job = queue_generation(order, current_user.id)
         
         db.session.commit()
         
-        # Trigger content generation (in a real app, this would be async)
-        from src.services.content_generator import ContentGenerator
-        content_generator = ContentGenerator()
-        
-        # Generate content automatically after payment
-        generation_result = content_generator.generate_content(order.id)
-        
-        return jsonify({
+        response = jsonify({
             'message': 'Payment confirmed successfully',
             'payment': payment.to_dict(),
             'order': order.to_dict(),
-            'content_generated': generation_result['success']
-        }), 200
+            'job': job.to_dict() if job else None
+        })
+        if not job:
+            return response, 200
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response, 202
         
     except Exception as e:
         return jsonify({'message': 'Failed to confirm payment', 'error': str(e)}), 500
@@ -114,12 +116,23 @@ def confirm_payment(current_user):
 def get_payment_history(current_user):
     """Get payment history for the current user"""
     try:
-        payments = Payment.query.filter_by(user_id=current_user.id).order_by(Payment.created_at.desc()).all()
+        query = Payment.query.filter_by(user_id=current_user.id)
+        if request.args.get('status'):
+            query = query.filter(Payment.status.in_(parse_list(request.args['status'])))
+        query = filter_created_range(query, Payment, request.args)
         
-        return jsonify({
-            'payments': [payment.to_dict() for payment in payments]
-        }), 200
+        fields = parse_fields(request.args.get('fields'), PAYMENT_FIELDS)
+        query = select_columns(query, PAYMENT_FIELDS, fields)
+        
+        payments, next_cursor = keyset_paginate(query, Payment, request.args)
         
+        return json_response({
+            'payments': serialize_rows(payments, PAYMENT_FIELDS, fields),
+            'next_cursor': next_cursor
+        })
+        
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch payment history', 'error': str(e)}), 500
 
@@ -184,12 +197,25 @@ def admin_get_all_payments(current_user):
         return jsonify({'message': 'Admin access required'}), 403
     
     try:
-        payments = Payment.query.order_by(Payment.created_at.desc()).all()
+        query = Payment.query
+        if request.args.get('user_id'):
+            query = query.filter_by(user_id=request.args.get('user_id', type=int))
+        if request.args.get('status'):
+            query = query.filter(Payment.status.in_(parse_list(request.args['status'])))
+        query = filter_created_range(query, Payment, request.args)
         
-        return jsonify({
-            'payments': [payment.to_dict() for payment in payments]
-        }), 200
+        fields = parse_fields(request.args.get('fields'), PAYMENT_FIELDS)
+        query = select_columns(query, PAYMENT_FIELDS, fields)
+        
+        payments, next_cursor = keyset_paginate(query, Payment, request.args)
+        
+        return json_response({
+            'payments': serialize_rows(payments, PAYMENT_FIELDS, fields),
+            'next_cursor': next_cursor
+        })
         
+    except (PaginationError, FieldSelectionError) as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch payments', 'error': str(e)}), 500
 
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import bindparam, select, update
+from src.models.user import db
+from src.models.content_blob import ContentBlob
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is always available
+    zstandard = None
+
+# Codec for new blobs; blobs already stored keep the codec recorded on their row
+CONTENT_BLOB_CODEC = os.environ.get('CONTENT_BLOB_CODEC', 'zlib')
+CONTENT_BLOB_LEVEL = int(os.environ.get('CONTENT_BLOB_LEVEL', 6))
+# Texts shorter than this are stored uncompressed; the codec header would outweigh the savings
+CONTENT_BLOB_MIN_SIZE = int(os.environ.get('CONTENT_BLOB_MIN_SIZE', 256))
+CONTENT_BLOB_CACHE_SIZE = int(os.environ.get('CONTENT_BLOB_CACHE_SIZE', 512))
+
+
+def _zstd_compress(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+_codecs = {
+    'raw': (lambda data, level: data, lambda data: data),
+    'zlib': (zlib.compress, zlib.decompress)
+}
+if zstandard is not None:
+    _codecs['zstd'] = (_zstd_compress, _zstd_decompress)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress_text(text, codec=None, level=None):
+    """(codec, compressed bytes, uncompressed size) for a text"""
+    raw = text.encode('utf-8')
+    codec = codec or CONTENT_BLOB_CODEC
+    if len(raw) < CONTENT_BLOB_MIN_SIZE:
+        return 'raw', raw, len(raw)
+    if codec not in _codecs:
+        raise ValueError(f'Unknown content blob codec {codec}')
+    compressed = _codecs[codec][0](raw, CONTENT_BLOB_LEVEL if level is None else level)
+    # Incompressible text is cheaper to read back as-is
+    if len(compressed) >= len(raw):
+        return 'raw', raw, len(raw)
+    return codec, compressed, len(raw)
+
+
+def decompress_text(codec, data):
+    if codec not in _codecs:
+        raise ValueError(f'Content blob codec {codec} is not available')
+    return _codecs[codec][1](bytes(data)).decode('utf-8')
+
+
+class _TextCache:
+    """Small LRU of decompressed texts; safe to share because blobs never change"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_text_cache = _TextCache(CONTENT_BLOB_CACHE_SIZE)
+
+
+def blob_text(blob_hash, codec, data):
+    """Decompressed text of a blob row, memoized by hash"""
+    text = _text_cache.get(blob_hash)
+    if text is None:
+        text = decompress_text(codec, data)
+        _text_cache.put(blob_hash, text)
+    return text
+
+
+def _insert_ignoring_duplicates(conn, rows):
+    """Insert blob rows, skipping hashes that are already stored (possibly by a concurrent writer)"""
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        existing = set(conn.execute(
+            select(ContentBlob.hash).where(ContentBlob.hash.in_([row['hash'] for row in rows]))
+        ).scalars())
+        rows = [row for row in rows if row['hash'] not in existing]
+        if rows:
+            conn.execute(ContentBlob.__table__.insert(), rows)
+        return
+    conn.execute(insert(ContentBlob.__table__).on_conflict_do_nothing(index_elements=['hash']), rows)
+
+
+def _blob_row(text):
+    codec, data, size = compress_text(text)
+    return {
+        'hash': content_hash(text),
+        'codec': codec,
+        'data': data,
+        'size': size,
+        'stored_size': len(data),
+        'created_at': datetime.utcnow()
+    }
+
+
+def store_text(text):
+    """Store a text in the current session's transaction and return its hash"""
+    row = _blob_row(text)
+    _insert_ignoring_duplicates(db.session.connection(), [row])
+    _text_cache.put(row['hash'], text)
+    return row['hash']
+
+
+def load_text(blob_hash):
+    """Text for a hash, from the cache or the content_blob table"""
+    text = _text_cache.get(blob_hash)
+    if text is not None:
+        return text
+    row = db.session.execute(
+        select(ContentBlob.codec, ContentBlob.data).where(ContentBlob.hash == blob_hash)
+    ).first()
+    if row is None:
+        raise LookupError(f'Content blob {blob_hash} is missing')
+    return blob_text(blob_hash, row.codec, row.data)
+
+
+def move_inline_content(conn, chunk_size=500, log=None):
+    """Move content.generated_content still stored inline into blobs, chunk by chunk.
+
+    Safe to re-run: a row only leaves the inline column once its blob exists.
+    """
+    from src.models.content import Content
+
+    content = Content.__table__
+    move = update(content).where(content.c.id == bindparam('content_id')).values(
+        blob_hash=bindparam('new_blob_hash'),
+        generated_content=''
+    )
+    moved = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(content.c.id, content.c.generated_content).where(
+                content.c.id > last_id,
+                content.c.blob_hash.is_(None),
+                content.c.generated_content != ''
+            ).order_by(content.c.id).limit(chunk_size)
+        ).fetchall()
+        if not rows:
+            break
+
+        blob_rows = {}
+        assignments = []
+        for content_id, text in rows:
+            blob_row = _blob_row(text)
+            blob_rows[blob_row['hash']] = blob_row
+            assignments.append({'content_id': content_id, 'new_blob_hash': blob_row['hash']})
+        _insert_ignoring_duplicates(conn, list(blob_rows.values()))
+        conn.execute(move, assignments)
+
+        last_id = rows[-1][0]
+        moved += len(rows)
+        if log:
+            log(f'Moved {moved} content rows into blobs')
+    return moved
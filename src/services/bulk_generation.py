@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from flask import current_app
+from src.models.user import db
+from src.models.order import Order
+from src.services.job_queue import enqueue_job, find_active_job, find_active_stream, heartbeat, job_handler, run_job
+from src.services.llm_governor import process_concurrency
+
+BULK_GENERATE_DEFAULT_CONCURRENCY = int(os.environ.get('BULK_GENERATE_DEFAULT_CONCURRENCY', 4))
+BULK_GENERATE_MAX_CONCURRENCY = int(os.environ.get('BULK_GENERATE_MAX_CONCURRENCY', 16))
+BULK_GENERATE_MAX_ORDERS = int(os.environ.get('BULK_GENERATE_MAX_ORDERS', 5000))
+# Progress is saved, and the bulk job's lease renewed, at least this often
+BULK_GENERATE_PROGRESS_INTERVAL = float(os.environ.get('BULK_GENERATE_PROGRESS_INTERVAL', 2))
+MAX_REPORTED_FAILURES = 50
+
+
+def bulk_concurrency(requested):
+    """Parallel generations for a bulk run: more than this process's governor slots would only queue
+    in the governor until GovernorTimeout"""
+    return min(max(requested, 1), BULK_GENERATE_MAX_CONCURRENCY, process_concurrency())
+
+
+def _generate_one(app, order_id, worker_id):
+    """Claim one order like /generate does and run its generation job inline, in its own DB session"""
+    with app.app_context():
+        try:
+            # Lock the order so /generate and /stream can't start a generation alongside this one
+            order = Order.query.filter_by(id=order_id).with_for_update().first()
+            if not order or order.status not in ['pending', 'in_progress']:
+                db.session.rollback()
+                return 'skipped', None
+
+            # Leave orders that already have a queued or running generation to it
+            if find_active_job('generate_content', order_id) or find_active_stream(order_id):
+                db.session.rollback()
+                return 'skipped', None
+
+            # A generate_content job claimed by this worker marks the order as taken, renews its own lease
+            # while the provider is called and reverts the order if it fails
+            order.status = 'in_progress'
+            job = enqueue_job(
+                'generate_content',
+                {'order_id': order_id},
+                order_id=order_id,
+                user_id=order.user_id,
+                max_attempts=1,
+                commit=False,
+                locked_by=worker_id
+            )
+            db.session.commit()
+
+            run_job(job)
+            if job.status == 'completed':
+                return 'done', None
+            return 'failed', job.last_error
+        finally:
+            db.session.remove()
+
+
+@job_handler('bulk_generate')
+def bulk_generate_job(job):
+    """Generate content for a fixed set of orders with bounded parallelism"""
+    payload = job.get_payload()
+    order_ids = payload.get('order_ids', [])
+    concurrency = bulk_concurrency(int(payload.get('concurrency', BULK_GENERATE_DEFAULT_CONCURRENCY)))
+    app = current_app._get_current_object()
+    worker_id = job.locked_by
+
+    progress = {
+        'total': len(order_ids),
+        'done': 0,
+        'failed': 0,
+        'skipped': 0,
+        'in_flight': 0,
+        'concurrency': concurrency,
+        'failures': []
+    }
+    lock = threading.Lock()
+
+    def tracked(order_id):
+        with lock:
+            progress['in_flight'] += 1
+        try:
+            return _generate_one(app, order_id, worker_id)
+        except Exception as e:
+            return 'failed', str(e)
+        finally:
+            with lock:
+                progress['in_flight'] -= 1
+
+    def publish():
+        with lock:
+            snapshot = dict(progress, failures=list(progress['failures']))
+        job.set_result(snapshot)
+        heartbeat(job)
+
+    last_published = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bulk-generate') as pool:
+        futures = {pool.submit(tracked, order_id): order_id for order_id in order_ids}
+        pending = set(futures)
+        while pending:
+            # Wakes at least every interval, so the lease is renewed even while every generation is slow
+            done, pending = wait(pending, timeout=BULK_GENERATE_PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome, error = future.result()
+                with lock:
+                    progress[outcome] += 1
+                    if error and len(progress['failures']) < MAX_REPORTED_FAILURES:
+                        progress['failures'].append({'order_id': futures[future], 'error': error})
+
+            if time.monotonic() - last_published >= BULK_GENERATE_PROGRESS_INTERVAL:
+                publish()
+                last_published = time.monotonic()
+
+    return dict(progress, failures=list(progress['failures']))
@@ -1,73 +1,70 @@
-import openai
 import os
-from src.models.content_template import ContentTemplate
+import time
 from src.models.content import Content
+from src.models.content_draft import ContentDraft
+from src.models.generation_usage import GenerationUsage
 from src.models.order import Order
 from src.models.user import db
+from src.services.llm_providers import llm_router
+from src.services.preview_cache import fingerprint, preview_cache
+from src.services.template_registry import template_registry
+from src.services.token_budget import token_budget
+from src.services.text_analytics import quality_score as calculate_quality_score
+from src.utils.metrics import record_generation
+
+STREAM_CHECKPOINT_CHARS = int(os.environ.get('STREAM_CHECKPOINT_CHARS', 500))
+STREAM_CHECKPOINT_SECONDS = float(os.environ.get('STREAM_CHECKPOINT_SECONDS', 3))
+# Follow-up requests allowed when the model stops at max_tokens (finish_reason 'length')
+GENERATION_MAX_CONTINUATIONS = int(os.environ.get('GENERATION_MAX_CONTINUATIONS', 3))
+
+CONTINUE_PROMPT = "Continue exactly where you stopped. Do not repeat earlier text or add any introduction."
 
 class ContentGenerator:
-    def __init__(self):
-        # OpenAI API key is already set in environment variables
-        self.client = openai.OpenAI()
+    def __init__(self, router=None):
+        # Providers, models and API keys come from LLM_PROVIDERS (or OPENAI_* for a single backend)
+        self.router = router or llm_router
     
-    def generate_content(self, order_id):
-        """Generate content for a given order"""
+    def generate_content(self, order_id, keep_alive=None):
+        """Generate content for a given order, calling keep_alive before every request to the provider"""
+        content_type = None
         try:
             # Get the order
             order = Order.query.get(order_id)
             if not order:
                 raise ValueError("Order not found")
+            content_type = order.content_type
             
             # Get the content template
-            template = ContentTemplate.query.filter_by(
-                content_type=order.content_type,
-                is_active=True
-            ).first()
+            template = template_registry.get(order.content_type)
             
             if not template:
                 raise ValueError("Content template not found")
             
-            # Build the prompt
-            prompt = self._build_prompt(order, template)
-            
-            # Generate content using OpenAI
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a professional content writer. Create high-quality, engaging content based on the user's requirements."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=min(order.word_count * 2, 4000),  # Rough estimate for token limit
-                temperature=0.7
-            )
-            
-            generated_text = response.choices[0].message.content
-            
-            # Calculate quality score (simple heuristic)
-            quality_score = self._calculate_quality_score(generated_text, order.word_count)
+            # Generate content on the healthiest configured provider, picking up where a max_tokens cut-off stopped it
+            request = self._generation_request(order, template)
+            parts = []
+            usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+            for continuations in range(GENERATION_MAX_CONTINUATIONS + 1):
+                response = self.router.create_chat_completion(
+                    'generation',
+                    on_attempt=keep_alive,
+                    **(self._continuation_request(request, parts) if parts else request)
+                )
+                choice = response.choices[0]
+                parts.append(choice.message.content or '')
+                self._add_usage(usage, response.usage)
+                if choice.finish_reason != 'length':
+                    break
             
-            # Save the generated content
-            content = Content(
-                order_id=order.id,
-                generated_content=generated_text,
-                content_format='markdown',
-                quality_score=quality_score,
-                is_approved=quality_score > 0.7  # Auto-approve if quality is good
-            )
-            
-            db.session.add(content)
+            # Still cut off after the last continuation: keep the paid-for text and flag it
+            truncated = choice.finish_reason == 'length'
+            generated_text = ''.join(parts)
             
-            # Update order status
-            order.status = 'completed'
-            order.updated_at = db.func.now()
+            content = self._save_content(order, generated_text, truncated)
+            self._record_usage(order, generated_text, request, usage, response.model, choice.finish_reason, continuations)
             
             db.session.commit()
+            record_generation(content_type, 'truncated' if truncated else 'success')
             
             return {
                 'success': True,
@@ -77,11 +74,224 @@ class ContentGenerator:
             
         except Exception as e:
             db.session.rollback()
+            record_generation(content_type, 'failure')
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def stream_content(self, order_id):
+        """Generate content for an order whose draft the caller has claimed as streaming, yielding (event, data) pairs as tokens arrive"""
+        stream = None
+        draft = None
+        parts = []
+        finished = False
+        content_type = None
+        
+        try:
+            order = Order.query.get(order_id)
+            if not order:
+                raise ValueError("Order not found")
+            content_type = order.content_type
+            
+            template = template_registry.get(order.content_type)
+            
+            if not template:
+                raise ValueError("Content template not found")
+            
+            # Claimed and reset by the stream route while it held the order lock
+            draft = ContentDraft.query.filter_by(order_id=order.id, status='streaming').first()
+            if not draft:
+                raise ValueError("Content draft not claimed for streaming")
+            
+            yield 'start', {'order_id': order.id, 'draft_id': draft.id}
+            
+            request = self._generation_request(order, template)
+            usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+            model = None
+            unsaved_chars = 0
+            last_checkpoint = time.monotonic()
+            
+            # A max_tokens cut-off is continued by another streamed request; the client sees one stream
+            for continuations in range(GENERATION_MAX_CONTINUATIONS + 1):
+                stream = self.router.create_chat_completion(
+                    'generation',
+                    **(self._continuation_request(request, parts) if parts else request),
+                    stream=True,
+                    stream_options={'include_usage': True}
+                )
+                finish_reason = None
+                
+                for chunk in stream:
+                    model = model or chunk.model
+                    if not chunk.choices:
+                        continue
+                    
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    
+                    parts.append(delta)
+                    unsaved_chars += len(delta)
+                    yield 'token', {'text': delta}
+                    
+                    # Persist partial text periodically so a dropped connection keeps finished work
+                    if (unsaved_chars >= STREAM_CHECKPOINT_CHARS or
+                            time.monotonic() - last_checkpoint >= STREAM_CHECKPOINT_SECONDS):
+                        self._checkpoint_draft(draft, parts, 'streaming')
+                        unsaved_chars = 0
+                        last_checkpoint = time.monotonic()
+                
+                stream.close()
+                self._add_usage(usage, stream.usage)
+                if finish_reason != 'length':
+                    break
+            
+            truncated = finish_reason == 'length'
+            generated_text = ''.join(parts)
+            content = self._save_content(order, generated_text, truncated)
+            self._record_usage(order, generated_text, request, usage, model, finish_reason, continuations)
+            draft.partial_content = generated_text
+            draft.status = 'completed'
+            db.session.commit()
+            finished = True
+            record_generation(content_type, 'truncated' if truncated else 'success')
+            
+            yield 'done', {
+                'content': content.to_dict(),
+                'order': order.to_dict()
+            }
+            
+        except GeneratorExit:
+            # The client disconnected; keep what has been generated so far and let the order be generated again
+            if draft is not None and not finished:
+                self._checkpoint_draft(draft, parts, 'interrupted')
+                self._revert_order_status(order_id)
+                record_generation(content_type, 'interrupted')
+            raise
+            
+        except Exception as e:
+            db.session.rollback()
+            record_generation(content_type, 'failure')
+            if draft is not None:
+                self._checkpoint_draft(draft, parts, 'failed')
+            self._revert_order_status(order_id)
+            
+            yield 'error', {'error': str(e)}
+            
+        finally:
+            if stream is not None:
+                stream.close()
+    
+    def _checkpoint_draft(self, draft, parts, status):
+        """Save the text streamed so far to the order's draft"""
+        try:
+            draft.partial_content = ''.join(parts)
+            draft.status = status
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    
+    def _revert_order_status(self, order_id):
+        """Return an order left in_progress by a stream that did not finish to pending"""
+        try:
+            order = Order.query.get(order_id)
+            if order and order.status == 'in_progress':
+                order.status = 'pending'
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+    
+    def _generation_request(self, order, template):
+        """Build the chat completion arguments for generating an order's content"""
+        prompt = self._build_prompt(order, template)
+        
+        return {
+            'messages': [
+                {
+                    "role": "system",
+                    "content": "You are a professional content writer. Create high-quality, engaging content based on the user's requirements."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            # Sized from the tokens per word this content type has needed so far
+            'max_tokens': token_budget.max_tokens(order.content_type, order.word_count),
+            'temperature': 0.7
+        }
+    
+    def _continuation_request(self, request, parts):
+        """Ask for the rest of a reply that was cut off at max_tokens"""
+        # Keeps the first request's budget: a reply cut off near the target word count would
+        # otherwise leave each continuation only the minimum and never let the model finish
+        return dict(
+            request,
+            messages=request['messages'] + [
+                {"role": "assistant", "content": ''.join(parts)},
+                {"role": "user", "content": CONTINUE_PROMPT}
+            ]
+        )
+    
+    def _add_usage(self, totals, usage):
+        """Sum token usage across continuation requests; unknown once any request did not report it"""
+        for key in ('prompt_tokens', 'completion_tokens'):
+            if totals[key] is None or usage is None:
+                totals[key] = None
+            else:
+                totals[key] += getattr(usage, key) or 0
+    
+    def _record_usage(self, order, generated_text, request, usage, model, finish_reason, continuations):
+        """Store the tokens a generation took so later budgets can be estimated (caller commits)"""
+        db.session.add(GenerationUsage(
+            order_id=order.id,
+            content_type=order.content_type,
+            model=model,
+            target_word_count=order.word_count or 0,
+            word_count=len(generated_text.split()),
+            prompt_tokens=usage['prompt_tokens'],
+            completion_tokens=usage['completion_tokens'],
+            max_tokens=request['max_tokens'],
+            continuations=continuations,
+            finish_reason=finish_reason
+        ))
+    
+    def _save_content(self, order, generated_text, truncated=False):
+        """Store generated text for an order and mark the order completed (caller commits)"""
+        quality_score = calculate_quality_score(
+            generated_text,
+            order.word_count,
+            order.get_requirements().get('keywords')
+        )
+        # Truncated text is kept for review but never auto-approved
+        is_approved = quality_score > 0.7 and not truncated
+        
+        # An order has at most one content row; a revision replaces its text
+        content = Content.query.filter_by(order_id=order.id).first()
+        if content:
+            content.generated_content = generated_text
+            content.quality_score = quality_score
+            content.is_approved = is_approved
+            content.is_truncated = truncated
+        else:
+            content = Content(
+                order_id=order.id,
+                generated_content=generated_text,
+                content_format='markdown',
+                quality_score=quality_score,
+                is_approved=is_approved,  # Auto-approve if quality is good
+                is_truncated=truncated
+            )
+            db.session.add(content)
+        
+        # Update order status
+        order.status = 'completed'
+        order.updated_at = db.func.now()
+        
+        return content
+    
     def _build_prompt(self, order, template):
         """Build the prompt for content generation"""
         prompt_parts = []
@@ -128,38 +338,11 @@ class ContentGenerator:
         
         return "\n".join(prompt_parts)
     
-    def _calculate_quality_score(self, content, target_word_count):
-        """Calculate a simple quality score for the generated content"""
-        if not content:
-            return 0.0
-        
-        # Basic quality metrics
-        word_count = len(content.split())
-        
-        # Word count accuracy (closer to target = better)
-        word_count_ratio = min(word_count / target_word_count, target_word_count / word_count)
-        
-        # Content length (not too short)
-        length_score = min(len(content) / 500, 1.0)  # Normalize to 500 chars
-        
-        # Sentence variety (simple check for different sentence lengths)
-        sentences = content.split('.')
-        avg_sentence_length = sum(len(s.split()) for s in sentences) / len(sentences) if sentences else 0
-        sentence_score = min(avg_sentence_length / 15, 1.0)  # Normalize to 15 words per sentence
-        
-        # Combine scores
-        quality_score = (word_count_ratio * 0.4 + length_score * 0.3 + sentence_score * 0.3)
-        
-        return min(quality_score, 1.0)
-    
     def preview_content(self, content_type, title, description, requirements):
         """Generate a preview of content without saving to database"""
         try:
             # Get the content template
-            template = ContentTemplate.query.filter_by(
-                content_type=content_type,
-                is_active=True
-            ).first()
+            template = template_registry.get(content_type)
             
             if not template:
                 raise ValueError("Content template not found")
@@ -171,10 +354,9 @@ class ContentGenerator:
             
             prompt += "Generate a brief preview (100-150 words) of what the full content would look like."
             
-            # Generate preview using OpenAI
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Use cheaper model for previews
-                messages=[
+            # Previews run on each provider's cheaper 'preview' model
+            request = {
+                'messages': [
                     {
                         "role": "system",
                         "content": "You are a professional content writer. Create a brief preview of content based on the user's requirements."
@@ -184,13 +366,31 @@ class ContentGenerator:
                         "content": prompt
                     }
                 ],
-                max_tokens=200,
-                temperature=0.7
-            )
+                'max_tokens': 200,
+                'temperature': 0.7
+            }
+            
+            # Repeat previews of the same prompt are served from the cache
+            cache_key = fingerprint(request)
+            cached_preview = preview_cache.get(cache_key)
+            if cached_preview is not None:
+                return {
+                    'success': True,
+                    'preview': cached_preview,
+                    'cached': True
+                }
+            
+            # Generate preview
+            response = self.router.create_chat_completion('preview', **request)
+            preview = response.choices[0].message.content
+            
+            if preview:
+                preview_cache.set(cache_key, preview)
             
             return {
                 'success': True,
-                'preview': response.choices[0].message.content
+                'preview': preview,
+                'cached': False
             }
             
         except Exception as e:
@@ -0,0 +1,103 @@
+import os
+from sqlalchemy import update
+from src.models.user import db
+from src.models.content import Content
+from src.models.content_blob import ContentBlob
+from src.models.order import Order
+from src.services.blob_store import decompress_text
+from src.services.job_queue import heartbeat, job_handler
+from src.services.text_analytics import analyze_text, feature_vector, score_features
+import json
+
+RESCORE_CHUNK_SIZE = int(os.environ.get('RESCORE_CHUNK_SIZE', 1000))
+
+
+def _keywords(requirements):
+    if not requirements:
+        return None
+    try:
+        return json.loads(requirements).get('keywords')
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def rescore_chunk(rows):
+    """Score a chunk of (content_id, text, target_word_count, requirements) rows at once"""
+    import numpy as np
+
+    features = np.array([
+        feature_vector(analyze_text(text, _keywords(requirements)), word_count)
+        for _, text, word_count, requirements in rows
+    ], dtype=float)
+    return score_features(features)
+
+
+def rescore_content(after_id=0, chunk_size=RESCORE_CHUNK_SIZE, on_chunk=None):
+    """Recompute quality_score for every Content row with id > after_id, chunk by chunk"""
+    last_id = after_id
+    rescored = 0
+    total_score = 0.0
+
+    while True:
+        rows = db.session.query(
+            Content.id,
+            Content.inline_content,
+            ContentBlob.hash,
+            ContentBlob.codec,
+            ContentBlob.data,
+            Order.word_count,
+            Order.requirements
+        ).join(Order, Order.id == Content.order_id).outerjoin(
+            ContentBlob, ContentBlob.hash == Content.blob_hash
+        ).filter(
+            Content.id > last_id
+        ).order_by(Content.id).limit(chunk_size).all()
+
+        if not rows:
+            break
+
+        rows = [
+            (content_id, decompress_text(codec, data) if blob_hash else inline, word_count, requirements)
+            for content_id, inline, blob_hash, codec, data, word_count, requirements in rows
+        ]
+        scores = rescore_chunk(rows)
+        db.session.execute(update(Content), [
+            {'id': row[0], 'quality_score': float(score)}
+            for row, score in zip(rows, scores)
+        ])
+        db.session.commit()
+
+        last_id = rows[-1][0]
+        rescored += len(rows)
+        total_score += float(scores.sum())
+
+        if on_chunk:
+            on_chunk(last_id, rescored)
+
+    return {
+        'rescored': rescored,
+        'last_id': last_id,
+        'mean_score': round(total_score / rescored, 4) if rescored else None
+    }
+
+
+@job_handler('rescore_content')
+def rescore_content_job(job):
+    """Re-score all stored content, resuming after the last committed chunk on retry"""
+    previous = job.get_result()
+    payload = job.get_payload()
+
+    def record_progress(last_id, rescored):
+        job.set_result({
+            'last_id': last_id,
+            'rescored': previous.get('rescored', 0) + rescored
+        })
+        heartbeat(job)
+
+    result = rescore_content(
+        after_id=previous.get('last_id', 0),
+        chunk_size=payload.get('chunk_size', RESCORE_CHUNK_SIZE),
+        on_chunk=record_progress
+    )
+    result['rescored'] += previous.get('rescored', 0)
+    return result
@@ -0,0 +1,284 @@
+import os
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from src.models.user import db
+from src.models.content_draft import ContentDraft
+from src.models.job import Job
+from src.models.order import Order
+
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 10))
+JOB_RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', 600))
+# A job that has been in_progress longer than this is assumed to belong to a dead worker
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 900))
+# A draft still marked streaming but untouched this long belongs to a stream whose process died
+STREAM_STALE_SECONDS = int(os.environ.get('STREAM_STALE_SECONDS', 300))
+
+ACTIVE_STATUSES = ('queued', 'in_progress')
+
+_handlers = {}
+_failure_hooks = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed"""
+
+
+def job_handler(kind, on_failure=None):
+    """Register a handler for a job kind, with an optional hook run when the job finally fails"""
+    def register(f):
+        _handlers[kind] = f
+        if on_failure:
+            _failure_hooks[kind] = on_failure
+        return f
+    return register
+
+
+def enqueue_job(kind, payload=None, order_id=None, user_id=None, max_attempts=None, commit=True, locked_by=None):
+    """Add a job to the queue, or with locked_by create it already claimed by that worker to run inline"""
+    now = datetime.utcnow()
+    job = Job(
+        kind=kind,
+        order_id=order_id,
+        user_id=user_id,
+        status='in_progress' if locked_by else 'queued',
+        attempts=1 if locked_by else 0,
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+        run_after=now,
+        locked_by=locked_by,
+        locked_at=now if locked_by else None
+    )
+    job.set_payload(payload or {})
+    db.session.add(job)
+
+    if commit:
+        db.session.commit()
+
+    return job
+
+
+def find_active_job(kind, order_id):
+    """Return the queued or running job of this kind for an order, if any"""
+    return Job.query.filter(
+        Job.kind == kind,
+        Job.order_id == order_id,
+        Job.status.in_(ACTIVE_STATUSES)
+    ).order_by(Job.id.desc()).first()
+
+
+def find_active_stream(order_id):
+    """Return the draft of a streamed generation still running for an order, if any"""
+    return ContentDraft.query.filter(
+        ContentDraft.order_id == order_id,
+        ContentDraft.status == 'streaming',
+        ContentDraft.updated_at >= datetime.utcnow() - timedelta(seconds=STREAM_STALE_SECONDS)
+    ).first()
+
+
+def queue_generation(order, user_id=None):
+    """Queue content generation for an order the caller has locked, reusing the job already queued for it.
+
+    Returns None while a streamed generation is writing the order; the caller commits either way.
+    """
+    if find_active_stream(order.id):
+        return None
+
+    job = find_active_job('generate_content', order.id)
+    if not job:
+        order.status = 'in_progress'
+        order.updated_at = datetime.utcnow()
+        job = enqueue_job(
+            'generate_content',
+            {'order_id': order.id},
+            order_id=order.id,
+            user_id=user_id,
+            commit=False
+        )
+    return job
+
+
+def claim_next_job(worker_id):
+    """Atomically move the next due job to in_progress and return it"""
+    now = datetime.utcnow()
+
+    # SKIP LOCKED keeps Postgres workers from queueing behind each other;
+    # the conditional UPDATE below is what makes the claim safe on SQLite too.
+    candidate = Job.query.filter(
+        Job.status == 'queued',
+        Job.run_after <= now
+    ).order_by(Job.run_after, Job.id).with_for_update(skip_locked=True).first()
+
+    if not candidate:
+        db.session.commit()
+        return None
+
+    claimed = db.session.execute(
+        update(Job)
+        .where(Job.id == candidate.id, Job.status == 'queued')
+        .values(
+            status='in_progress',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=Job.attempts + 1,
+            updated_at=now
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+
+    if not claimed:
+        return None
+
+    return db.session.get(Job, candidate.id)
+
+
+def heartbeat(job):
+    """Extend the lease of a long-running job"""
+    job.locked_at = datetime.utcnow()
+    db.session.commit()
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome"""
+    handler = _handlers.get(job.kind)
+    if handler is None:
+        _record_failure(job, f'No handler registered for job kind {job.kind}', retry=False)
+        db.session.commit()
+        return
+
+    try:
+        result = handler(job)
+    except PermanentJobError as e:
+        db.session.rollback()
+        _record_failure(job, str(e), retry=False)
+    except Exception as e:
+        db.session.rollback()
+        _record_failure(job, str(e), retry=True)
+    else:
+        job.status = 'completed'
+        job.set_result(result or {})
+        job.last_error = None
+        job.locked_by = None
+        job.locked_at = None
+        job.completed_at = datetime.utcnow()
+
+    db.session.commit()
+
+
+def recover_stale_jobs():
+    """Requeue (or fail) jobs whose worker stopped renewing the lease"""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+    stale_jobs = Job.query.filter(
+        Job.status == 'in_progress',
+        Job.locked_at < cutoff
+    ).with_for_update(skip_locked=True).all()
+
+    for job in stale_jobs:
+        _record_failure(job, 'Job lease expired before the worker finished', retry=True)
+
+    db.session.commit()
+    return len(stale_jobs)
+
+
+def recover_stale_orders():
+    """Return in_progress orders to pending once neither a job nor a live stream is generating them"""
+    cutoff = datetime.utcnow() - timedelta(seconds=STREAM_STALE_SECONDS)
+
+    # A stream whose process died never marked its draft; release it the way a disconnect would
+    db.session.execute(
+        update(ContentDraft)
+        .where(ContentDraft.status == 'streaming', ContentDraft.updated_at < cutoff)
+        .values(status='interrupted')
+    )
+
+    # Orders changed within the cutoff are left alone, so nothing races a generation just being started
+    stale_orders = Order.query.filter(
+        Order.status == 'in_progress',
+        Order.updated_at < cutoff,
+        ~db.session.query(Job.id).filter(Job.order_id == Order.id, Job.status.in_(ACTIVE_STATUSES)).exists(),
+        ~db.session.query(ContentDraft.id).filter(
+            ContentDraft.order_id == Order.id, ContentDraft.status == 'streaming'
+        ).exists()
+    ).with_for_update(skip_locked=True).all()
+
+    for order in stale_orders:
+        order.status = 'pending'
+
+    db.session.commit()
+    return len(stale_orders)
+
+
+def release_worker_jobs(worker_id):
+    """Requeue (or fail) jobs held by a worker process that is known to have exited"""
+    orphaned_jobs = Job.query.filter_by(status='in_progress', locked_by=worker_id).all()
+
+    for job in orphaned_jobs:
+        _record_failure(job, 'Worker process exited while running the job', retry=True)
+
+    db.session.commit()
+    return len(orphaned_jobs)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given number of attempts so far"""
+    delay = min(JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), JOB_RETRY_MAX_SECONDS)
+    return delay * (0.5 + random.random() / 2)
+
+
+def _record_failure(job, error, retry):
+    now = datetime.utcnow()
+    job.last_error = error
+    job.locked_by = None
+    job.locked_at = None
+
+    if retry and job.attempts < job.max_attempts:
+        job.status = 'queued'
+        job.run_after = now + timedelta(seconds=retry_delay(job.attempts))
+        return
+
+    job.status = 'failed'
+    job.completed_at = now
+
+    hook = _failure_hooks.get(job.kind)
+    if hook:
+        hook(job)
+
+
+_content_generator = None
+
+
+def get_content_generator():
+    """ContentGenerator shared by the routes and job handlers of this process"""
+    global _content_generator
+    if _content_generator is None:
+        from src.services.content_generator import ContentGenerator
+        _content_generator = ContentGenerator()
+    return _content_generator
+
+
+def _revert_order_status(job):
+    order = Order.query.get(job.order_id) if job.order_id else None
+    if order and order.status == 'in_progress':
+        order.status = 'pending'
+        order.updated_at = datetime.utcnow()
+
+
+@job_handler('generate_content', on_failure=_revert_order_status)
+def generate_content_job(job):
+    """Generate content for the order referenced by the job"""
+    order_id = job.get_payload().get('order_id', job.order_id)
+
+    order = Order.query.get(order_id)
+    if not order:
+        raise PermanentJobError('Order not found')
+
+    if order.status not in ['pending', 'in_progress']:
+        raise PermanentJobError(f'Order cannot be processed in status {order.status}')
+
+    # Retries and continuations can outlast JOB_LEASE_SECONDS, so renew the lease before each provider call
+    result = get_content_generator().generate_content(order_id, keep_alive=lambda: heartbeat(job))
+    if not result['success']:
+        raise RuntimeError(result['error'])
+
+    return {'content_id': result['content']['id']}
@@ -0,0 +1,121 @@
+import os
+import threading
+
+# One connection pool per process; these bound it and keep warm TLS connections around between orders
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 20))
+OPENAI_MAX_KEEPALIVE = int(os.environ.get('OPENAI_MAX_KEEPALIVE', 10))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', 90))
+OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+# Also the longest allowed gap between streamed tokens
+OPENAI_READ_TIMEOUT = float(os.environ.get('OPENAI_READ_TIMEOUT', 120))
+OPENAI_WRITE_TIMEOUT = float(os.environ.get('OPENAI_WRITE_TIMEOUT', 30))
+OPENAI_POOL_TIMEOUT = float(os.environ.get('OPENAI_POOL_TIMEOUT', 10))
+# HTTP/2 multiplexes concurrent calls over one connection; needs the h2 package (pip install httpx[http2])
+OPENAI_HTTP2 = os.environ.get('OPENAI_HTTP2', '').lower() in ('1', 'true', 'yes')
+
+# One client per (base_url, api_key, cancellable) so every configured provider keeps its own pool
+_clients = {}
+_clients_pid = None
+_lock = threading.Lock()
+_cancellable_backend = None
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _get_cancellable_backend():
+    global _cancellable_backend
+    if _cancellable_backend is None:
+        from src.services.llm_transport import CancellableBackend
+        _cancellable_backend = CancellableBackend()
+    return _cancellable_backend
+
+
+def _build_client(base_url, api_key, cancellable=False):
+    import httpx
+    import openai
+
+    limits = httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(
+        connect=OPENAI_CONNECT_TIMEOUT,
+        read=OPENAI_READ_TIMEOUT,
+        write=OPENAI_WRITE_TIMEOUT,
+        pool=OPENAI_POOL_TIMEOUT
+    )
+    if cancellable:
+        from src.services.llm_transport import CancellableTransport
+
+        http_client = openai.DefaultHttpxClient(
+            timeout=timeout,
+            transport=CancellableTransport(_get_cancellable_backend(), limits)
+        )
+    else:
+        http_client = openai.DefaultHttpxClient(
+            limits=limits,
+            timeout=timeout,
+            http2=OPENAI_HTTP2 and _http2_available()
+        )
+    # Retries are left to the governor so every worker backs off together
+    return openai.OpenAI(
+        base_url=base_url,
+        api_key=api_key,
+        max_retries=0,
+        http_client=http_client
+    )
+
+
+def get_openai_client(base_url=None, api_key=None, cancellable=False):
+    """The process-wide OpenAI client for a backend, rebuilt in a forked child instead of sharing the parent's sockets.
+
+    Requests a thread makes through a cancellable client can be aborted with cancel_requests(thread_id),
+    even while still waiting for the response headers.
+    """
+    global _clients, _clients_pid
+    base_url = base_url or os.environ.get('OPENAI_API_BASE') or None
+    key = (base_url, api_key, cancellable)
+    pid = os.getpid()
+    if _clients_pid == pid and key in _clients:
+        return _clients[key]
+
+    with _lock:
+        if _clients_pid != pid:
+            _clients = {}
+            _clients_pid = pid
+        if key not in _clients:
+            _clients[key] = _build_client(base_url, api_key, cancellable)
+        return _clients[key]
+
+
+def cancel_requests(thread_id):
+    """Abort the cancellable-client request a thread has in flight, and any it starts until reset_cancellation()"""
+    with _lock:
+        backend = _get_cancellable_backend()
+    backend.cancel(thread_id)
+
+
+def reset_cancellation(thread_id=None):
+    """Let a thread cancelled earlier (e.g. a reused pool thread) make requests again"""
+    with _lock:
+        backend = _get_cancellable_backend()
+    backend.reset(threading.get_ident() if thread_id is None else thread_id)
+
+
+def _forget_clients_after_fork():
+    # Not closed: the connections still belong to the parent process
+    global _clients, _clients_pid, _lock, _cancellable_backend
+    _clients = {}
+    _clients_pid = None
+    _lock = threading.Lock()
+    _cancellable_backend = None
+
+
+os.register_at_fork(after_in_child=_forget_clients_after_fork)
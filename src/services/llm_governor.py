@@ -0,0 +1,352 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from src.utils.metrics import observe_llm_call, record_llm_usage
+
+# Account-wide requests and tokens per minute per model; override with LLM_RATE_LIMITS='{"gpt-4": {"rpm": 500, "tpm": 30000}}'
+DEFAULT_RATE_LIMITS = {
+    'gpt-4': {'rpm': 500, 'tpm': 10000},
+    'gpt-3.5-turbo': {'rpm': 3500, 'tpm': 90000}
+}
+FALLBACK_RATE_LIMIT = {'rpm': 500, 'tpm': 10000}
+
+# In-flight calls per model across all processes
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+# Buckets live in each process's memory, so the limits above (and those the provider reports) are
+# split evenly across every process calling the provider with the same key: all gunicorn workers of
+# the web service plus all job worker processes. Keep this in sync with WEB_CONCURRENCY + JOB_WORKER_PROCESSES.
+LLM_GOVERNOR_PROCESSES = max(int(os.environ.get('LLM_GOVERNOR_PROCESSES', 1)), 1)
+LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', 120))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 5))
+LLM_BACKOFF_BASE_SECONDS = float(os.environ.get('LLM_BACKOFF_BASE_SECONDS', 1))
+LLM_BACKOFF_MAX_SECONDS = float(os.environ.get('LLM_BACKOFF_MAX_SECONDS', 60))
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+class GovernorTimeout(Exception):
+    """Raised when a call waited longer than the queue timeout for rate-limit capacity"""
+
+
+def parse_duration(value):
+    """Parse provider reset durations such as '20ms', '1s' or '6m0s' into seconds"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def estimate_tokens(request):
+    """Rough upper bound of the tokens a chat completion will consume"""
+    prompt_chars = sum(len(message.get('content') or '') for message in request.get('messages', []))
+    return prompt_chars // 4 + (request.get('max_tokens') or 1000)
+
+
+def process_concurrency(max_concurrency=LLM_MAX_CONCURRENCY, processes=LLM_GOVERNOR_PROCESSES):
+    """In-flight calls per model this process may make: its share of LLM_MAX_CONCURRENCY"""
+    return max(max_concurrency // processes, 1)
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (0 if available now)"""
+        self._refill(now)
+        # A request larger than the whole bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def resize(self, per_minute):
+        per_minute = float(per_minute)
+        if per_minute > 0 and per_minute != self.capacity:
+            self.tokens = self.tokens * per_minute / self.capacity
+            self.capacity = per_minute
+
+
+class ModelGovernor:
+    """This process's share of the request/token buckets, concurrency limit and backoff state for one model"""
+
+    def __init__(self, model, rpm, tpm, max_concurrency, processes=1):
+        self.model = model
+        self.processes = processes
+        self.requests = TokenBucket(rpm / processes)
+        self.tokens = TokenBucket(tpm / processes)
+        self.max_concurrency = process_concurrency(max_concurrency, processes)
+        self.in_flight = 0
+        self.waiting = 0
+        self.blocked_until = 0.0
+        self.stats = {
+            'requests': 0,
+            'rate_limited': 0,
+            'retries': 0,
+            'timeouts': 0,
+            'wait_seconds': 0.0
+        }
+        self.last_headers = {}
+        self._cond = threading.Condition()
+
+    def acquire(self, estimated_tokens, deadline):
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        self.blocked_until - now,
+                        self.requests.wait_time(1, now),
+                        self.tokens.wait_time(estimated_tokens, now)
+                    )
+                    if wait <= 0 and self.in_flight < self.max_concurrency:
+                        self.requests.take(1)
+                        self.tokens.take(estimated_tokens)
+                        self.in_flight += 1
+                        self.stats['requests'] += 1
+                        self.stats['wait_seconds'] += now - started
+                        return
+
+                    remaining = deadline - now
+                    if remaining <= 0 or wait > remaining:
+                        self.stats['timeouts'] += 1
+                        raise GovernorTimeout(f'Timed out waiting for {self.model} rate-limit capacity')
+
+                    # Woken early by release() when a concurrency slot frees up
+                    self._cond.wait(timeout=min(wait, remaining) if wait > 0 else remaining)
+            finally:
+                self.waiting -= 1
+
+    def release(self, estimated_tokens, actual_tokens=None):
+        with self._cond:
+            self.in_flight -= 1
+            if actual_tokens is not None and actual_tokens < estimated_tokens:
+                self.tokens.give_back(estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def observe_headers(self, headers):
+        """Adapt the buckets to the limits and remaining quota reported by the provider"""
+        if not headers:
+            return
+        now = time.monotonic()
+        with self._cond:
+            snapshot = {key: headers.get(key) for key in (
+                'x-ratelimit-limit-requests', 'x-ratelimit-remaining-requests',
+                'x-ratelimit-reset-requests', 'x-ratelimit-limit-tokens',
+                'x-ratelimit-remaining-tokens', 'x-ratelimit-reset-tokens'
+            ) if headers.get(key) is not None}
+            if snapshot:
+                self.last_headers = snapshot
+
+            try:
+                # The provider reports account-wide figures; this process only gets its share
+                if headers.get('x-ratelimit-limit-requests'):
+                    self.requests.resize(int(headers['x-ratelimit-limit-requests']) / self.processes)
+                if headers.get('x-ratelimit-limit-tokens'):
+                    self.tokens.resize(int(headers['x-ratelimit-limit-tokens']) / self.processes)
+
+                # Trust the provider's view of what is left over our local estimate
+                if headers.get('x-ratelimit-remaining-requests') is not None:
+                    self.requests.tokens = min(
+                        self.requests.tokens, float(headers['x-ratelimit-remaining-requests']) / self.processes
+                    )
+                if headers.get('x-ratelimit-remaining-tokens') is not None:
+                    self.tokens.tokens = min(
+                        self.tokens.tokens, float(headers['x-ratelimit-remaining-tokens']) / self.processes
+                    )
+            except (TypeError, ValueError):
+                pass
+
+            if self.requests.tokens < 1:
+                reset = parse_duration(headers.get('x-ratelimit-reset-requests'))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def back_off(self, headers, attempt):
+        """Pause every caller of this model after a 429 or transient provider error"""
+        delay = None
+        if headers:
+            try:
+                delay = float(headers['retry-after-ms']) / 1000.0 if headers.get('retry-after-ms') else None
+            except ValueError:
+                delay = None
+            if delay is None:
+                delay = parse_duration(headers.get('retry-after'))
+            if delay is None:
+                delay = max(
+                    parse_duration(headers.get('x-ratelimit-reset-requests')) or 0,
+                    parse_duration(headers.get('x-ratelimit-reset-tokens')) or 0
+                ) or None
+        if delay is None:
+            delay = min(LLM_BACKOFF_BASE_SECONDS * (2 ** attempt), LLM_BACKOFF_MAX_SECONDS)
+            delay *= 0.5 + random.random() / 2
+
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self.stats['retries'] += 1
+        return delay
+
+    def snapshot(self):
+        with self._cond:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                'model': self.model,
+                'processes': self.processes,
+                'rpm_limit': self.requests.capacity,
+                'tpm_limit': self.tokens.capacity,
+                'requests_available': round(self.requests.tokens, 2),
+                'tokens_available': round(self.tokens.tokens, 2),
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'blocked_for_seconds': round(max(self.blocked_until - now, 0), 3),
+                'stats': dict(self.stats, wait_seconds=round(self.stats['wait_seconds'], 3)),
+                'last_headers': dict(self.last_headers)
+            }
+
+
+class _GovernedStream:
+    """Holds the concurrency slot until a streamed completion is consumed or closed"""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+        # Sent in the final chunk when the request asks for stream_options={'include_usage': True}
+        self.usage = None
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                if getattr(chunk, 'usage', None):
+                    self.usage = chunk.usage
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            try:
+                self._stream.close()
+            finally:
+                self._on_close(self.usage)
+
+
+class LLMGovernor:
+    """Gate every chat completion of this process goes through, holding its share of the account limits"""
+
+    def __init__(self):
+        self.limits = dict(DEFAULT_RATE_LIMITS)
+        if os.environ.get('LLM_RATE_LIMITS'):
+            self.limits.update(json.loads(os.environ['LLM_RATE_LIMITS']))
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model, key=None):
+        """Governor for a model, kept apart per key when several providers serve the same model name"""
+        key = key or model
+        with self._lock:
+            governor = self._models.get(key)
+            if governor is None:
+                limits = self.limits.get(key, self.limits.get(model, FALLBACK_RATE_LIMIT))
+                governor = ModelGovernor(key, limits['rpm'], limits['tpm'], LLM_MAX_CONCURRENCY, LLM_GOVERNOR_PROCESSES)
+                self._models[key] = governor
+            return governor
+
+    def create_chat_completion(self, client, governor_key=None, max_retries=None, on_attempt=None, **request):
+        """Call chat.completions.create, queueing for capacity and retrying 429s and transient errors.
+
+        on_attempt is called before every attempt, e.g. to renew the lease of the job waiting on it.
+        """
+        import openai
+
+        governor = self.for_model(request['model'], governor_key)
+        max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        estimated = estimate_tokens(request)
+        deadline = time.monotonic() + LLM_QUEUE_TIMEOUT
+
+        def finish_stream(usage):
+            record_llm_usage(request['model'], usage)
+            governor.release(estimated, usage.total_tokens if usage else None)
+
+        for attempt in range(max_retries + 1):
+            if on_attempt:
+                on_attempt()
+            governor.acquire(estimated, deadline)
+            handed_off = False
+            actual = None
+            outcome = 'error'
+            started = time.perf_counter()
+            try:
+                raw = client.chat.completions.with_raw_response.create(**request)
+                governor.observe_headers(raw.headers)
+                response = raw.parse()
+                outcome = 'ok'
+
+                if request.get('stream'):
+                    handed_off = True
+                    return _GovernedStream(response, finish_stream)
+
+                if getattr(response, 'usage', None):
+                    actual = response.usage.total_tokens
+                    record_llm_usage(request['model'], response.usage)
+                return response
+
+            except openai.RateLimitError as e:
+                outcome = 'rate_limited'
+                # Out of quota is not going to fix itself by waiting
+                if getattr(e, 'code', None) == 'insufficient_quota' or attempt == max_retries:
+                    raise
+                governor.stats['rate_limited'] += 1
+                governor.back_off(e.response.headers, attempt)
+
+            except (openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt == max_retries:
+                    raise
+                response = getattr(e, 'response', None)
+                governor.back_off(response.headers if response is not None else None, attempt)
+
+            finally:
+                observe_llm_call(request['model'], time.perf_counter() - started, outcome)
+                if not handed_off:
+                    governor.release(estimated, actual)
+
+    def snapshot(self):
+        with self._lock:
+            governors = list(self._models.values())
+        return {
+            'queue_timeout_seconds': LLM_QUEUE_TIMEOUT,
+            'max_retries': LLM_MAX_RETRIES,
+            'models': {governor.model: governor.snapshot() for governor in governors}
+        }
+
+
+llm_governor = LLMGovernor()
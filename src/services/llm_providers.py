@@ -0,0 +1,372 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from src.services.llm_client import cancel_requests, get_openai_client, reset_cancellation
+from src.services.llm_governor import GovernorTimeout, llm_governor
+
+# OpenAI-compatible backends, each mapping a tier ('generation', 'preview') to its model, e.g.
+# LLM_PROVIDERS='[{"name": "openai", "weight": 2},
+#                 {"name": "backup", "base_url": "https://llm.example.com/v1", "api_key_env": "BACKUP_API_KEY",
+#                  "models": {"generation": "gpt-4o", "preview": "gpt-4o-mini"}}]'
+DEFAULT_MODELS = {'generation': 'gpt-4', 'preview': 'gpt-3.5-turbo'}
+
+# Consecutive failures that take a provider out of rotation, and for how long
+LLM_PROVIDER_FAILURE_THRESHOLD = int(os.environ.get('LLM_PROVIDER_FAILURE_THRESHOLD', 3))
+LLM_PROVIDER_COOLDOWN_SECONDS = float(os.environ.get('LLM_PROVIDER_COOLDOWN_SECONDS', 30))
+# Weight of the newest call in the moving averages behind the health score
+LLM_PROVIDER_EWMA_ALPHA = float(os.environ.get('LLM_PROVIDER_EWMA_ALPHA', 0.2))
+# Retries on one provider before failing over; the last provider tried gets the governor's full LLM_MAX_RETRIES
+LLM_FAILOVER_RETRIES = int(os.environ.get('LLM_FAILOVER_RETRIES', 1))
+# Send a competing request to the next provider when the first has not started answering after
+# this long; 0 disables hedging. Only non-streamed completions are hedged.
+LLM_HEDGE_DELAY_MS = float(os.environ.get('LLM_HEDGE_DELAY_MS', 0))
+LLM_HEDGE_MAX_WORKERS = int(os.environ.get('LLM_HEDGE_MAX_WORKERS', 16))
+
+
+def is_provider_failure(error):
+    """Whether the provider itself failed, counting against its health; malformed requests fail everywhere"""
+    import openai
+
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, (openai.BadRequestError, openai.UnprocessableEntityError)):
+        return False
+    return isinstance(error, openai.APIStatusError)
+
+
+def should_fail_over(error):
+    """Whether another provider might succeed where this one raised"""
+    # A governor timeout is congestion in this process, not the provider's fault, but another provider
+    # has its own queue
+    return isinstance(error, GovernorTimeout) or is_provider_failure(error)
+
+
+class _HedgeLost(Exception):
+    """Raised inside the slower request of a hedged pair once the other one started answering"""
+
+
+class Provider:
+    """One OpenAI-compatible backend and the health statistics used to rank it"""
+
+    def __init__(self, name, base_url=None, api_key_env=None, models=None, weight=1.0):
+        self.name = name
+        self.base_url = base_url
+        self.api_key_env = api_key_env
+        self.models = dict(DEFAULT_MODELS, **(models or {}))
+        self.weight = float(weight)
+        # Moving averages of seconds until the provider started answering, and of failed calls
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.stats = {
+            'requests': 0,
+            'failures': 0,
+            'circuit_opened': 0,
+            'hedges_sent': 0,
+            'hedges_won': 0,
+            'hedges_cancelled': 0
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client()
+
+    @property
+    def hedge_client(self):
+        # Hedged requests go through connections the winner can shut down while the loser still waits for headers
+        return self._client(cancellable=True)
+
+    def _client(self, cancellable=False):
+        # Without api_key_env the SDK falls back to OPENAI_API_KEY
+        api_key = os.environ.get(self.api_key_env) if self.api_key_env else None
+        return get_openai_client(self.base_url, api_key, cancellable)
+
+    def governor_key(self, model):
+        return f'{self.name}:{model}'
+
+    def available(self, now=None):
+        return (now or time.monotonic()) >= self.open_until
+
+    def score(self, default_latency=0.0):
+        """Higher is better: the configured weight discounted by recent errors and latency"""
+        latency = default_latency if self.latency is None else self.latency
+        return self.weight * (1 - self.error_rate) / (1 + latency)
+
+    def record_success(self, latency):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.latency = latency if self.latency is None else (
+                LLM_PROVIDER_EWMA_ALPHA * latency + (1 - LLM_PROVIDER_EWMA_ALPHA) * self.latency
+            )
+            self.error_rate *= 1 - LLM_PROVIDER_EWMA_ALPHA
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+
+    def record_lost(self, latency):
+        """A hedged request cancelled after `latency` seconds without answering; it would have taken longer"""
+        with self._lock:
+            # Only a lower bound, so it can raise the average but never lower it
+            if self.latency is None or latency > self.latency:
+                self.latency = latency if self.latency is None else (
+                    LLM_PROVIDER_EWMA_ALPHA * latency + (1 - LLM_PROVIDER_EWMA_ALPHA) * self.latency
+                )
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['failures'] += 1
+            self.error_rate = LLM_PROVIDER_EWMA_ALPHA + (1 - LLM_PROVIDER_EWMA_ALPHA) * self.error_rate
+            self.consecutive_failures += 1
+            # Once the cooldown passes a single call decides: success closes it, failure reopens it
+            if self.consecutive_failures >= LLM_PROVIDER_FAILURE_THRESHOLD:
+                self.open_until = time.monotonic() + LLM_PROVIDER_COOLDOWN_SECONDS
+                self.stats['circuit_opened'] += 1
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'name': self.name,
+                'base_url': self.base_url,
+                'models': dict(self.models),
+                'weight': self.weight,
+                'available': now >= self.open_until,
+                'unavailable_for_seconds': round(max(self.open_until - now, 0), 3),
+                'latency_seconds': round(self.latency, 4) if self.latency is not None else None,
+                'error_rate': round(self.error_rate, 4),
+                'consecutive_failures': self.consecutive_failures,
+                'score': round(self.score(), 4),
+                'stats': dict(self.stats)
+            }
+
+
+class _Race:
+    """Decides which of two hedged requests is kept, the first to start answering, and cancels the other"""
+
+    def __init__(self):
+        self.winner = None
+        # Set once an attempt claims the race or the primary finishes, whichever comes first
+        self.settled = threading.Event()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def enter(self, provider):
+        """Register the calling thread as the one running provider's attempt"""
+        reset_cancellation()
+        with self._lock:
+            if self.winner is not None:
+                raise _HedgeLost()
+            self._threads[provider] = threading.get_ident()
+
+    def leave(self, provider):
+        with self._lock:
+            self._threads.pop(provider, None)
+
+    def claim(self, provider):
+        with self._lock:
+            if self.winner is None:
+                self.winner = provider
+                self.settled.set()
+                # Under the lock so a loser can't leave and reuse its thread for another request meanwhile;
+                # one that has not sent its request yet fails on its first write
+                for other, thread_id in self._threads.items():
+                    if other is not provider:
+                        cancel_requests(thread_id)
+            return self.winner is provider
+
+    def lost(self, provider):
+        return self.winner is not None and self.winner is not provider
+
+
+class LLMRouter:
+    """Sends each chat completion to the healthiest provider, failing over and optionally hedging"""
+
+    def __init__(self, providers=None, hedge_delay_ms=LLM_HEDGE_DELAY_MS):
+        if providers is None:
+            providers = [Provider(**config) for config in json.loads(os.environ.get('LLM_PROVIDERS') or '[]')]
+        self.providers = providers or [Provider('openai')]
+        self.hedge_delay_ms = hedge_delay_ms
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def ranked(self):
+        """Available providers best first, then the ones in cooldown as a last resort"""
+        now = time.monotonic()
+        measured = [provider.latency for provider in self.providers if provider.latency is not None]
+        # Untried providers are assumed as fast as the average so they neither jump nor trail the queue
+        default_latency = sum(measured) / len(measured) if measured else 0.0
+        available = [provider for provider in self.providers if provider.available(now)]
+        cooling = [provider for provider in self.providers if not provider.available(now)]
+        available.sort(key=lambda provider: -provider.score(default_latency))
+        cooling.sort(key=lambda provider: provider.open_until)
+        return available + cooling
+
+    def create_chat_completion(self, tier, on_attempt=None, **request):
+        """Run a chat completion for a tier ('generation' or 'preview'), trying providers until one succeeds"""
+        providers = self.ranked()
+        last_error = None
+
+        if (self.hedge_delay_ms > 0 and not request.get('stream') and
+                len(providers) > 1 and providers[1].available()):
+            # The racing attempts run on executor threads, so the callback runs once here instead
+            if on_attempt:
+                on_attempt()
+            try:
+                return self._hedged(providers[0], providers[1], tier, request)
+            except Exception as e:
+                if not should_fail_over(e):
+                    raise
+                last_error = e
+            providers = providers[2:]
+
+        for index, provider in enumerate(providers):
+            try:
+                return self._call(provider, tier, request, last=index == len(providers) - 1, on_attempt=on_attempt)
+            except Exception as e:
+                if not should_fail_over(e):
+                    raise
+                last_error = e
+
+        raise last_error
+
+    def _call(self, provider, tier, request, last, on_attempt=None):
+        model = provider.models[tier]
+        started = time.perf_counter()
+        try:
+            response = llm_governor.create_chat_completion(
+                provider.client,
+                governor_key=provider.governor_key(model),
+                max_retries=None if last else LLM_FAILOVER_RETRIES,
+                on_attempt=on_attempt,
+                **dict(request, model=model)
+            )
+        except Exception as e:
+            if is_provider_failure(e):
+                provider.record_failure()
+            raise
+        # For a stream this is the time until the response headers arrived
+        provider.record_success(time.perf_counter() - started)
+        return response
+
+    def _hedged(self, primary, backup, tier, request):
+        """Race the primary against a backup sent after the hedge delay; the loser's request is cancelled"""
+        race = _Race()
+        executor = self._get_executor()
+        futures = [executor.submit(self._streamed_attempt, primary, tier, request, race)]
+        futures[0].add_done_callback(lambda _: race.settled.set())
+
+        # Hedge only if the primary has neither started answering nor finished within the delay
+        race.settled.wait(timeout=self.hedge_delay_ms / 1000)
+        if futures[0].done():
+            error = futures[0].exception()
+            if error is None or not should_fail_over(error):
+                return futures[0].result()
+            # The primary failed before the hedge was due; the backup becomes a plain failover
+        elif race.winner is primary:
+            return futures[0].result()
+        else:
+            backup.count('hedges_sent')
+        futures.append(executor.submit(self._streamed_attempt, backup, tier, request, race))
+
+        pending = set(futures)
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if race.winner is backup:
+                        backup.count('hedges_won')
+                    return future.result()
+                if not isinstance(error, _HedgeLost):
+                    errors.append(error)
+
+        raise errors[-1]
+
+    def _streamed_attempt(self, provider, tier, request, race):
+        """Stream a completion so it can be abandoned between chunks, and reassemble the full response"""
+        from openai.types.chat import ChatCompletion
+
+        model = provider.models[tier]
+        started = None
+        stream = None
+        first = None
+        parts = []
+        finish_reason = None
+        try:
+            race.enter(provider)
+            started = time.perf_counter()
+            stream = llm_governor.create_chat_completion(
+                provider.hedge_client,
+                governor_key=provider.governor_key(model),
+                max_retries=0,
+                **dict(request, model=model, stream=True, stream_options={'include_usage': True})
+            )
+            for chunk in stream:
+                if first is None:
+                    first = chunk
+                    if not race.claim(provider):
+                        raise _HedgeLost()
+                    provider.record_success(time.perf_counter() - started)
+                if chunk.choices:
+                    parts.append(chunk.choices[0].delta.content or '')
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+        except Exception as e:
+            if isinstance(e, _HedgeLost) or (first is None and race.lost(provider)):
+                # Cancelled by the winner (the connection error is ours), beaten to the first chunk, or
+                # decided before this attempt was sent, which says nothing about its latency
+                provider.count('hedges_cancelled')
+                if started is not None:
+                    provider.record_lost(time.perf_counter() - started)
+                raise _HedgeLost() from e
+            if first is None and is_provider_failure(e):
+                provider.record_failure()
+            raise
+        finally:
+            race.leave(provider)
+            if stream is not None:
+                stream.close()
+
+        if first is None:
+            raise _HedgeLost() if race.lost(provider) else RuntimeError(f'{provider.name} returned an empty stream')
+
+        return ChatCompletion(
+            id=first.id,
+            object='chat.completion',
+            created=first.created,
+            model=first.model,
+            choices=[{
+                'index': 0,
+                'finish_reason': finish_reason or 'stop',
+                'message': {'role': 'assistant', 'content': ''.join(parts)}
+            }],
+            usage=stream.usage
+        )
+
+    def _get_executor(self):
+        # Worker threads do not survive a fork, so a child builds its own pool
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._executor_pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=LLM_HEDGE_MAX_WORKERS, thread_name_prefix='llm-hedge')
+                self._executor_pid = pid
+            return self._executor
+
+    def snapshot(self):
+        return {
+            'hedge_delay_ms': self.hedge_delay_ms,
+            'failover_retries': LLM_FAILOVER_RETRIES,
+            'providers': [provider.snapshot() for provider in self.ranked()]
+        }
+
+
+llm_router = LLMRouter()
@@ -0,0 +1,161 @@
+"""httpx transport whose in-flight requests can be aborted from another thread.
+
+Closing a client or response does not wake a thread still blocked waiting for the
+response headers; shutting the socket down does. The transport runs an httpcore
+connection pool (HTTP/1.1, so one request per connection) over a network backend
+that remembers which thread last used each connection, built only from httpx and
+httpcore's public interfaces.
+"""
+import socket
+import threading
+import weakref
+import httpcore
+import httpx
+
+# httpcore exceptions the transport re-raises as their httpx namesakes, as httpx.HTTPTransport does
+_HTTPCORE_ERRORS = (
+    httpcore.TimeoutException, httpcore.NetworkError, httpcore.ProtocolError,
+    httpcore.ProxyError, httpcore.UnsupportedProtocol
+)
+
+
+def _httpx_error(error, request):
+    for cls in type(error).__mro__:
+        mapped = getattr(httpx, cls.__name__, None)
+        if isinstance(mapped, type) and issubclass(mapped, httpx.TransportError):
+            return mapped(str(error), request=request)
+    return httpx.TransportError(str(error), request=request)
+
+
+class CancellableStream(httpcore.NetworkStream):
+    """A connection that remembers which thread last used it, so that thread's request can be aborted"""
+
+    def __init__(self, stream, backend):
+        self._stream = stream
+        self._backend = backend
+        self.thread_id = None
+
+    def _enter(self):
+        self.thread_id = threading.get_ident()
+        if self.thread_id in self._backend.cancelled:
+            self.shutdown()
+            raise httpcore.ReadError('Request cancelled')
+
+    def read(self, max_bytes, timeout=None):
+        self._enter()
+        return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer, timeout=None):
+        self._enter()
+        return self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        self._stream = self._stream.start_tls(ssl_context, server_hostname, timeout)
+        return self
+
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+    def shutdown(self):
+        # Unlike close(), shutdown wakes a thread blocked reading the socket
+        try:
+            self._stream.get_extra_info('socket').shutdown(socket.SHUT_RDWR)
+        except (AttributeError, OSError):
+            pass
+
+
+class CancellableBackend(httpcore.NetworkBackend):
+    """Network backend whose connections can be shut down by the thread using them"""
+
+    def __init__(self):
+        self._backend = httpcore.SyncBackend()
+        self._streams = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.cancelled = set()
+
+    def _track(self, stream):
+        stream = CancellableStream(stream, self)
+        with self._lock:
+            self._streams.add(stream)
+        return stream
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        return self._track(self._backend.connect_tcp(host, port, timeout, local_address, socket_options))
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._track(self._backend.connect_unix_socket(path, timeout, socket_options))
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+    def cancel(self, thread_id):
+        """Abort the request a thread has in flight, and any it starts until reset()"""
+        with self._lock:
+            self.cancelled.add(thread_id)
+            streams = [stream for stream in self._streams if stream.thread_id == thread_id]
+        for stream in streams:
+            stream.shutdown()
+
+    def reset(self, thread_id):
+        with self._lock:
+            self.cancelled.discard(thread_id)
+
+
+class _ResponseStream(httpx.SyncByteStream):
+    def __init__(self, stream, request):
+        self._stream = stream
+        self._request = request
+
+    def __iter__(self):
+        try:
+            for part in self._stream:
+                yield part
+        except _HTTPCORE_ERRORS as e:
+            raise _httpx_error(e, self._request) from e
+
+    def close(self):
+        self._stream.close()
+
+
+class CancellableTransport(httpx.BaseTransport):
+    """HTTP/1.1 transport over a CancellableBackend"""
+
+    def __init__(self, backend, limits):
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=backend
+        )
+
+    def handle_request(self, request):
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions
+        )
+        try:
+            response = self._pool.handle_request(core_request)
+        except _HTTPCORE_ERRORS as e:
+            raise _httpx_error(e, request) from e
+
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream, request),
+            extensions=response.extensions
+        )
+
+    def close(self):
+        self._pool.close()
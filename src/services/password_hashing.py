@@ -0,0 +1,148 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import bcrypt
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Scheme used for new hashes; hashes in any other registered scheme are upgraded on login
+PASSWORD_HASH_SCHEME = os.environ.get('PASSWORD_HASH_SCHEME', 'bcrypt')
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 1000000))
+SCRYPT_N = int(os.environ.get('SCRYPT_N', 32768))
+
+# Hashing runs on a small pool so a login burst can't take every request thread. Each hash running or
+# queued holds the request thread waiting on it, so at most PASSWORD_HASH_MAX_PENDING may be in the pool
+# and any more get 503 at once. That bound is derived from the gunicorn threads per worker
+# (GUNICORN_THREADS, see gunicorn.conf.py), keeping PASSWORD_HASH_RESERVED_THREADS free for other endpoints.
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 8))
+PASSWORD_HASH_RESERVED_THREADS = int(os.environ.get('PASSWORD_HASH_RESERVED_THREADS', 2))
+PASSWORD_HASH_MAX_PENDING = max(GUNICORN_THREADS - PASSWORD_HASH_RESERVED_THREADS, 1)
+PASSWORD_HASH_WORKERS = min(int(os.environ.get('PASSWORD_HASH_WORKERS', 2)), PASSWORD_HASH_MAX_PENDING)
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+
+class HashingPoolBusy(Exception):
+    """Raised when too many hashes are queued; callers should answer 503"""
+
+
+class BcryptScheme:
+    name = 'bcrypt'
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+
+    def identify(self, hashed):
+        return hashed.startswith(('$2a$', '$2b$', '$2y$'))
+
+    def hash(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('ascii')
+
+    def verify(self, password, hashed):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('ascii'))
+        except ValueError:
+            return False
+
+    def needs_rehash(self, hashed):
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+class WerkzeugScheme:
+    """pbkdf2 and scrypt hashes in werkzeug's method$salt$hash format"""
+
+    def __init__(self, name, method):
+        self.name = name
+        self.method = method
+
+    def identify(self, hashed):
+        return hashed.startswith(self.name + ':')
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, password, hashed):
+        return check_password_hash(hashed, password)
+
+    def needs_rehash(self, hashed):
+        return hashed.split('$', 1)[0] != self.method
+
+
+_schemes = {}
+
+
+def register_scheme(scheme):
+    _schemes[scheme.name] = scheme
+
+
+register_scheme(BcryptScheme(BCRYPT_ROUNDS))
+register_scheme(WerkzeugScheme('pbkdf2', f'pbkdf2:sha256:{PBKDF2_ITERATIONS}'))
+register_scheme(WerkzeugScheme('scrypt', f'scrypt:{SCRYPT_N}:8:1'))
+
+
+def default_scheme():
+    return _schemes[PASSWORD_HASH_SCHEME]
+
+
+def identify_scheme(hashed):
+    for scheme in _schemes.values():
+        if hashed and scheme.identify(hashed):
+            return scheme
+    return None
+
+
+class HashingPool:
+    """Bounded executor for CPU-heavy hashing; at most max_pending hashes running or queued"""
+
+    def __init__(self, workers, max_pending, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max(max_pending, workers))
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolBusy('Too many password operations in progress')
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingPoolBusy('Timed out waiting for password hashing')
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT)
+        return _pool
+
+
+def hash_password(password):
+    """Hash with the configured default scheme"""
+    return hashing_pool().run(default_scheme().hash, password)
+
+
+def verify_password(password, hashed):
+    scheme = identify_scheme(hashed)
+    if scheme is None:
+        return False
+    return hashing_pool().run(scheme.verify, password, hashed)
+
+
+def needs_rehash(hashed):
+    """True when a hash is not in the default scheme or uses outdated cost parameters"""
+    scheme = identify_scheme(hashed)
+    default = default_scheme()
+    return scheme is not default or default.needs_rehash(hashed)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from src.models.user import db
+from src.models.preview_cache_entry import PreviewCacheEntry
+
+PREVIEW_CACHE_SIZE = int(os.environ.get('PREVIEW_CACHE_SIZE', 1024))
+PREVIEW_CACHE_TTL = int(os.environ.get('PREVIEW_CACHE_TTL', 3600))
+# Share cached previews across gunicorn workers through the preview_cache_entry table
+PREVIEW_CACHE_PERSIST = os.environ.get('PREVIEW_CACHE_PERSIST', '').lower() in ('1', 'true', 'yes')
+PREVIEW_CACHE_PURGE_EVERY = 100
+
+_WHITESPACE = re.compile(r'\s+')
+_SPACE_BEFORE_PUNCTUATION = re.compile(r' ([.,;:!?])')
+
+
+def _normalize(text):
+    text = _WHITESPACE.sub(' ', text or '').strip().casefold()
+    return _SPACE_BEFORE_PUNCTUATION.sub(r'\1', text)
+
+
+def fingerprint(request):
+    """Stable key for a chat completion request, ignoring case and whitespace differences"""
+    normalized = {
+        'model': request.get('model'),
+        'max_tokens': request.get('max_tokens'),
+        'temperature': request.get('temperature'),
+        'messages': [
+            [message.get('role'), _normalize(message.get('content'))]
+            for message in request.get('messages', [])
+        ]
+    }
+    encoded = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class PreviewCache:
+    """Bounded in-process LRU with TTL, optionally backed by a shared table"""
+
+    def __init__(self, max_size=PREVIEW_CACHE_SIZE, ttl=PREVIEW_CACHE_TTL, persist=PREVIEW_CACHE_PERSIST):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist = persist
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {
+            'hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self.stats['expirations'] += 1
+
+        if self.persist:
+            value = self._get_persistent(key)
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.stats['persistent_hits'] += 1
+                return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.persist:
+            self._set_persistent(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['persistent_hits'] + self.stats['misses']
+            hits = self.stats['hits'] + self.stats['persistent_hits']
+            return dict(
+                self.stats,
+                size=len(self._entries),
+                max_size=self.max_size,
+                ttl_seconds=self.ttl,
+                persist=self.persist,
+                hit_ratio=round(hits / lookups, 4) if lookups else None
+            )
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def _get_persistent(self, key):
+        try:
+            entry = db.session.get(PreviewCacheEntry, key)
+            if entry is None:
+                return None
+            if entry.expires_at <= datetime.utcnow():
+                db.session.delete(entry)
+                db.session.commit()
+                return None
+            return entry.preview
+        except Exception:
+            db.session.rollback()
+            return None
+
+    def _set_persistent(self, key, value):
+        now = datetime.utcnow()
+        try:
+            db.session.merge(PreviewCacheEntry(
+                fingerprint=key,
+                preview=value,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl)
+            ))
+            db.session.commit()
+        except Exception:
+            # Another worker stored the same preview first
+            db.session.rollback()
+            return
+
+        self._writes += 1
+        if self._writes % PREVIEW_CACHE_PURGE_EVERY == 0:
+            try:
+                PreviewCacheEntry.query.filter(PreviewCacheEntry.expires_at <= now).delete()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+
+
+preview_cache = PreviewCache()
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from src.models.user import User, db
+
+# How long a worker trusts a principal before re-reading the user row
+AUTH_PRINCIPAL_TTL = float(os.environ.get('AUTH_PRINCIPAL_TTL', 30))
+
+_cache = {}  # user_id -> (is_admin, is_active, expires_at)
+_invalidated_at = {}  # user_id -> wall-clock time of the last invalidation in this worker
+_lock = threading.Lock()
+
+
+class Principal:
+    """Authenticated identity; the full User row is loaded only when something needs it"""
+
+    def __init__(self, user_id, is_admin, is_active, user=None):
+        self.id = user_id
+        self.is_admin = is_admin
+        self.is_active = is_active
+        self._user = user
+
+    def __repr__(self):
+        return f'<Principal {self.id}>'
+
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        # Anything beyond identity (to_dict, username, ...) comes from the User row
+        if name.startswith('_'):
+            raise AttributeError(name)
+        user = self.user
+        if user is None:
+            raise AttributeError(name)
+        return getattr(user, name)
+
+
+def resolve_principal(claims):
+    """Build the principal for decoded token claims, touching the database at most once per TTL"""
+    user_id = claims['user_id']
+
+    with _lock:
+        entry = _cache.get(user_id)
+        invalidated_at = _invalidated_at.get(user_id, 0)
+    if entry and entry[2] > time.monotonic():
+        return Principal(user_id, entry[0], entry[1])
+
+    # A recently issued token carries claims that were read from the database at issue time
+    issued_at = claims.get('iat', 0)
+    if ('is_admin' in claims and 'is_active' in claims
+            and time.time() - issued_at < AUTH_PRINCIPAL_TTL and issued_at > invalidated_at):
+        return Principal(user_id, bool(claims['is_admin']), bool(claims['is_active']))
+
+    user = db.session.get(User, user_id)
+    if not user:
+        return None
+
+    remember_user(user)
+    return Principal(user.id, user.is_admin, user.is_active, user=user)
+
+
+def remember_user(user):
+    with _lock:
+        _cache[user.id] = (user.is_admin, user.is_active, time.monotonic() + AUTH_PRINCIPAL_TTL)
+
+
+def invalidate_principal(user_id):
+    """Drop a cached principal after the user changed; other workers catch up within the TTL"""
+    with _lock:
+        _cache.pop(user_id, None)
+        _invalidated_at[user_id] = time.time()
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from src.models.user import db
+from src.models.content_template import ContentTemplate
+
+# How often a worker checks whether the template table changed
+TEMPLATE_REGISTRY_CHECK_INTERVAL = float(os.environ.get('TEMPLATE_REGISTRY_CHECK_INTERVAL', 5))
+
+TEMPLATE_FIELDS = (
+    'id', 'name', 'content_type', 'template_prompt', 'default_word_count',
+    'base_price', 'is_active', 'created_at', 'updated_at'
+)
+
+
+class TemplateSnapshot:
+    """Read-only copy of a ContentTemplate row that can be shared across requests"""
+
+    __slots__ = TEMPLATE_FIELDS
+
+    def __init__(self, template):
+        for field in TEMPLATE_FIELDS:
+            object.__setattr__(self, field, getattr(template, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TemplateSnapshot is read-only')
+
+    def __repr__(self):
+        return f'<TemplateSnapshot {self.name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'content_type': self.content_type,
+            'template_prompt': self.template_prompt,
+            'default_word_count': self.default_word_count,
+            'base_price': self.base_price,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class TemplateRegistry:
+    """Per-worker copy of the active content templates, reloaded when the table changes"""
+
+    def __init__(self, check_interval=TEMPLATE_REGISTRY_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._templates = []
+        self._by_type = {}
+        self._version = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, content_type):
+        """Return the active template for a content type, or None"""
+        self._refresh_if_needed()
+        return self._by_type.get(content_type)
+
+    def active_templates(self):
+        self._refresh_if_needed()
+        return list(self._templates)
+
+    def version(self):
+        """Opaque string that changes whenever the template table changes"""
+        self._refresh_if_needed()
+        count, last_updated = self._version
+        return f"{count}-{last_updated.isoformat() if last_updated else 'none'}"
+
+    def invalidate(self):
+        """Force a reload on the next lookup (call after editing templates in this worker)"""
+        with self._lock:
+            self._version = None
+            self._next_check = 0.0
+
+    def _refresh_if_needed(self):
+        if time.monotonic() < self._next_check:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check:
+                return
+
+            # Any insert, delete or ORM update changes the row count or latest updated_at
+            version = tuple(db.session.query(
+                db.func.count(ContentTemplate.id),
+                db.func.max(ContentTemplate.updated_at)
+            ).one())
+
+            if version != self._version:
+                templates = [
+                    TemplateSnapshot(template)
+                    for template in ContentTemplate.query.filter_by(is_active=True).order_by(ContentTemplate.id).all()
+                ]
+                by_type = {}
+                for template in templates:
+                    by_type.setdefault(template.content_type, template)
+
+                self._templates = templates
+                self._by_type = by_type
+                self._version = version
+
+            self._next_check = now + self.check_interval
+
+
+template_registry = TemplateRegistry()
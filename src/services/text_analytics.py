@@ -0,0 +1,180 @@
+import math
+import re
+from functools import lru_cache
+
+# One regex walks the text once: headings at line start, words, sentence ends and line breaks
+_TOKEN = re.compile(
+    r"(?P<heading>^[ \t]{0,3}#{1,6}(?=[ \t]))"
+    r"|(?P<word>[^\W_]+(?:['’\-][^\W_]+)*)"
+    r"|(?P<end>[.!?]+)"
+    r"|(?P<newline>\n[ \t]*\n?)",
+    re.MULTILINE
+)
+_VOWEL_GROUPS = re.compile(r'[aeiouy]+')
+
+# Column order of the feature matrix consumed by score_features()
+FEATURE_COLUMNS = (
+    'word_count',
+    'target_word_count',
+    'mean_sentence_length',
+    'sentence_length_stdev',
+    'flesch_reading_ease',
+    'heading_count',
+    'keyword_coverage'
+)
+
+
+@lru_cache(maxsize=50000)
+def count_syllables(word):
+    """Vowel-group estimate of syllables in a word"""
+    word = word.lower()
+    count = len(_VOWEL_GROUPS.findall(word))
+    if word.endswith('e') and not word.endswith(('le', 'ee')) and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+def parse_keywords(keywords):
+    """Keywords from order requirements, given either as a list or a comma separated string"""
+    if not keywords:
+        return []
+    if isinstance(keywords, str):
+        keywords = keywords.split(',')
+    return [' '.join(str(keyword).lower().split()) for keyword in keywords if str(keyword).strip()]
+
+
+def analyze_text(text, keywords=None):
+    """Compute word, sentence, readability, heading and keyword statistics in one pass"""
+    word_count = 0
+    syllable_count = 0
+    sentence_lengths = []
+    heading_levels = {}
+    paragraph_count = 0
+    words = []
+
+    current_sentence = 0
+    in_heading = False
+    in_paragraph = False
+
+    for match in _TOKEN.finditer(text or ''):
+        kind = match.lastgroup
+        if kind == 'word':
+            word = match.group()
+            word_count += 1
+            syllable_count += count_syllables(word)
+            words.append(word.lower())
+            if not in_heading:
+                current_sentence += 1
+                in_paragraph = True
+        elif kind == 'end':
+            if current_sentence:
+                sentence_lengths.append(current_sentence)
+                current_sentence = 0
+        elif kind == 'heading':
+            level = match.group().strip().count('#')
+            heading_levels[level] = heading_levels.get(level, 0) + 1
+            in_heading = True
+        else:
+            # A blank line ends a paragraph; any line break ends a heading
+            in_heading = False
+            if match.group().count('\n') > 1:
+                if current_sentence:
+                    sentence_lengths.append(current_sentence)
+                    current_sentence = 0
+                if in_paragraph:
+                    paragraph_count += 1
+                    in_paragraph = False
+
+    if current_sentence:
+        sentence_lengths.append(current_sentence)
+    if in_paragraph:
+        paragraph_count += 1
+
+    sentence_count = len(sentence_lengths)
+    mean_length = sum(sentence_lengths) / sentence_count if sentence_count else 0.0
+    if sentence_count > 1:
+        variance = sum((length - mean_length) ** 2 for length in sentence_lengths) / (sentence_count - 1)
+        stdev_length = math.sqrt(variance)
+    else:
+        stdev_length = 0.0
+
+    if word_count and sentence_count:
+        flesch = 206.835 - 1.015 * (word_count / sentence_count) - 84.6 * (syllable_count / word_count)
+    else:
+        flesch = 0.0
+
+    keyword_list = parse_keywords(keywords)
+    keywords_found = []
+    if keyword_list:
+        joined = f" {' '.join(words)} "
+        keywords_found = [keyword for keyword in keyword_list if f' {keyword} ' in joined]
+
+    return {
+        'word_count': word_count,
+        'sentence_count': sentence_count,
+        'paragraph_count': paragraph_count,
+        'mean_sentence_length': round(mean_length, 3),
+        'sentence_length_stdev': round(stdev_length, 3),
+        'min_sentence_length': min(sentence_lengths) if sentence_lengths else 0,
+        'max_sentence_length': max(sentence_lengths) if sentence_lengths else 0,
+        'syllables_per_word': round(syllable_count / word_count, 3) if word_count else 0.0,
+        'flesch_reading_ease': round(flesch, 3),
+        'heading_count': sum(heading_levels.values()),
+        'heading_levels': heading_levels,
+        'keyword_coverage': len(keywords_found) / len(keyword_list) if keyword_list else None,
+        'keywords_missing': [keyword for keyword in keyword_list if keyword not in keywords_found]
+    }
+
+
+def feature_vector(stats, target_word_count):
+    """Row of the feature matrix for one analyzed text"""
+    coverage = stats['keyword_coverage']
+    return (
+        stats['word_count'],
+        target_word_count or 0,
+        stats['mean_sentence_length'],
+        stats['sentence_length_stdev'],
+        stats['flesch_reading_ease'],
+        stats['heading_count'],
+        math.nan if coverage is None else coverage
+    )
+
+
+def score_features(features):
+    """Vectorized quality score in [0, 1] for an (n, len(FEATURE_COLUMNS)) matrix"""
+    import numpy as np
+
+    features = np.asarray(features, dtype=float).reshape(-1, len(FEATURE_COLUMNS))
+    words, target, mean_length, stdev_length, flesch, headings, coverage = features.T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Closeness to the requested length; without a target any non-empty text is on target
+        length_ratio = np.where(
+            target > 0,
+            np.nan_to_num(np.minimum(words / target, target / words)),
+            (words > 0).astype(float)
+        )
+        # Sentences of ~17 words read best; very short or very long ones score lower
+        sentence_score = np.where(mean_length > 0, 1 - np.clip(np.abs(mean_length - 17) / 17, 0, 1), 0.0)
+        variety_score = np.where(mean_length > 0, np.clip(np.nan_to_num(stdev_length / mean_length) / 0.5, 0, 1), 0.0)
+        readability_score = 1 - np.clip(np.abs(flesch - 60) / 60, 0, 1)
+        # Longer pieces should have roughly one heading per 250 words
+        expected_headings = np.maximum(np.floor(words / 250), 1)
+        structure_score = np.where(words >= 300, np.clip(headings / expected_headings, 0, 1), 1.0)
+        keyword_score = np.where(np.isnan(coverage), 1.0, coverage)
+
+    score = (
+        length_ratio * 0.35 +
+        sentence_score * 0.15 +
+        variety_score * 0.1 +
+        readability_score * 0.15 +
+        structure_score * 0.1 +
+        keyword_score * 0.15
+    )
+    return np.clip(np.where(words > 0, score, 0.0), 0.0, 1.0)
+
+
+def quality_score(text, target_word_count, keywords=None):
+    """Quality score for a single generated text"""
+    stats = analyze_text(text, keywords)
+    return float(score_features([feature_vector(stats, target_word_count)])[0])
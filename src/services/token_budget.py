@@ -0,0 +1,105 @@
+import math
+import os
+import threading
+import time
+from src.models.user import db
+from src.models.generation_usage import GenerationUsage
+
+# max_tokens = target words x this quantile of observed completion tokens per requested word x headroom
+TOKEN_BUDGET_QUANTILE = float(os.environ.get('TOKEN_BUDGET_QUANTILE', 0.95))
+TOKEN_BUDGET_HEADROOM = float(os.environ.get('TOKEN_BUDGET_HEADROOM', 1.1))
+# Finished generations per content type the quantile is taken over, and how many it needs to be trusted
+TOKEN_BUDGET_SAMPLE_SIZE = int(os.environ.get('TOKEN_BUDGET_SAMPLE_SIZE', 500))
+TOKEN_BUDGET_MIN_SAMPLES = int(os.environ.get('TOKEN_BUDGET_MIN_SAMPLES', 20))
+TOKEN_BUDGET_REFRESH_SECONDS = float(os.environ.get('TOKEN_BUDGET_REFRESH_SECONDS', 300))
+TOKEN_BUDGET_MIN_TOKENS = int(os.environ.get('TOKEN_BUDGET_MIN_TOKENS', 100))
+# Per request; longer pieces are finished by continuation requests
+TOKEN_BUDGET_MAX_TOKENS = int(os.environ.get('TOKEN_BUDGET_MAX_TOKENS', 4000))
+# Used until a content type has enough history; the budget generation always used before
+DEFAULT_TOKENS_PER_WORD = 2.0
+
+
+def quantile(values, q):
+    """Linear-interpolated quantile of a non-empty list"""
+    values = sorted(values)
+    position = (len(values) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class TokenBudget:
+    """Per-worker tokens-per-word estimates by content type, refreshed from generation_usage"""
+
+    def __init__(self, refresh_seconds=TOKEN_BUDGET_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._ratios = {}
+        self._lock = threading.Lock()
+
+    def tokens_per_word(self, content_type):
+        """Quantile of completion tokens per requested word, or the default while history is short"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._ratios.get(content_type)
+        if entry is None or now - entry['loaded_at'] >= self.refresh_seconds:
+            entry = self._load(content_type, now)
+            with self._lock:
+                self._ratios[content_type] = entry
+        return entry['tokens_per_word']
+
+    def max_tokens(self, content_type, word_count):
+        """Completion budget for a request expected to write about word_count words"""
+        budget = math.ceil((word_count or 0) * self.tokens_per_word(content_type) * TOKEN_BUDGET_HEADROOM)
+        return min(max(budget, TOKEN_BUDGET_MIN_TOKENS), TOKEN_BUDGET_MAX_TOKENS)
+
+    def _load(self, content_type, now):
+        # Truncated runs only tell us a lower bound, so only completed ones count
+        rows = db.session.query(
+            GenerationUsage.completion_tokens, GenerationUsage.target_word_count
+        ).filter(
+            GenerationUsage.content_type == content_type,
+            GenerationUsage.finish_reason == 'stop',
+            GenerationUsage.completion_tokens.isnot(None),
+            GenerationUsage.target_word_count > 0
+        ).order_by(GenerationUsage.id.desc()).limit(TOKEN_BUDGET_SAMPLE_SIZE).all()
+
+        ratios = [row.completion_tokens / row.target_word_count for row in rows]
+        if len(ratios) >= TOKEN_BUDGET_MIN_SAMPLES:
+            tokens_per_word = quantile(ratios, TOKEN_BUDGET_QUANTILE)
+        else:
+            tokens_per_word = DEFAULT_TOKENS_PER_WORD
+
+        return {
+            'tokens_per_word': tokens_per_word,
+            'samples': len(ratios),
+            'median_tokens_per_word': quantile(ratios, 0.5) if ratios else None,
+            'loaded_at': now
+        }
+
+    def clear(self):
+        with self._lock:
+            self._ratios.clear()
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            ratios = dict(self._ratios)
+        return {
+            'quantile': TOKEN_BUDGET_QUANTILE,
+            'headroom': TOKEN_BUDGET_HEADROOM,
+            'min_samples': TOKEN_BUDGET_MIN_SAMPLES,
+            'max_tokens_cap': TOKEN_BUDGET_MAX_TOKENS,
+            'content_types': {
+                content_type: {
+                    'tokens_per_word': round(entry['tokens_per_word'], 4),
+                    'median_tokens_per_word': round(entry['median_tokens_per_word'], 4)
+                    if entry['median_tokens_per_word'] is not None else None,
+                    'samples': entry['samples'],
+                    'age_seconds': round(now - entry['loaded_at'], 1)
+                }
+                for content_type, entry in ratios.items()
+            }
+        }
+
+
+token_budget = TokenBudget()
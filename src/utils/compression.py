@@ -0,0 +1,213 @@
+import gzip
+import os
+import threading
+import time
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+# Compress streamed responses (SSE) too, flushing after every chunk so events are not held back
+COMPRESS_STREAMS = os.environ.get('COMPRESS_STREAMS', '1').lower() in ('1', 'true', 'yes')
+COMPRESS_MIMETYPES = frozenset(os.environ.get(
+    'COMPRESS_MIMETYPES',
+    'application/json,text/html,text/plain,text/css,text/csv,text/event-stream,'
+    'application/javascript,text/javascript,image/svg+xml'
+).split(','))
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=COMPRESS_BR_LEVEL)
+
+
+# Preference order when the client rates encodings equally
+_encoders = {}
+if brotli is not None:
+    _encoders['br'] = (_brotli, lambda: _BrotliStream(COMPRESS_BR_LEVEL))
+_encoders['gzip'] = (_gzip, lambda: _GzipStream(COMPRESS_GZIP_LEVEL))
+
+
+def available_encodings():
+    return tuple(_encoders)
+
+
+def compress_data(encoding, data):
+    """Compress a whole body with the configured level for the encoding"""
+    return _encoders[encoding][0](data)
+
+
+class CompressionStats:
+    """Per-encoding totals of bytes in and out and CPU time spent compressing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encodings = {}
+        self._skipped = {}
+
+    def record(self, encoding, raw_size, compressed_size, cpu_seconds):
+        with self._lock:
+            stats = self._encodings.setdefault(encoding, {
+                'responses': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0
+            })
+            stats['responses'] += 1
+            stats['bytes_in'] += raw_size
+            stats['bytes_out'] += compressed_size
+            stats['cpu_seconds'] += cpu_seconds
+
+    def skip(self, reason):
+        with self._lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            encodings = {}
+            for encoding, stats in self._encodings.items():
+                encodings[encoding] = dict(
+                    stats,
+                    cpu_seconds=round(stats['cpu_seconds'], 4),
+                    ratio=round(stats['bytes_in'] / stats['bytes_out'], 3) if stats['bytes_out'] else None,
+                    cpu_us_per_kb=round(stats['cpu_seconds'] * 1e6 / (stats['bytes_in'] / 1024), 2) if stats['bytes_in'] else None
+                )
+            return {
+                'min_size': COMPRESS_MIN_SIZE,
+                'gzip_level': COMPRESS_GZIP_LEVEL,
+                'brotli_level': COMPRESS_BR_LEVEL if brotli is not None else None,
+                'streams': COMPRESS_STREAMS,
+                'encodings': encodings,
+                'skipped': dict(self._skipped)
+            }
+
+
+compression_stats = CompressionStats()
+
+
+def negotiate_encoding(accept_encodings):
+    """Best encoding we support from a parsed Accept-Encoding header, or None for identity"""
+    best, best_quality = None, 0
+    for encoding in _encoders:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _weaken_etag(response):
+    # The compressed body differs byte-for-byte, so only a weak validator still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def _compress_stream(response, encoding):
+    iterable = response.response
+    stream = _encoders[encoding][1]()
+
+    def generate():
+        raw_size = 0
+        compressed_size = 0
+        cpu_seconds = 0.0
+        try:
+            for data in iterable:
+                if isinstance(data, str):
+                    data = data.encode('utf-8')
+                started = time.thread_time()
+                compressed = stream.chunk(data)
+                cpu_seconds += time.thread_time() - started
+                raw_size += len(data)
+                compressed_size += len(compressed)
+                if compressed:
+                    yield compressed
+            tail = stream.finish()
+            compressed_size += len(tail)
+            if tail:
+                yield tail
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+            compression_stats.record(encoding, raw_size, compressed_size, cpu_seconds)
+
+    response.response = generate()
+    response.headers.pop('Content-Length', None)
+
+
+def init_compression(app):
+    """Negotiate gzip/brotli for every compressible response above the size threshold"""
+    app.config.setdefault(
+        'COMPRESSION_STATS_HEADERS',
+        os.environ.get('COMPRESSION_STATS_HEADERS', '').lower() in ('1', 'true', 'yes') or app.debug
+    )
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in COMPRESS_MIMETYPES or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        if response.status_code == 304:
+            _weaken_etag(response)
+            return response
+        if response.status_code < 200 or response.status_code == 204 or response.direct_passthrough:
+            return response
+
+        if response.is_streamed:
+            if not COMPRESS_STREAMS:
+                compression_stats.skip('streamed')
+                return response
+            _compress_stream(response, encoding)
+        else:
+            data = response.get_data()
+            if len(data) < COMPRESS_MIN_SIZE:
+                compression_stats.skip('below_min_size')
+                return response
+
+            started = time.thread_time()
+            compressed = _encoders[encoding][0](data)
+            cpu_seconds = time.thread_time() - started
+            if len(compressed) >= len(data):
+                compression_stats.skip('incompressible')
+                return response
+
+            compression_stats.record(encoding, len(data), len(compressed), cpu_seconds)
+            response.set_data(compressed)
+            if app.config['COMPRESSION_STATS_HEADERS']:
+                response.headers['X-Compression-Ratio'] = f'{len(data) / len(compressed):.2f}'
+                response.headers['X-Compression-Cpu-Ms'] = f'{cpu_seconds * 1000:.3f}'
+
+        response.headers['Content-Encoding'] = encoding
+        _weaken_etag(response)
+        return response
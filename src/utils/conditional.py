@@ -0,0 +1,61 @@
+import hashlib
+import os
+from flask import current_app, request
+from src.models.user import db
+from src.models.order import Order
+from src.models.content import Content
+
+# Templates change rarely and are the same for everyone, so shared caches may keep them briefly
+CONTENT_TEMPLATES_MAX_AGE = int(os.environ.get('CONTENT_TEMPLATES_MAX_AGE', 300))
+# Per-user resources: only the browser may store them, and it must revalidate every time
+PRIVATE_REVALIDATE = 'private, no-cache'
+
+
+def make_etag(*parts):
+    """Strong validator for a representation identified by the given version parts"""
+    key = '|'.join('' if part is None else (part.isoformat() if hasattr(part, 'isoformat') else str(part)) for part in parts)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def order_version(order_id):
+    """(user_id, order etag, content etag) read from the version columns only, or None if the order is missing"""
+    row = db.session.query(
+        Order.user_id,
+        Order.updated_at,
+        Content.id,
+        Content.updated_at,
+        Content.blob_hash
+    ).outerjoin(Content, Content.order_id == Order.id).filter(Order.id == order_id).first()
+    if row is None:
+        return None
+    user_id, order_updated_at, content_id, content_updated_at, blob_hash = row
+    content_etag = make_etag('content', content_id, content_updated_at, blob_hash) if content_id else None
+    return user_id, make_etag('order', order_id, order_updated_at, content_etag), content_etag
+
+
+def order_etag(order):
+    content = order.content
+    content_etag = content_etag_for(content) if content else None
+    return make_etag('order', order.id, order.updated_at, content_etag)
+
+
+def content_etag_for(content):
+    return make_etag('content', content.id, content.updated_at, content.blob_hash)
+
+
+def is_not_modified(etag):
+    """True when the client's If-None-Match already names this representation"""
+    # If-None-Match uses weak comparison; compressed responses carry the weak form of our ETags
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag, cache_control=PRIVATE_REVALIDATE):
+    """Empty 304 carrying the validator, as required by RFC 9110"""
+    return conditional(current_app.response_class(status=304), etag, cache_control)
+
+
+def conditional(response, etag, cache_control=PRIVATE_REVALIDATE):
+    """Attach the ETag and Cache-Control headers to a response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
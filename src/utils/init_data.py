@@ -1,5 +1,6 @@
 from src.models.user import db
 from src.models.content_template import ContentTemplate
+from src.services.template_registry import template_registry
 
 def initialize_content_templates():
     """Initialize default content templates if they don't exist"""
@@ -54,6 +55,7 @@ def initialize_content_templates():
     
     try:
         db.session.commit()
+        template_registry.invalidate()
         print("Content templates initialized successfully")
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,110 @@
+import os
+import shutil
+import time
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from src.utils.query_stats import observe_queries
+
+# Optional bearer token for scrapes; /metrics is open when unset
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+LLM_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    ['blueprint', 'endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+http_request_queries = Histogram(
+    'http_request_db_queries', 'DB queries issued per request',
+    ['blueprint', 'endpoint'], buckets=COUNT_BUCKETS
+)
+http_request_db_time = Histogram(
+    'http_request_db_seconds', 'Time spent in DB queries per request',
+    ['blueprint', 'endpoint'], buckets=LATENCY_BUCKETS
+)
+db_query_duration = Histogram(
+    'db_query_duration_seconds', 'Latency of individual DB queries', buckets=DB_BUCKETS
+)
+llm_request_duration = Histogram(
+    'llm_request_duration_seconds', 'Latency of chat completion calls (time to headers for streams)',
+    ['model', 'outcome'], buckets=LLM_BUCKETS
+)
+llm_tokens = Counter(
+    'llm_tokens', 'Tokens reported in response.usage', ['model', 'kind']
+)
+content_generations = Counter(
+    'content_generations', 'Content generation attempts', ['content_type', 'outcome']
+)
+
+
+def observe_llm_call(model, seconds, outcome):
+    llm_request_duration.labels(model=model, outcome=outcome).observe(seconds)
+
+
+def record_llm_usage(model, usage):
+    if usage is None:
+        return
+    llm_tokens.labels(model=model, kind='prompt').inc(usage.prompt_tokens or 0)
+    llm_tokens.labels(model=model, kind='completion').inc(usage.completion_tokens or 0)
+
+
+def record_generation(content_type, outcome):
+    content_generations.labels(content_type=content_type or 'unknown', outcome=outcome).inc()
+
+
+def reset_multiprocess_dir():
+    """Empty PROMETHEUS_MULTIPROC_DIR before the processes writing to it start; samples from a
+    previous run would otherwise be summed into the new one"""
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def _registry():
+    # Under gunicorn each worker writes its samples to PROMETHEUS_MULTIPROC_DIR; a scrape merges them all
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def init_metrics(app):
+    """Record route, DB, LLM and generation metrics and serve them at /metrics"""
+    observe_queries(db_query_duration.observe)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started_at', None)
+        if started is None:
+            return response
+
+        blueprint = request.blueprint or 'app'
+        endpoint = request.endpoint or 'unmatched'
+        http_request_duration.labels(
+            blueprint=blueprint,
+            endpoint=endpoint,
+            method=request.method,
+            status=str(response.status_code)
+        ).observe(time.perf_counter() - started)
+
+        # Counted by init_query_stats
+        if 'query_count' in g:
+            http_request_queries.labels(blueprint=blueprint, endpoint=endpoint).observe(g.query_count)
+            http_request_db_time.labels(blueprint=blueprint, endpoint=endpoint).observe(g.query_time)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            return Response('Unauthorized', status=401)
+        return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,84 @@
+import base64
+import json
+import os
+from datetime import datetime
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 200))
+
+
+class PaginationError(ValueError):
+    """Raised for malformed cursors, page sizes or filter values"""
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor pointing just after (created_at, id)"""
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+
+def parse_positive_int(value, name, maximum=None):
+    """A request parameter as an integer of at least 1, capped at maximum"""
+    if isinstance(value, bool):
+        raise PaginationError(f'{name} must be an integer')
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError(f'{name} must be an integer')
+    if number < 1:
+        raise PaginationError(f'{name} must be at least 1')
+    return min(number, maximum) if maximum is not None else number
+
+
+def parse_page_size(args):
+    return parse_positive_int(args.get('limit', DEFAULT_PAGE_SIZE), 'limit', MAX_PAGE_SIZE)
+
+
+def parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise PaginationError(f'{name} must be an ISO 8601 date or datetime')
+
+
+def parse_list(value):
+    """Split a comma separated query parameter"""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def filter_created_range(query, model, args):
+    """Apply created_after / created_before query parameters"""
+    if args.get('created_after'):
+        query = query.filter(model.created_at >= parse_datetime(args['created_after'], 'created_after'))
+    if args.get('created_before'):
+        query = query.filter(model.created_at < parse_datetime(args['created_before'], 'created_before'))
+    return query
+
+
+def keyset_paginate(query, model, args):
+    """Return one page of rows newest first, ordered on (created_at, id), and the next cursor"""
+    limit = parse_page_size(args)
+
+    if args.get('cursor'):
+        created_at, row_id = decode_cursor(args['cursor'])
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+
+    # Fetching one extra row tells us whether another page exists without a COUNT
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
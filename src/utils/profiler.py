@@ -0,0 +1,101 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import uuid
+from flask import g, request
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/tmp/contentgenius-profiles')
+# Oldest captures are deleted beyond this many
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 100))
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = '_profile'
+
+# <unix ms>-<endpoint>-<id>.pstats; anything else is refused by the download endpoint
+PROFILE_NAME = re.compile(r'^(\d+)-([\w.]+)-([0-9a-f]{8})\.pstats$')
+
+
+def _requested():
+    return PROFILE_HEADER in request.headers or PROFILE_QUERY_PARAM in request.args
+
+
+def init_profiler(app):
+    """Run a request under cProfile when an admin asks for it with X-Profile or ?_profile"""
+
+    @app.before_request
+    def start_profile():
+        # The only cost for ordinary requests is these two lookups
+        if not _requested():
+            return
+
+        from src.routes.auth import principal_from_request
+        principal = principal_from_request()
+        if principal is None or not principal.is_admin:
+            return
+
+        profile = cProfile.Profile()
+        g.profile = profile
+        g.profile_started = time.perf_counter()
+        profile.enable()
+
+    @app.after_request
+    def stop_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+
+        elapsed = time.perf_counter() - g.pop('profile_started')
+        name = f"{int(time.time() * 1000)}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}.pstats"
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile.dump_stats(os.path.join(PROFILE_DIR, name))
+        _prune()
+
+        response.headers['X-Profile-Id'] = name
+        response.headers['X-Profile-Ms'] = f'{elapsed * 1000:.2f}'
+        return response
+
+
+def _prune():
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if PROFILE_NAME.match(name))
+    for name in names[:max(len(names) - PROFILE_MAX_FILES, 0)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    """Captured profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        match = PROFILE_NAME.match(name)
+        if not match:
+            continue
+        profiles.append({
+            'id': name,
+            'endpoint': match.group(2),
+            'captured_at': int(match.group(1)) / 1000,
+            'size': os.path.getsize(os.path.join(PROFILE_DIR, name))
+        })
+    return sorted(profiles, key=lambda profile: profile['id'], reverse=True)
+
+
+def profile_path(name):
+    """Path of a captured profile, or None for unknown or malformed names"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def profile_summary(path, sort='cumulative', limit=40):
+    """pstats report as text, for a quick look without downloading"""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
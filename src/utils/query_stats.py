@@ -0,0 +1,67 @@
+import os
+import time
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Called with the duration of every statement, e.g. by the metrics histogram
+_observers = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started_at'].pop()
+    if has_app_context() and 'query_count' in g:
+        g.query_count += 1
+        g.query_time += duration
+    for observer in _observers:
+        observer(duration)
+
+
+def _handle_error(context):
+    # A statement that raised never reaches after_cursor_execute; drop its start time so the
+    # pooled connection doesn't carry it into later timings
+    if context.connection is not None:
+        started_at = context.connection.info.get('query_started_at')
+        if started_at:
+            started_at.pop()
+
+
+def _listen():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+
+def observe_queries(observer):
+    """Call observer(seconds) after every statement, on the same listeners as the per-request stats"""
+    _listen()
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def init_query_stats(app):
+    """Count queries and DB time per request, optionally reporting them in response headers"""
+    app.config.setdefault(
+        'QUERY_STATS_HEADERS',
+        os.environ.get('QUERY_STATS_HEADERS', '').lower() in ('1', 'true', 'yes') or app.debug
+    )
+
+    _listen()
+
+    @app.before_request
+    def start_query_stats():
+        g.query_count = 0
+        g.query_time = 0.0
+
+    @app.after_request
+    def add_query_stats_headers(response):
+        if app.config['QUERY_STATS_HEADERS'] and 'query_count' in g:
+            response.headers['X-DB-Query-Count'] = str(g.query_count)
+            response.headers['X-DB-Time-Ms'] = f'{g.query_time * 1000:.2f}'
+        return response
@@ -0,0 +1,148 @@
+import json
+from flask import Response
+from src.models.order import Order
+from src.models.content import Content
+from src.models.content_blob import ContentBlob
+from src.models.payment import Payment
+from src.services.blob_store import blob_text
+from sqlalchemy import select
+from src.utils.pagination import parse_list
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the standard library encoder
+    orjson = None
+
+
+class FieldSelectionError(ValueError):
+    """Raised when ?fields= names a field the resource does not have"""
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _content_text(inline, blob_hash, codec, data):
+    if blob_hash is None:
+        return inline
+    return blob_text(blob_hash, codec, data)
+
+
+def _blob_column(column):
+    return select(column).where(ContentBlob.hash == Content.blob_hash).scalar_subquery()
+
+
+def _json_dict(value):
+    if value:
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+
+# Field name -> (column, converter); mirrors each model's to_dict().
+# A field built from several columns lists them in a tuple and the converter receives each value.
+ORDER_FIELDS = {
+    'id': (Order.id, None),
+    'user_id': (Order.user_id, None),
+    'content_type': (Order.content_type, None),
+    'title': (Order.title, None),
+    'description': (Order.description, None),
+    'requirements': (Order.requirements, _json_dict),
+    'status': (Order.status, None),
+    'priority': (Order.priority, None),
+    'word_count': (Order.word_count, None),
+    'price': (Order.price, None),
+    'created_at': (Order.created_at, _iso),
+    'updated_at': (Order.updated_at, _iso),
+    'completed_at': (Order.completed_at, _iso)
+}
+
+CONTENT_FIELDS = {
+    'id': (Content.id, None),
+    'order_id': (Content.order_id, None),
+    'generated_content': (
+        (Content.inline_content, Content.blob_hash, _blob_column(ContentBlob.codec), _blob_column(ContentBlob.data)),
+        _content_text
+    ),
+    'content_format': (Content.content_format, None),
+    'quality_score': (Content.quality_score, None),
+    'revision_count': (Content.revision_count, None),
+    'is_approved': (Content.is_approved, None),
+    'is_truncated': (Content.is_truncated, None),
+    'created_at': (Content.created_at, _iso),
+    'updated_at': (Content.updated_at, _iso)
+}
+
+PAYMENT_FIELDS = {
+    'id': (Payment.id, None),
+    'user_id': (Payment.user_id, None),
+    'order_id': (Payment.order_id, None),
+    'amount': (Payment.amount, None),
+    'currency': (Payment.currency, None),
+    'payment_method': (Payment.payment_method, None),
+    'stripe_payment_id': (Payment.stripe_payment_id, None),
+    'status': (Payment.status, None),
+    'created_at': (Payment.created_at, _iso),
+    'updated_at': (Payment.updated_at, _iso)
+}
+
+
+def parse_fields(value, available):
+    """Field names requested by a sparse fieldset parameter, or all fields if absent"""
+    if not value:
+        return list(available)
+    names = parse_list(value)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldSelectionError(f"Unknown field(s): {', '.join(unknown)}")
+    return names
+
+
+def _labeled_columns(name, column):
+    if isinstance(column, tuple):
+        return [part.label(f'{name}__{index}') for index, part in enumerate(column)]
+    return [column.label(name)]
+
+
+def select_columns(query, available, names, always=('id', 'created_at')):
+    """Restrict a query to the requested columns (plus those pagination needs)"""
+    selected = list(dict.fromkeys(list(always) + list(names)))
+    columns = []
+    for name in selected:
+        columns.extend(_labeled_columns(name, available[name][0]))
+    return query.with_entities(*columns)
+
+
+def serialize_rows(rows, available, names):
+    """Convert projected rows to dicts holding only the requested fields"""
+    converters = []
+    for name in names:
+        column, convert = available[name]
+        parts = [f'{name}__{index}' for index in range(len(column))] if isinstance(column, tuple) else None
+        converters.append((name, convert, parts))
+
+    result = []
+    for row in rows:
+        mapping = row._mapping
+        item = {}
+        for name, convert, parts in converters:
+            if parts:
+                item[name] = convert(*[mapping[part] for part in parts])
+                continue
+            value = mapping[name]
+            item[name] = convert(value) if convert else value
+        result.append(item)
+    return result
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'))
+
+
+def json_response(payload, status=200):
+    """JSON response encoded with the fastest available encoder"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
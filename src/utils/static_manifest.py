@@ -0,0 +1,163 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+from flask import current_app, request, send_file
+from src.utils.compression import COMPRESS_MIMETYPES, available_encodings, compress_data, negotiate_encoding
+
+# Files up to this size are kept in memory (with precompressed variants); larger ones stream from disk
+STATIC_MEMORY_MAX_SIZE = int(os.environ.get('STATIC_MEMORY_MAX_SIZE', 256 * 1024))
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 3600))
+# Files that never change once deployed are cached for a year: the ones the frontend build lists in its
+# manifest (Vite: build.manifest), and any whose name ends in a hex content hash (index-4f9a2b1c.js).
+# Everything else is revalidated, since a long-cached unhashed file would outlive the next deploy.
+STATIC_BUILD_MANIFEST = os.environ.get('STATIC_BUILD_MANIFEST', '.vite/manifest.json')
+STATIC_IMMUTABLE_PATTERN = re.compile(os.environ.get(
+    'STATIC_IMMUTABLE_PATTERN',
+    r'[.-][0-9a-f]{8,}\.(js|mjs|css|woff2?|png|jpe?g|gif|svg|webp|avif|ico)$'
+))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+INDEX_FILE = 'index.html'
+
+
+class StaticAsset:
+    __slots__ = ('path', 'full_path', 'size', 'mtime', 'sha256', 'etag', 'mimetype', 'cache_control', 'data', 'encoded')
+
+    def __init__(self, path, full_path, built=False):
+        self.path = path
+        self.full_path = full_path
+
+        stat = os.stat(full_path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+
+        digest = hashlib.sha256()
+        with open(full_path, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                digest.update(block)
+        self.sha256 = digest.hexdigest()
+        self.etag = self.sha256[:32]
+
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if path == INDEX_FILE:
+            # The entry point must be revalidated so a deploy is picked up immediately
+            self.cache_control = 'no-cache'
+        elif built or STATIC_IMMUTABLE_PATTERN.search(path):
+            self.cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            self.cache_control = f'public, max-age={STATIC_MAX_AGE}'
+
+        self.data = None
+        self.encoded = {}
+        if self.size <= STATIC_MEMORY_MAX_SIZE:
+            with open(full_path, 'rb') as f:
+                self.data = f.read()
+            if self.mimetype in COMPRESS_MIMETYPES:
+                for encoding in available_encodings():
+                    compressed = compress_data(encoding, self.data)
+                    if len(compressed) < len(self.data):
+                        self.encoded[encoding] = compressed
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'size': self.size,
+            'sha256': self.sha256,
+            'mimetype': self.mimetype,
+            'cache_control': self.cache_control,
+            'in_memory': self.data is not None,
+            'encodings': {encoding: len(data) for encoding, data in self.encoded.items()}
+        }
+
+
+def build_files(manifest_path):
+    """Output files listed in a Vite-style build manifest (empty if there is none)"""
+    try:
+        with open(manifest_path) as f:
+            chunks = json.load(f)
+    except (OSError, ValueError):
+        return set()
+
+    files = set()
+    for chunk in chunks.values() if isinstance(chunks, dict) else []:
+        if not isinstance(chunk, dict):
+            continue
+        if chunk.get('file'):
+            files.add(chunk['file'])
+        files.update(chunk.get('css') or [])
+        files.update(chunk.get('assets') or [])
+    # The entry point keeps its own revalidating policy even when listed
+    files.discard(INDEX_FILE)
+    return files
+
+
+class StaticManifest:
+    """Snapshot of the files under the static folder, built once instead of stat()ing per request"""
+
+    def __init__(self, root=None):
+        self.root = root
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.root = app.static_folder
+        self.reload()
+
+    def reload(self):
+        """Rescan the static folder (call after deploying new frontend files)"""
+        assets = {}
+        if self.root and os.path.isdir(self.root):
+            built = build_files(os.path.join(self.root, STATIC_BUILD_MANIFEST))
+            for directory, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    full_path = os.path.join(directory, filename)
+                    path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                    assets[path] = StaticAsset(path, full_path, built=path in built)
+        with self._lock:
+            self._assets = assets
+        return len(assets)
+
+    def get(self, path):
+        """Asset for a URL path relative to the static folder, or None"""
+        return self._assets.get(path)
+
+    def index(self):
+        return self._assets.get(INDEX_FILE)
+
+    def snapshot(self):
+        assets = list(self._assets.values())
+        return {
+            'root': self.root,
+            'files': len(assets),
+            'bytes': sum(asset.size for asset in assets),
+            'in_memory_bytes': sum(len(asset.data) for asset in assets if asset.data is not None),
+            'assets': [asset.to_dict() for asset in sorted(assets, key=lambda asset: asset.path)]
+        }
+
+
+def asset_response(asset):
+    """Serve an asset with its precomputed validator, from memory when possible"""
+    if request.if_none_match.contains_weak(asset.etag):
+        response = current_app.response_class(status=304)
+    elif asset.data is None:
+        response = send_file(asset.full_path, mimetype=asset.mimetype, conditional=False, etag=False)
+    else:
+        encoding = negotiate_encoding(request.accept_encodings) if asset.encoded else None
+        if encoding in asset.encoded:
+            response = current_app.response_class(asset.encoded[encoding], mimetype=asset.mimetype)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = current_app.response_class(asset.data, mimetype=asset.mimetype)
+        if asset.encoded:
+            response.vary.add('Accept-Encoding')
+
+    # Precompressed variants share the validator, so it can only be weak for them
+    response.set_etag(asset.etag, weak=bool(asset.encoded))
+    response.headers['Cache-Control'] = asset.cache_control
+    return response
+
+
+static_manifest = StaticManifest()
@@ -0,0 +1,145 @@
+import os
+import sys
+import argparse
+import multiprocessing
+import signal
+import socket
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 2))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+JOB_RECOVERY_INTERVAL = float(os.environ.get('JOB_RECOVERY_INTERVAL', 60))
+JOB_SHUTDOWN_TIMEOUT = float(os.environ.get('JOB_SHUTDOWN_TIMEOUT', 30))
+# Prometheus metrics of all worker processes are served here; 0 disables
+JOB_WORKER_METRICS_PORT = int(os.environ.get('JOB_WORKER_METRICS_PORT', 9200))
+
+
+def worker_id(pid=None):
+    return f'{socket.gethostname()}:{pid or os.getpid()}'
+
+
+def run_worker(poll_interval, recover_from=None):
+    """Poll the job table and run jobs until asked to stop"""
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Import the app inside the child so no DB connections are shared across fork
+    from src.main import app
+    from src.models.user import db
+    from src.services.job_queue import (
+        claim_next_job, run_job, recover_stale_jobs, recover_stale_orders, release_worker_jobs
+    )
+
+    my_id = worker_id()
+
+    with app.app_context():
+        if recover_from:
+            released = release_worker_jobs(recover_from)
+            if released:
+                print(f'Worker {my_id} requeued {released} job(s) from {recover_from}')
+
+        next_recovery = 0
+        while not stopping:
+            try:
+                if time.monotonic() >= next_recovery:
+                    recovered = recover_stale_jobs()
+                    if recovered:
+                        print(f'Worker {my_id} recovered {recovered} stale job(s)')
+                    reverted = recover_stale_orders()
+                    if reverted:
+                        print(f'Worker {my_id} returned {reverted} abandoned order(s) to pending')
+                    next_recovery = time.monotonic() + JOB_RECOVERY_INTERVAL
+
+                job = claim_next_job(my_id)
+                if job is None:
+                    time.sleep(poll_interval)
+                    continue
+
+                run_job(job)
+            except Exception as e:
+                db.session.rollback()
+                print(f'Worker {my_id} error: {e}')
+                time.sleep(poll_interval)
+            finally:
+                db.session.remove()
+
+
+def start_metrics_server(port):
+    """Serve the metrics every worker process records, merged, like /metrics does for gunicorn"""
+    # Must be set before prometheus_client is imported here or in any worker process
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc_worker')
+    from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+    from src.utils.metrics import reset_multiprocess_dir
+
+    reset_multiprocess_dir()
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+    print(f'Serving job worker metrics on port {port}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the background job worker pool')
+    parser.add_argument('--processes', type=int, default=JOB_WORKER_PROCESSES)
+    parser.add_argument('--poll-interval', type=float, default=JOB_POLL_INTERVAL)
+    parser.add_argument('--metrics-port', type=int, default=JOB_WORKER_METRICS_PORT)
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    workers = {}
+    stopping = False
+
+    def spawn(slot, recover_from=None):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(args.poll_interval, recover_from),
+            name=f'job-worker-{slot}'
+        )
+        process.start()
+        workers[slot] = process
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(args.processes):
+        spawn(slot)
+    print(f'Started {args.processes} job worker(s)')
+
+    while not stopping:
+        time.sleep(1)
+        for slot, process in list(workers.items()):
+            if not process.is_alive() and not stopping:
+                print(f'Job worker {process.pid} exited with code {process.exitcode}, restarting')
+                if args.metrics_port:
+                    from prometheus_client import multiprocess
+                    multiprocess.mark_process_dead(process.pid)
+                spawn(slot, recover_from=worker_id(process.pid))
+
+    for process in workers.values():
+        if process.is_alive():
+            process.terminate()
+
+    deadline = time.monotonic() + JOB_SHUTDOWN_TIMEOUT
+    for process in workers.values():
+        process.join(timeout=max(deadline - time.monotonic(), 0))
+        if process.is_alive():
+            process.kill()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# The app and services read their config at import, so this runs before any test module imports them
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='contentgenius-tests-'), 'test.db')
+
+from fake_openai import FakeOpenAIServer  # noqa: E402
+
+
+@pytest.fixture
+def fake_openai():
+    """Start local fake OpenAI servers: fake_openai(latency_ms=..., ...) -> FakeOpenAIServer"""
+    servers = []
+
+    def start(**options):
+        options.setdefault('latency_ms', 10)
+        options.setdefault('jitter_ms', 0)
+        options.setdefault('tokens_per_second', 0)
+        options.setdefault('seed', 1)
+        server = FakeOpenAIServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.bootstrap import bootstrap
+    from src.main import app
+
+    bootstrap(app, log=lambda message: None)
+    return app
+
+
+@pytest.fixture
+def db(app):
+    """An app context on a database holding only the seeded templates and admin user"""
+    from src.models.user import db
+
+    with app.app_context():
+        yield db
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            if table.name not in ('user', 'content_template'):
+                db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
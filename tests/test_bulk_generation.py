@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+from src.models.content_draft import ContentDraft
+from src.models.job import Job
+from src.models.order import Order
+from src.models.user import User, db
+from src.services import bulk_generation, job_queue
+from src.services.job_queue import claim_next_job, enqueue_job, run_job
+from src.services.llm_governor import process_concurrency
+
+
+class FakeGenerator:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.generated = []
+        self.keep_alive_calls = 0
+
+    def generate_content(self, order_id, keep_alive=None):
+        keep_alive()
+        self.keep_alive_calls += 1
+        self.generated.append(order_id)
+        if order_id in self.fail:
+            return {'success': False, 'error': 'provider down'}
+        order = db.session.get(Order, order_id)
+        order.status = 'completed'
+        db.session.commit()
+        return {'success': True, 'content': {'id': order_id}}
+
+
+def make_orders(db, count, status='pending'):
+    admin = User.query.filter_by(username='admin').first()
+    orders = [Order(user_id=admin.id, content_type='blog_post', title=f'Order {i}', status=status) for i in range(count)]
+    db.session.add_all(orders)
+    db.session.commit()
+    return [order.id for order in orders]
+
+
+def run_bulk(db, order_ids, concurrency=4):
+    enqueue_job('bulk_generate', {'order_ids': order_ids, 'concurrency': concurrency}, max_attempts=1)
+    job = claim_next_job('worker-a')
+    run_job(job)
+    db.session.refresh(job)
+    return job
+
+
+def test_bulk_run_generates_each_order_as_a_claimed_job(db, monkeypatch):
+    generator = FakeGenerator()
+    monkeypatch.setattr(job_queue, '_content_generator', generator)
+    order_ids = make_orders(db, 3)
+    generator.fail = {order_ids[2]}
+
+    bulk = run_bulk(db, order_ids)
+
+    progress = bulk.get_result()
+    assert (progress['done'], progress['failed'], progress['skipped']) == (2, 1, 0)
+    assert progress['failures'] == [{'order_id': order_ids[2], 'error': 'provider down'}]
+    # Every generation renewed its own job's lease while calling the provider
+    assert generator.keep_alive_calls == 3
+    jobs = {job.order_id: job for job in Job.query.filter_by(kind='generate_content')}
+    assert jobs[order_ids[0]].status == 'completed'
+    assert jobs[order_ids[0]].locked_by is None
+    assert jobs[order_ids[2]].status == 'failed'
+    # The failure hook put the failed order back
+    assert db.session.get(Order, order_ids[2]).status == 'pending'
+
+
+def test_bulk_run_skips_orders_that_are_streaming_or_already_queued(db, monkeypatch):
+    generator = FakeGenerator()
+    monkeypatch.setattr(job_queue, '_content_generator', generator)
+    streaming, queued, free = make_orders(db, 3, status='in_progress')
+    db.session.add(ContentDraft(order_id=streaming, status='streaming'))
+    db.session.commit()
+    # Queued for later, so the bulk job is the one claimed below
+    enqueue_job('generate_content', {'order_id': queued}, order_id=queued).run_after = datetime.utcnow() + timedelta(hours=1)
+    db.session.commit()
+
+    bulk = run_bulk(db, [streaming, queued, free])
+
+    assert bulk.get_result()['skipped'] == 2
+    assert generator.generated == [free]
+
+
+def test_concurrency_is_capped_at_the_governor_slots(db, monkeypatch):
+    monkeypatch.setattr(job_queue, '_content_generator', FakeGenerator())
+
+    bulk = run_bulk(db, make_orders(db, 1), concurrency=64)
+
+    assert bulk.get_result()['concurrency'] == bulk_generation.bulk_concurrency(64) == process_concurrency()
+
+
+def test_route_rejects_malformed_limit_and_concurrency(db, client, auth_headers):
+    make_orders(db, 1)
+
+    for body in ({'limit': 'abc'}, {'limit': 0}, {'concurrency': []}, {'concurrency': 'many'}):
+        response = client.post('/api/admin/bulk-generate', json=body, headers=auth_headers)
+        assert response.status_code == 400, body
+        assert 'must be' in response.get_json()['message']
+
+    response = client.post('/api/admin/bulk-generate', json={'limit': 1, 'concurrency': 64}, headers=auth_headers)
+    assert response.status_code == 202
+    job = db.session.get(Job, response.get_json()['job']['id'])
+    assert job.get_payload()['concurrency'] == process_concurrency()
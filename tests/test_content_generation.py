@@ -0,0 +1,155 @@
+from src.models.content_draft import ContentDraft
+from src.models.generation_usage import GenerationUsage
+from src.models.job import Job
+from src.models.order import Order
+from src.models.payment import Payment
+from src.models.user import User
+from src.services import content_generator, token_budget
+from src.services.content_generator import ContentGenerator
+from src.services.job_queue import enqueue_job
+from src.services.llm_providers import LLMRouter, Provider
+
+
+def make_order(db, word_count, status='pending'):
+    admin = User.query.filter_by(username='admin').first()
+    order = Order(user_id=admin.id, content_type='blog_post', title='Search traffic', word_count=word_count, status=status)
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def generator(server):
+    return ContentGenerator(router=LLMRouter([Provider(f'generator-{server.name}', base_url=server.url)], hedge_delay_ms=0))
+
+
+def test_cut_off_reply_is_finished_by_continuations(db, fake_openai, monkeypatch):
+    monkeypatch.setattr(token_budget, 'TOKEN_BUDGET_MAX_TOKENS', 200)
+    server = fake_openai(name='continue')
+    order = make_order(db, word_count=200)
+    content = generator(server)
+    budgets = []
+    create = content.router.create_chat_completion
+
+    def record_budget(tier, **request):
+        budgets.append(request['max_tokens'])
+        return create(tier, **request)
+
+    content.router.create_chat_completion = record_budget
+    result = content.generate_content(order.id)
+
+    assert result['success'], result.get('error')
+    assert result['content']['is_truncated'] is False
+    usage = GenerationUsage.query.filter_by(order_id=order.id).one()
+    assert usage.finish_reason == 'stop'
+    assert usage.continuations >= 1
+    # Each continuation keeps the first request's budget instead of shrinking to the minimum
+    assert budgets == [200] * (usage.continuations + 1)
+    assert server.snapshot()['truncated'] == usage.continuations
+    assert usage.word_count >= 180
+
+
+def test_reply_still_cut_off_after_the_last_continuation_is_kept(db, fake_openai, monkeypatch):
+    monkeypatch.setattr(token_budget, 'TOKEN_BUDGET_MAX_TOKENS', 150)
+    monkeypatch.setattr(content_generator, 'GENERATION_MAX_CONTINUATIONS', 1)
+    server = fake_openai(name='truncated')
+    order = make_order(db, word_count=1000)
+
+    result = generator(server).generate_content(order.id)
+
+    assert result['success'], result.get('error')
+    assert result['content']['is_truncated'] is True
+    assert result['content']['is_approved'] is False
+    assert len(result['content']['generated_content'].split()) > 100
+    assert result['order']['status'] == 'completed'
+    usage = GenerationUsage.query.filter_by(order_id=order.id).one()
+    assert usage.finish_reason == 'length'
+    assert usage.continuations == 1
+
+
+def test_generate_is_refused_while_the_order_is_streaming(db, client, auth_headers):
+    order = make_order(db, word_count=300, status='in_progress')
+    db.session.add(ContentDraft(order_id=order.id, status='streaming'))
+    db.session.commit()
+
+    response = client.post(f'/api/generate/{order.id}', headers=auth_headers)
+
+    assert response.status_code == 409
+    assert GenerationUsage.query.count() == 0
+
+
+def test_stream_is_refused_while_a_job_is_queued(db, client, auth_headers):
+    order = make_order(db, word_count=300, status='in_progress')
+    enqueue_job('generate_content', {'order_id': order.id}, order_id=order.id)
+
+    response = client.post(f'/api/generate/{order.id}/stream', headers=auth_headers)
+
+    assert response.status_code == 409
+
+
+def test_confirming_payment_queues_generation_instead_of_generating(db, client, auth_headers):
+    order = make_order(db, word_count=300)
+    payment = Payment(user_id=order.user_id, order_id=order.id, amount=10, stripe_payment_id='pi_demo_queued', status='pending')
+    db.session.add(payment)
+    db.session.commit()
+
+    response = client.post('/api/payment/confirm-payment', json={'payment_intent_id': 'pi_demo_queued'}, headers=auth_headers)
+
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['id']
+    assert response.headers['Location'] == f'/api/jobs/{job_id}'
+    assert Job.query.get(job_id).status == 'queued'
+    assert response.get_json()['order']['status'] == 'in_progress'
+    assert GenerationUsage.query.count() == 0
+
+
+def test_regenerate_reuses_the_job_already_queued(db, client, auth_headers):
+    order = make_order(db, word_count=300, status='completed')
+
+    first = client.post(f'/api/admin/regenerate/{order.id}', headers=auth_headers)
+    second = client.post(f'/api/admin/regenerate/{order.id}', headers=auth_headers)
+
+    assert first.status_code == second.status_code == 202
+    assert first.get_json()['job']['id'] == second.get_json()['job']['id']
+    assert Job.query.filter_by(kind='generate_content', order_id=order.id).count() == 1
+    assert GenerationUsage.query.count() == 0
+
+
+def test_regenerate_is_refused_while_the_order_is_streaming(db, client, auth_headers):
+    order = make_order(db, word_count=300, status='in_progress')
+    db.session.add(ContentDraft(order_id=order.id, status='streaming'))
+    db.session.commit()
+
+    response = client.post(f'/api/admin/regenerate/{order.id}', headers=auth_headers)
+
+    assert response.status_code == 409
+    assert Job.query.count() == 0
+
+
+def test_disconnected_stream_returns_the_order_to_pending(db, fake_openai):
+    server = fake_openai()
+    order = make_order(db, word_count=300, status='in_progress')
+    db.session.add(ContentDraft(order_id=order.id, status='streaming'))
+    db.session.commit()
+
+    events = generator(server).stream_content(order.id)
+    assert next(events)[0] == 'start'
+    assert next(events)[0] == 'token'
+    events.close()
+
+    db.session.refresh(order)
+    assert order.status == 'pending'
+    draft = ContentDraft.query.filter_by(order_id=order.id).one()
+    assert draft.status == 'interrupted'
+    assert draft.partial_content
+
+
+def test_stream_needs_the_draft_claimed_by_the_route(db, fake_openai):
+    server = fake_openai()
+    order = make_order(db, word_count=300, status='in_progress')
+
+    events = list(generator(server).stream_content(order.id))
+
+    assert events[-1][0] == 'error'
+    assert server.stats['requests'] == 0
+    db.session.refresh(order)
+    assert order.status == 'pending'
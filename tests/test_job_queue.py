@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+
+from src.models.content_draft import ContentDraft
+from src.models.job import Job
+from src.models.order import Order
+from src.models.user import User
+from src.services import job_queue
+from src.services.job_queue import (
+    PermanentJobError, claim_next_job, enqueue_job, heartbeat, job_handler, recover_stale_jobs,
+    recover_stale_orders, release_worker_jobs, run_job
+)
+
+calls = []
+
+
+@job_handler('test_ok')
+def ok_job(job):
+    calls.append(job.id)
+    return {'done': True}
+
+
+@job_handler('test_flaky')
+def flaky_job(job):
+    raise RuntimeError('provider unavailable')
+
+
+@job_handler('test_invalid')
+def invalid_job(job):
+    raise PermanentJobError('bad payload')
+
+
+def make_order(db, status='in_progress'):
+    admin = User.query.filter_by(username='admin').first()
+    order = Order(user_id=admin.id, content_type='blog_post', title='Test', word_count=300, status=status)
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def test_claims_due_jobs_oldest_first_and_only_once(db):
+    first = enqueue_job('test_ok')
+    second = enqueue_job('test_ok')
+    enqueue_job('test_ok').run_after = datetime.utcnow() + timedelta(hours=1)
+    db.session.commit()
+
+    claimed = claim_next_job('worker-a')
+    assert claimed.id == first.id
+    assert claimed.status == 'in_progress'
+    assert claimed.locked_by == 'worker-a'
+    assert claimed.attempts == 1
+
+    assert claim_next_job('worker-b').id == second.id
+    # The third job is not due yet
+    assert claim_next_job('worker-a') is None
+
+
+def test_run_job_completes_and_clears_the_lease(db):
+    job = enqueue_job('test_ok')
+    run_job(claim_next_job('worker-a'))
+
+    db.session.refresh(job)
+    assert job.id in calls
+    assert job.status == 'completed'
+    assert job.get_result() == {'done': True}
+    assert job.locked_by is None
+    assert job.completed_at is not None
+
+
+def test_failed_job_is_requeued_with_backoff_until_attempts_run_out(db):
+    job = enqueue_job('test_flaky', max_attempts=2)
+
+    run_job(claim_next_job('worker-a'))
+    db.session.refresh(job)
+    assert job.status == 'queued'
+    assert job.last_error == 'provider unavailable'
+    assert job.run_after > datetime.utcnow()
+    assert claim_next_job('worker-a') is None
+
+    job.run_after = datetime.utcnow()
+    db.session.commit()
+    run_job(claim_next_job('worker-a'))
+    db.session.refresh(job)
+    assert job.status == 'failed'
+    assert job.attempts == 2
+
+
+def test_permanent_error_fails_without_retry(db):
+    job = enqueue_job('test_invalid', max_attempts=5)
+    run_job(claim_next_job('worker-a'))
+
+    db.session.refresh(job)
+    assert job.status == 'failed'
+    assert job.attempts == 1
+
+
+def test_stale_jobs_are_recovered_but_heartbeating_ones_are_not(db):
+    stale = enqueue_job('test_ok')
+    alive = enqueue_job('test_ok')
+    claim_next_job('worker-a')
+    claim_next_job('worker-b')
+
+    expired = datetime.utcnow() - timedelta(seconds=job_queue.JOB_LEASE_SECONDS + 1)
+    stale.locked_at = expired
+    alive.locked_at = expired
+    db.session.commit()
+    heartbeat(alive)
+
+    assert recover_stale_jobs() == 1
+    db.session.refresh(stale)
+    db.session.refresh(alive)
+    assert stale.status == 'queued'
+    assert stale.locked_by is None
+    assert stale.last_error == 'Job lease expired before the worker finished'
+    assert alive.status == 'in_progress'
+
+
+def test_failure_hook_reverts_the_order_when_recovery_gives_up(db):
+    order = make_order(db)
+    job = enqueue_job('generate_content', {'order_id': order.id}, order_id=order.id, max_attempts=1)
+    claim_next_job('worker-a')
+    job.locked_at = datetime.utcnow() - timedelta(seconds=job_queue.JOB_LEASE_SECONDS + 1)
+    db.session.commit()
+
+    recover_stale_jobs()
+
+    db.session.refresh(job)
+    db.session.refresh(order)
+    assert job.status == 'failed'
+    assert order.status == 'pending'
+
+
+def test_release_worker_jobs_only_touches_that_worker(db):
+    mine = enqueue_job('test_ok')
+    theirs = enqueue_job('test_ok')
+    claim_next_job('worker-a')
+    claim_next_job('worker-b')
+
+    assert release_worker_jobs('worker-a') == 1
+    assert db.session.get(Job, mine.id).status == 'queued'
+    assert db.session.get(Job, theirs.id).status == 'in_progress'
+
+
+def test_generate_job_heartbeats_before_each_provider_call(db, monkeypatch):
+    order = make_order(db)
+    job = enqueue_job('generate_content', {'order_id': order.id}, order_id=order.id)
+    claimed = claim_next_job('worker-a')
+    beats = []
+
+    class Generator:
+        def generate_content(self, order_id, keep_alive=None):
+            for _ in range(3):
+                keep_alive()
+                beats.append(claimed.locked_at)
+            return {'success': True, 'content': {'id': 1}}
+
+    monkeypatch.setattr(job_queue, '_content_generator', Generator())
+    run_job(claimed)
+
+    db.session.refresh(job)
+    assert job.status == 'completed'
+    assert len(beats) == 3 and beats == sorted(beats)
+
+
+def test_abandoned_orders_are_returned_to_pending(db):
+    expired = datetime.utcnow() - timedelta(seconds=job_queue.STREAM_STALE_SECONDS + 1)
+    abandoned, queued, streaming, dead_stream, fresh = [make_order(db) for _ in range(5)]
+    enqueue_job('generate_content', {'order_id': queued.id}, order_id=queued.id)
+    live_draft = ContentDraft(order_id=streaming.id, status='streaming')
+    dead_draft = ContentDraft(order_id=dead_stream.id, status='streaming', updated_at=expired)
+    db.session.add_all([live_draft, dead_draft])
+    for order in (abandoned, queued, streaming, dead_stream):
+        order.updated_at = expired
+    db.session.commit()
+
+    assert recover_stale_orders() == 2
+    for order in (abandoned, queued, streaming, dead_stream, fresh):
+        db.session.refresh(order)
+    assert abandoned.status == dead_stream.status == 'pending'
+    assert queued.status == streaming.status == fresh.status == 'in_progress'
+    db.session.refresh(live_draft)
+    db.session.refresh(dead_draft)
+    assert live_draft.status == 'streaming'
+    assert dead_draft.status == 'interrupted'
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import openai
+import pytest
+
+from src.services.llm_client import get_openai_client
+from src.services.llm_governor import GovernorTimeout, LLMGovernor, ModelGovernor, TokenBucket, parse_duration
+
+
+def test_token_bucket_refills_at_the_per_minute_rate():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    bucket.take(60)
+
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == 0
+    # Larger than the bucket: only waits for a full bucket
+    assert bucket.wait_time(600, now + 1) == pytest.approx(59.0)
+
+
+def test_limits_are_split_across_processes():
+    governor = ModelGovernor('gpt-4', rpm=600, tpm=30000, max_concurrency=8, processes=3)
+
+    assert governor.requests.capacity == 200
+    assert governor.tokens.capacity == 10000
+    assert governor.max_concurrency == 2
+
+    governor.observe_headers({'x-ratelimit-limit-requests': '900', 'x-ratelimit-remaining-requests': '30'})
+    assert governor.requests.capacity == 300
+    assert governor.requests.tokens == pytest.approx(10)
+
+
+def test_acquire_times_out_at_the_concurrency_limit_and_wakes_on_release():
+    governor = ModelGovernor('gpt-4', rpm=600, tpm=100000, max_concurrency=1)
+    governor.acquire(100, time.monotonic() + 1)
+
+    with pytest.raises(GovernorTimeout):
+        governor.acquire(100, time.monotonic() + 0.05)
+    assert governor.stats['timeouts'] == 1
+
+    threading.Timer(0.05, governor.release, args=(100,)).start()
+    started = time.monotonic()
+    governor.acquire(100, time.monotonic() + 2)
+    assert time.monotonic() - started < 1
+    assert governor.in_flight == 1
+
+
+def test_acquire_times_out_when_tokens_run_out():
+    governor = ModelGovernor('gpt-4', rpm=600, tpm=1200, max_concurrency=8)
+    governor.acquire(1200, time.monotonic() + 1)
+
+    # Refilling 1200 tokens takes a minute, far beyond the deadline, so it fails without waiting
+    started = time.monotonic()
+    with pytest.raises(GovernorTimeout):
+        governor.acquire(1200, time.monotonic() + 1)
+    assert time.monotonic() - started < 0.5
+
+
+def test_back_off_honours_retry_after_and_blocks_every_caller():
+    governor = ModelGovernor('gpt-4', rpm=600, tpm=100000, max_concurrency=8)
+
+    assert governor.back_off({'retry-after-ms': '200'}, attempt=0) == pytest.approx(0.2)
+    with pytest.raises(GovernorTimeout):
+        governor.acquire(100, time.monotonic() + 0.05)
+
+    started = time.monotonic()
+    governor.acquire(100, time.monotonic() + 2)
+    assert 0.1 < time.monotonic() - started < 1
+
+
+def test_back_off_without_headers_grows_exponentially():
+    governor = ModelGovernor('gpt-4', rpm=600, tpm=100000, max_concurrency=8)
+
+    assert 0.5 <= governor.back_off(None, attempt=0) <= 1
+    assert 4 <= governor.back_off(None, attempt=3) <= 8
+
+
+def test_parse_duration():
+    assert parse_duration('20ms') == pytest.approx(0.02)
+    assert parse_duration('6m0s') == 360
+    assert parse_duration('1.5') == 1.5
+    assert parse_duration('soon') is None
+
+
+def test_rate_limited_calls_are_retried_then_raised(fake_openai):
+    server = fake_openai(rate_limit_rate=1.0)
+    governor = LLMGovernor()
+
+    with pytest.raises(openai.RateLimitError):
+        governor.create_chat_completion(
+            get_openai_client(server.url),
+            max_retries=2,
+            model='gpt-4',
+            messages=[{'role': 'user', 'content': 'hello'}],
+            max_tokens=50
+        )
+
+    assert server.snapshot()['rate_limited'] == 3
+    model_governor = governor.for_model('gpt-4')
+    assert model_governor.stats['retries'] == 2
+    assert model_governor.in_flight == 0
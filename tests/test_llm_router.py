@@ -0,0 +1,160 @@
+import itertools
+import time
+
+from src.services import llm_governor as governor_module, llm_providers
+from src.services.llm_governor import llm_governor
+from src.services.llm_providers import LLMRouter, Provider
+
+REQUEST = {
+    'messages': [{'role': 'user', 'content': 'Write approximately 20 words about search traffic.'}],
+    'max_tokens': 200
+}
+
+_names = itertools.count()
+
+
+def provider(server, **options):
+    # Unique names so each test gets its own governor and health statistics
+    return Provider(f'{server.name}-{next(_names)}', base_url=server.url, **options)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def in_flight(provider, tier='generation'):
+    model = provider.models[tier]
+    return llm_governor.for_model(model, provider.governor_key(model)).in_flight
+
+
+def test_fails_over_when_the_first_provider_errors(fake_openai):
+    broken = provider(fake_openai(name='broken', error_rate=1.0), weight=10)
+    healthy = provider(fake_openai(name='healthy'))
+    router = LLMRouter([broken, healthy], hedge_delay_ms=0)
+
+    response = router.create_chat_completion('generation', **REQUEST)
+
+    assert response.choices[0].finish_reason == 'stop'
+    assert broken.stats['failures'] == 1
+    assert broken.consecutive_failures == 1
+    assert healthy.stats['requests'] == 1
+
+
+def test_circuit_opens_after_repeated_failures(fake_openai):
+    broken = provider(fake_openai(name='broken', error_rate=1.0), weight=10)
+    healthy = provider(fake_openai(name='healthy'))
+    router = LLMRouter([broken, healthy], hedge_delay_ms=0)
+
+    for _ in range(llm_providers.LLM_PROVIDER_FAILURE_THRESHOLD):
+        router.create_chat_completion('generation', **REQUEST)
+
+    assert not broken.available()
+    assert router.ranked() == [healthy, broken]
+    router.create_chat_completion('generation', **REQUEST)
+    assert broken.stats['requests'] == llm_providers.LLM_PROVIDER_FAILURE_THRESHOLD
+
+
+def test_governor_timeout_fails_over_without_blaming_the_provider(fake_openai, monkeypatch):
+    congested_server = fake_openai(name='congested')
+    congested = provider(congested_server, weight=10)
+    healthy = provider(fake_openai(name='healthy'))
+    router = LLMRouter([congested, healthy], hedge_delay_ms=0)
+    monkeypatch.setattr(governor_module, 'LLM_QUEUE_TIMEOUT', 0.05)
+    model = congested.models['generation']
+    governor = llm_governor.for_model(model, congested.governor_key(model))
+    governor.in_flight = governor.max_concurrency
+
+    try:
+        response = router.create_chat_completion('generation', **REQUEST)
+    finally:
+        governor.in_flight = 0
+
+    assert response.choices[0].finish_reason == 'stop'
+    assert congested_server.snapshot()['requests'] == 0
+    assert congested.stats['failures'] == 0
+    assert congested.error_rate == 0
+    assert congested.available()
+
+
+def test_hedge_is_not_sent_when_the_primary_answers_in_time(fake_openai):
+    fast = provider(fake_openai(name='fast', latency_ms=10), weight=10)
+    backup_server = fake_openai(name='backup')
+    backup = provider(backup_server)
+    router = LLMRouter([fast, backup], hedge_delay_ms=500)
+
+    response = router.create_chat_completion('generation', **REQUEST)
+
+    assert response.choices[0].message.content
+    assert backup_server.snapshot()['requests'] == 0
+    assert backup.stats['hedges_sent'] == 0
+
+
+def test_hedge_is_not_sent_once_the_primary_is_streaming(fake_openai):
+    # Headers and the first chunk arrive at once, the rest takes about half a second
+    streaming = provider(fake_openai(name='streaming', latency_ms=10, tokens_per_second=50), weight=10)
+    backup_server = fake_openai(name='backup')
+    backup = provider(backup_server)
+    router = LLMRouter([streaming, backup], hedge_delay_ms=100)
+
+    started = time.monotonic()
+    response = router.create_chat_completion('generation', **REQUEST)
+
+    assert time.monotonic() - started > 0.2
+    assert response.choices[0].finish_reason == 'stop'
+    assert backup.stats['hedges_sent'] == 0
+    assert backup_server.snapshot()['requests'] == 0
+
+
+def test_hedge_wins_and_cancels_the_slow_primary_before_headers(fake_openai):
+    slow_server = fake_openai(name='slow', latency_ms=5000)
+    slow = provider(slow_server, weight=10)
+    backup = provider(fake_openai(name='backup', latency_ms=20))
+    router = LLMRouter([slow, backup], hedge_delay_ms=100)
+
+    started = time.monotonic()
+    response = router.create_chat_completion('generation', **REQUEST)
+
+    assert time.monotonic() - started < 2
+    assert response.choices[0].finish_reason == 'stop'
+    assert response.usage.completion_tokens > 0
+    assert backup.stats['hedges_sent'] == 1
+    assert backup.stats['hedges_won'] == 1
+    # The loser's request is aborted while it still waits for headers, freeing its thread and governor slot
+    assert wait_for(lambda: slow.stats['hedges_cancelled'] == 1)
+    assert in_flight(slow) == 0
+    assert slow_server.snapshot()['requests'] == 1
+    # Cancelled, not failed: no circuit breaker, but it is now known to be slower than the backup
+    assert slow.stats['failures'] == 0
+    assert slow.latency > backup.latency
+
+
+def test_slow_provider_is_demoted_after_losing(fake_openai):
+    slow = provider(fake_openai(name='slow', latency_ms=3000))
+    backup = provider(fake_openai(name='backup', latency_ms=20))
+    router = LLMRouter([slow, backup], hedge_delay_ms=100)
+
+    router.create_chat_completion('generation', **REQUEST)
+
+    assert router.ranked()[0] is backup
+
+
+def test_cancelled_hedges_do_not_exhaust_the_pool(fake_openai, monkeypatch):
+    monkeypatch.setattr(llm_providers, 'LLM_HEDGE_MAX_WORKERS', 2)
+    slow_server = fake_openai(name='slow', latency_ms=5000)
+    # Weighted so heavily it stays first despite losing every race
+    slow = provider(slow_server, weight=1000)
+    backup = provider(fake_openai(name='backup', latency_ms=20))
+    router = LLMRouter([slow, backup], hedge_delay_ms=100)
+
+    for _ in range(4):
+        started = time.monotonic()
+        router.create_chat_completion('generation', **REQUEST)
+        assert time.monotonic() - started < 2
+
+    assert slow_server.snapshot()['requests'] == 4
+    assert wait_for(lambda: slow.stats['hedges_cancelled'] == 4)
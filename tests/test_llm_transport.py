@@ -0,0 +1,70 @@
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+
+from src.services.llm_transport import CancellableBackend, CancellableTransport
+
+LIMITS = httpx.Limits(max_connections=4, max_keepalive_connections=2, keepalive_expiry=5)
+BODY = {'model': 'gpt-4', 'messages': [{'role': 'user', 'content': 'Write approximately 10 words.'}]}
+
+
+def client(backend=None, **options):
+    return httpx.Client(transport=CancellableTransport(backend or CancellableBackend(), LIMITS), **options)
+
+
+def test_completes_requests_and_reuses_connections(fake_openai):
+    server = fake_openai()
+    with client() as http:
+        for _ in range(2):
+            response = http.post(f'{server.url}/chat/completions', json=BODY)
+            assert response.status_code == 200
+            assert response.json()['choices'][0]['finish_reason'] == 'stop'
+
+
+def test_cancel_aborts_a_request_still_waiting_for_headers(fake_openai):
+    server = fake_openai(latency_ms=5000)
+    backend = CancellableBackend()
+    outcome = {}
+
+    def call():
+        outcome['thread'] = threading.get_ident()
+        started = time.monotonic()
+        try:
+            with client(backend, timeout=30) as http:
+                http.post(f'{server.url}/chat/completions', json=BODY)
+        except httpx.TransportError as e:
+            outcome['error'] = e
+        outcome['seconds'] = time.monotonic() - started
+
+    caller = threading.Thread(target=call)
+    caller.start()
+    time.sleep(0.3)
+    backend.cancel(outcome['thread'])
+    caller.join(timeout=3)
+
+    assert not caller.is_alive()
+    # The shut-down socket reads as EOF, which h11 reports as a protocol error
+    assert isinstance(outcome['error'], httpx.TransportError)
+    assert outcome['seconds'] < 2
+
+    # Stays cancelled until reset, so a loser that had not sent yet fails on its first write
+    with pytest.raises(httpx.ReadError):
+        backend.cancel(threading.get_ident())
+        with client(backend) as http:
+            http.post(f'{server.url}/chat/completions', json=BODY)
+    backend.reset(threading.get_ident())
+
+
+def test_httpcore_errors_surface_as_httpx_errors(fake_openai):
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+    with client() as http, pytest.raises(httpx.ConnectError):
+        http.get(f'http://127.0.0.1:{port}/')
+
+    server = fake_openai(latency_ms=1000)
+    with client(timeout=httpx.Timeout(5, read=0.1)) as http, pytest.raises(httpx.ReadTimeout):
+        http.post(f'{server.url}/chat/completions', json=BODY)
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from src.models.order import Order
+from src.models.user import User
+from src.utils.pagination import (
+    MAX_PAGE_SIZE, PaginationError, decode_cursor, encode_cursor, keyset_paginate, parse_page_size
+)
+
+
+def test_cursor_round_trips():
+    created_at = datetime(2025, 3, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(None, 1), 'WyJ4Il0'])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(PaginationError):
+        decode_cursor(cursor)
+
+
+def test_page_size_is_validated_and_capped():
+    assert parse_page_size(MultiDict({'limit': '10'})) == 10
+    assert parse_page_size(MultiDict({'limit': str(MAX_PAGE_SIZE + 1)})) == MAX_PAGE_SIZE
+    for limit in ('0', 'ten'):
+        with pytest.raises(PaginationError):
+            parse_page_size(MultiDict({'limit': limit}))
+
+
+def make_orders(db, count):
+    admin = User.query.filter_by(username='admin').first()
+    base = datetime(2025, 1, 1)
+    # Pairs share a created_at so the id tiebreak is exercised
+    orders = [
+        Order(user_id=admin.id, content_type='blog_post', title=f'Order {i}', created_at=base + timedelta(minutes=i // 2))
+        for i in range(count)
+    ]
+    db.session.add_all(orders)
+    db.session.commit()
+    return sorted(orders, key=lambda order: (order.created_at, order.id), reverse=True)
+
+
+def test_keyset_pages_cover_every_row_once_newest_first(db):
+    expected = [order.id for order in make_orders(db, 7)]
+
+    seen = []
+    args = {'limit': '3'}
+    while True:
+        rows, cursor = keyset_paginate(Order.query, Order, MultiDict(args))
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+        args['cursor'] = cursor
+
+    assert seen == expected
+
+
+def test_last_full_page_has_no_next_cursor(db):
+    make_orders(db, 4)
+
+    rows, cursor = keyset_paginate(Order.query, Order, MultiDict({'limit': '4'}))
+
+    assert len(rows) == 4
+    assert cursor is None
+
+
+def test_orders_route_walks_pages_with_next_cursor(db, client, auth_headers):
+    expected = [order.id for order in make_orders(db, 5)]
+
+    seen = []
+    url = '/api/orders?limit=2&fields=id'
+    while url:
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        seen.extend(order['id'] for order in body['orders'])
+        url = f"/api/orders?limit=2&fields=id&cursor={body['next_cursor']}" if body['next_cursor'] else None
+
+    assert seen == expected
+
+
+def test_orders_route_rejects_a_bad_cursor(client, auth_headers):
+    response = client.get('/api/orders?cursor=garbage', headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid cursor'
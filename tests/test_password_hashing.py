@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from src.services import password_hashing
+from src.services.password_hashing import HashingPool, HashingPoolBusy
+
+
+def test_pending_hashes_leave_request_threads_free():
+    assert password_hashing.PASSWORD_HASH_MAX_PENDING == (
+        password_hashing.GUNICORN_THREADS - password_hashing.PASSWORD_HASH_RESERVED_THREADS
+    )
+    assert password_hashing.PASSWORD_HASH_WORKERS <= password_hashing.PASSWORD_HASH_MAX_PENDING
+
+
+def test_pool_fails_fast_once_max_pending_is_reached():
+    pool = HashingPool(workers=1, max_pending=2, timeout=5)
+    release = threading.Event()
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(pool.run(release.wait))) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    with pytest.raises(HashingPoolBusy):
+        pool.run(release.wait)
+    assert time.monotonic() - started < 0.1
+
+    release.set()
+    for caller in callers:
+        caller.join()
+    assert results == [True, True]
+    assert pool.run(lambda: 'free again') == 'free again'
+
+
+def test_login_answers_503_when_the_pool_is_full(client, monkeypatch):
+    pool = HashingPool(workers=1, max_pending=1, timeout=5)
+    monkeypatch.setattr(password_hashing, '_pool', pool)
+    release = threading.Event()
+    busy = threading.Thread(target=pool.run, args=(release.wait,))
+    busy.start()
+    time.sleep(0.1)
+
+    try:
+        response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    finally:
+        release.set()
+        busy.join()
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
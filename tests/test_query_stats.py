@@ -0,0 +1,27 @@
+from sqlalchemy import text
+
+from src.utils import query_stats
+from src.utils.metrics import db_query_duration
+
+
+def test_metrics_observe_the_query_stats_listeners(db):
+    observed = []
+    query_stats.observe_queries(observed.append)
+    try:
+        db.session.execute(text('SELECT 1'))
+    finally:
+        query_stats._observers.remove(observed.append)
+
+    assert len(observed) == 1 and observed[0] >= 0
+    # init_metrics registered the histogram on the same listeners instead of its own
+    assert db_query_duration.observe in query_stats._observers
+
+
+def test_observers_are_registered_once():
+    observer = lambda seconds: None
+    query_stats.observe_queries(observer)
+    query_stats.observe_queries(observer)
+    try:
+        assert query_stats._observers.count(observer) == 1
+    finally:
+        query_stats._observers.remove(observer)
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from src.utils.static_manifest import IMMUTABLE_CACHE_CONTROL, STATIC_MAX_AGE, StaticManifest
+
+REVALIDATED = f'public, max-age={STATIC_MAX_AGE}'
+
+
+def build(root, files, manifest=None):
+    for path in files:
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(b'x')
+    if manifest is not None:
+        (root / '.vite').mkdir()
+        (root / '.vite' / 'manifest.json').write_text(json.dumps(manifest))
+    manifest = StaticManifest(str(root))
+    manifest.reload()
+    return manifest
+
+
+@pytest.mark.parametrize('path', [
+    'hero-background.png',
+    'terms-conditions.css',
+    'images/team-photograph.jpg',
+    'company.logo_original.svg',
+    'assets/logo.svg',
+])
+def test_unhashed_files_are_revalidated(tmp_path, path):
+    manifest = build(tmp_path, [path])
+
+    assert manifest.get(path).cache_control == REVALIDATED
+
+
+@pytest.mark.parametrize('path', ['assets/index-4f9a2b1c.js', 'app.0d3e5f7a9b1c.css', 'fonts/inter-5c1e0a9b.woff2'])
+def test_hex_hashed_files_are_immutable(tmp_path, path):
+    manifest = build(tmp_path, [path])
+
+    assert manifest.get(path).cache_control == IMMUTABLE_CACHE_CONTROL
+
+
+def test_files_in_the_build_manifest_are_immutable(tmp_path):
+    manifest = build(
+        tmp_path,
+        ['index.html', 'assets/index-BxK3_aZq.js', 'assets/index-Dw9p2Lx1.css', 'assets/hero-CkP0zQ7e.png', 'robots.txt'],
+        manifest={
+            'index.html': {
+                'file': 'assets/index-BxK3_aZq.js',
+                'css': ['assets/index-Dw9p2Lx1.css'],
+                'assets': ['assets/hero-CkP0zQ7e.png'],
+                'isEntry': True
+            }
+        }
+    )
+
+    for path in ('assets/index-BxK3_aZq.js', 'assets/index-Dw9p2Lx1.css', 'assets/hero-CkP0zQ7e.png'):
+        assert manifest.get(path).cache_control == IMMUTABLE_CACHE_CONTROL
+    assert manifest.get('robots.txt').cache_control == REVALIDATED
+    assert manifest.index().cache_control == 'no-cache'